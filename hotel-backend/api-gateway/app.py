@@ -1,37 +1,210 @@
 # api-gateway app.py
+import math
 import os
-from flask import Flask, request, jsonify, Response
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from flask import Flask, request, jsonify, Response, g
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, verify_jwt_in_request
+from flask_jwt_extended import JWTManager, create_access_token, verify_jwt_in_request, get_jwt
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+from metrics import init_flask, metrics, observe_upstream
+from token_cache import CLAIMS_HEADER, VerifiedTokenCache, bearer_token, encode_claims
+from compression import (COMPRESS_BUFFER_MAX, COMPRESS_ENABLED, CompressedBodyCache, StreamCompressor,
+                         add_vary, cacheable, compress, negotiate, should_compress, strong_if_none_match,
+                         weak_etag)
+from response_cache import (ROOM_CACHE_ENABLED, ROOM_CACHE_WAIT, CachedResponse, Flights, ResponseCache,
+                            cache_key, etag_matches)
+from resilience import (DEADLINE_HEADER, REQUEST_DEADLINE_MS, CircuitBreaker, CircuitOpen, DeadlineExceeded,
+                        admit, init_deadline)
 
 app = Flask(__name__)
+init_flask(app)
+# Clients may ask for less than REQUEST_DEADLINE_MS, never for more
+init_deadline(app, REQUEST_DEADLINE_MS, error_key='msg')
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'Shivang100@')
 jwt = JWTManager(app)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Next-Offset', 'Link', 'X-Degraded'])
 
 # Use env so this works in Docker/K8s
 SERVICES = {
     'auth':    os.getenv('AUTH_URL',    'http://localhost:5001'),
+    # refresh, logout and /me can go to auth-service's token_app.py
+    'auth_token': os.getenv('AUTH_TOKEN_URL', os.getenv('AUTH_URL', 'http://localhost:5001')),
     'room':    os.getenv('ROOM_URL',    'http://localhost:5002'),
     'booking': os.getenv('BOOKING_URL', 'http://localhost:5003'),
 }
+# Upstream label for metrics; 'auth' wins when the token routes share its URL
+UPSTREAM_NAMES = {url: name for name, url in reversed(SERVICES.items())}
+# One breaker per upstream URL (per worker); see resilience.py
+BREAKERS = {url: CircuitBreaker(name) for url, name in UPSTREAM_NAMES.items()}
+
+# Upstream connection pooling (per gunicorn worker)
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', '20'))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '3'))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', '60'))
+UPSTREAM_RETRIES = int(os.getenv('UPSTREAM_RETRIES', '2'))
+
+# Streaming pass-through: bodies are relayed in chunks instead of being
+# buffered in gateway memory. PROXY_STREAMING=0 restores full buffering.
+PROXY_STREAMING = os.getenv('PROXY_STREAMING', '1') == '1'
+PROXY_CHUNK_SIZE = int(os.getenv('PROXY_CHUNK_SIZE', str(64 * 1024)))
+# Request bodies up to this size are still read up front so they can be retried
+PROXY_BUFFER_BODY_MAX = int(os.getenv('PROXY_BUFFER_BODY_MAX', str(1024 * 1024)))
+
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade',
+}
+
+class NoTimeoutRetry(Retry):
+    # A read timeout means the upstream is slow, not gone: retrying it only
+    # multiplies the wait, so it is left to the circuit breaker
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if isinstance(error, ReadTimeoutError):
+            raise error
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+def make_session(pool_size, retries, read_retries=None):
+    # Retry connection/read failures for idempotent methods only
+    # (urllib3's default set: GET, HEAD, OPTIONS, PUT, DELETE, TRACE)
+    retry = NoTimeoutRetry(
+        total=retries,
+        connect=retries,
+        read=retries if read_retries is None else read_retries,
+        status=0,
+        backoff_factor=0.05,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    # Never keep upstream cookies between different users' requests
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+# Tokens verified once are trusted until their exp (per worker)
+token_cache = VerifiedTokenCache(maxsize=int(os.getenv('TOKEN_CACHE_SIZE', '4096')))
+# Send verified claims downstream so services started with
+# TRUST_GATEWAY_CLAIMS=1 can skip their own signature check
+FORWARD_VERIFIED_CLAIMS = os.getenv('FORWARD_VERIFIED_CLAIMS', '1') == '1'
+
+# Compressed bodies of ETag'd responses, shared by this worker's requests
+compressed_cache = CompressedBodyCache()
+
+# Room GET responses shared by all users (per worker); see response_cache.py
+room_cache = ResponseCache()
+room_flights = Flights()
+
+metrics.register_cache('token', token_cache.stats)
+metrics.register_cache('compressed_body', compressed_cache.stats)
+metrics.register_cache('room_response', room_cache.stats, hits=('hits', 'stale_hits'))
+
+SESSIONS = {url: make_session(UPSTREAM_POOL_SIZE, UPSTREAM_RETRIES) for url in SERVICES.values()}
+# A streamed request body cannot be replayed, so only connect failures are retried
+STREAM_BODY_SESSIONS = {url: make_session(UPSTREAM_POOL_SIZE, UPSTREAM_RETRIES, read_retries=0)
+                        for url in SERVICES.values()}
+
+class _SizedStream:
+    """Exposes the incoming WSGI body with a length so requests sends Content-Length."""
+
+    def __init__(self, stream, length):
+        self._stream = stream
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        return self._stream.read(PROXY_CHUNK_SIZE if size is None or size < 0 else size)
+
+def _request_body():
+    """Return (body, streamed) for the incoming request."""
+    if not PROXY_STREAMING:
+        return request.get_data(), False
+    length = request.content_length
+    chunked = 'chunked' in request.headers.get('Transfer-Encoding', '').lower()
+    if length is None and not chunked:
+        return None, False
+    if length is not None and length <= PROXY_BUFFER_BODY_MAX:
+        return request.get_data(), False
+    if length is not None:
+        return _SizedStream(request.stream, length), True
+    return iter(lambda: request.stream.read(PROXY_CHUNK_SIZE), b''), True
 
 def proxy_request(service_url, path):
     method = request.method
     url = f"{service_url}{path}"
-    headers = {key: value for key, value in request.headers if key.lower() != 'host'}
-    data = request.get_data()
+    # Content-Length is recomputed by requests; conditional and range headers
+    # (If-None-Match, If-Modified-Since, Range, ...) pass through untouched
+    headers = {key: value for key, value in request.headers
+               if key.lower() not in ('host', 'content-length', CLAIMS_HEADER.lower(), DEADLINE_HEADER.lower())
+               and key.lower() not in HOP_BY_HOP_HEADERS}
+    claims = g.get('verified_claims')
+    if claims is not None and FORWARD_VERIFIED_CLAIMS:
+        headers[CLAIMS_HEADER] = encode_claims(claims)
+    if COMPRESS_ENABLED and 'If-None-Match' in headers:
+        # We hand out W/ tags for compressed bodies; services compare strong tags
+        headers['If-None-Match'] = strong_if_none_match(headers['If-None-Match'])
+    data, streamed_body = _request_body()
     params = request.args
 
-    resp = requests.request(
-        method, url,
-        headers=headers,
-        params=params,
-        data=data,
-        cookies=request.cookies,
-        allow_redirects=False,
-    )
+    upstream = UPSTREAM_NAMES.get(service_url, service_url)
+    breaker = BREAKERS.setdefault(service_url, CircuitBreaker(upstream))
+    deadline = g.get('deadline')
+    try:
+        admit(breaker, deadline)
+    except (CircuitOpen, DeadlineExceeded) as e:
+        return upstream_error(e)
+    timeout = (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT)
+    if deadline is not None:
+        headers[DEADLINE_HEADER] = deadline.header()
+        timeout = deadline.timeout(*timeout)
+
+    pool = STREAM_BODY_SESSIONS if streamed_body else SESSIONS
+    session = pool.get(service_url) or make_session(UPSTREAM_POOL_SIZE, UPSTREAM_RETRIES)
+    started = time.perf_counter()
+    try:
+        resp = session.request(
+            method, url,
+            headers=headers,
+            params=params,
+            data=data,
+            cookies=request.cookies,
+            allow_redirects=False,
+            timeout=timeout,
+            stream=PROXY_STREAMING,
+        )
+    except requests.RequestException as e:
+        breaker.record(False)
+        observe_upstream(upstream, 'error', time.perf_counter() - started)
+        return upstream_error(e)
+    breaker.record_status(resp.status_code)
+    observe_upstream(upstream, resp.status_code, time.perf_counter() - started)
+
+    encoding = negotiate(request.headers.get('Accept-Encoding'))
+    if encoding and should_compress(method, resp.status_code, resp.headers):
+        return compressed_response(resp, encoding)
+
+    if PROXY_STREAMING:
+        # Relay the raw (still encoded) bytes, so Content-Encoding and
+        # Content-Length stay valid; raw headers keep repeated Set-Cookie
+        response_headers = [(name, value) for (name, value) in resp.raw.headers.items()
+                            if name.lower() not in HOP_BY_HOP_HEADERS]
+
+        def generate():
+            try:
+                for chunk in resp.raw.stream(PROXY_CHUNK_SIZE, decode_content=False):
+                    yield chunk
+            finally:
+                resp.close()
+
+        return Response(generate(), resp.status_code, response_headers, direct_passthrough=True)
 
     excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
     # using resp.headers is fine; your original used resp.raw.headers – both work
@@ -39,6 +212,222 @@ def proxy_request(service_url, path):
                         if name.lower() not in excluded_headers]
     return Response(resp.content, resp.status_code, response_headers)
 
+def upstream_error(exc):
+    """Response for an upstream call that failed or was not attempted."""
+    if isinstance(exc, CircuitOpen):
+        return jsonify({"msg": "Upstream unavailable"}), 503, {"Retry-After": str(math.ceil(exc.retry_after))}
+    if isinstance(exc, (DeadlineExceeded, requests.Timeout)):
+        return jsonify({"msg": "Upstream timeout"}), 504
+    return jsonify({"msg": "Upstream unavailable"}), 502
+
+def compressed_response(resp, encoding):
+    """Compress an identity-encoded upstream response for the client."""
+    response_headers = [(name, value) for (name, value) in resp.raw.headers.items()
+                        if name.lower() not in HOP_BY_HOP_HEADERS
+                        and name.lower() not in ('content-length', 'content-encoding', 'etag', 'vary')]
+    response_headers.append(('Content-Encoding', encoding))
+    response_headers.append(('Vary', add_vary(resp.headers.get('Vary'))))
+    etag = resp.headers.get('ETag')
+    if etag:
+        response_headers.append(('ETag', weak_etag(etag)))
+
+    length = resp.headers.get('Content-Length')
+    if not PROXY_STREAMING or (length is not None and int(length) <= COMPRESS_BUFFER_MAX):
+        key = (resp.url, etag, encoding) if cacheable(resp.headers) else None
+        body = compressed_cache.get(key) if key else None
+        if body is None:
+            body = compress(resp.content, encoding, cached=key is not None)
+            if key:
+                compressed_cache.put(key, body)
+        resp.close()
+        return Response(body, resp.status_code, response_headers)
+
+    compressor = StreamCompressor(encoding)
+
+    def generate():
+        try:
+            for chunk in resp.raw.stream(PROXY_CHUNK_SIZE, decode_content=False):
+                out = compressor.compress(chunk)
+                if out:
+                    yield out
+            yield compressor.flush()
+        finally:
+            resp.close()
+
+    return Response(generate(), resp.status_code, response_headers, direct_passthrough=True)
+
+def room_upstream_headers():
+    # A shared entry must not depend on who filled it: send only the credentials
+    headers = {'Accept': 'application/json'}
+    if 'Authorization' in request.headers:
+        headers['Authorization'] = request.headers['Authorization']
+    claims = g.get('verified_claims')
+    if claims is not None and FORWARD_VERIFIED_CLAIMS:
+        headers[CLAIMS_HEADER] = encode_claims(claims)
+    return headers
+
+def fetch_room_entry(key, headers, previous, deadline=None):
+    """GET key from room-service and store the result; previous is revalidated if given.
+
+    Raises requests.RequestException, CircuitOpen or DeadlineExceeded.
+    """
+    if previous is not None and previous.etag:
+        headers = dict(headers, **{'If-None-Match': previous.etag})
+    generation = room_cache.generation
+    service_url = SERVICES['room']
+    breaker = BREAKERS[service_url]
+    admit(breaker, deadline)
+    timeout = (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT)
+    if deadline is not None:
+        headers = dict(headers, **{DEADLINE_HEADER: deadline.header()})
+        timeout = deadline.timeout(*timeout)
+    started = time.perf_counter()
+    try:
+        resp = SESSIONS[service_url].get(f'{service_url}{key}', headers=headers, allow_redirects=False,
+                                         timeout=timeout)
+    except requests.RequestException:
+        breaker.record(False)
+        observe_upstream('room', 'error', time.perf_counter() - started)
+        raise
+    breaker.record_status(resp.status_code)
+    observe_upstream('room', resp.status_code, time.perf_counter() - started)
+    if resp.status_code == 304 and previous is not None:
+        entry = previous.renewed()
+        room_cache.put(entry, generation, revalidated=True)
+        return entry
+    entry = CachedResponse.from_upstream(key, resp.status_code, resp.raw.headers.items(), resp.content)
+    if not room_cache.put(entry, generation) and resp.status_code < 500:
+        room_cache.discard(key, generation)
+    return entry
+
+def refresh_room_entry(key, headers, previous):
+    result = None
+    try:
+        # Not bound to the client's deadline: nobody waits for it
+        result = fetch_room_entry(key, headers, previous)
+    except (requests.RequestException, CircuitOpen, DeadlineExceeded) as e:
+        # Keep serving the stale entry until its window ends
+        app.logger.warning("room cache refresh of %s failed: %s", key, e)
+    finally:
+        room_flights.finish(key, result)
+
+def service_headers():
+    # Catalog version checks act for no user, so the gateway signs its own token
+    with app.app_context():
+        token = create_access_token(identity='api-gateway', additional_claims={'role': 'service'})
+    return {'Accept': 'application/json', 'Authorization': f'Bearer {token}'}
+
+def check_catalog_version():
+    """Read room-service's catalog version; clears this worker's room cache when it moved."""
+    version = None
+    service_url = SERVICES['room']
+    breaker = BREAKERS[service_url]
+    try:
+        admit(breaker, None)
+        started = time.perf_counter()
+        try:
+            resp = SESSIONS[service_url].get(f'{service_url}/api/rooms/version', headers=service_headers(),
+                                             allow_redirects=False,
+                                             timeout=(UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT))
+        except requests.RequestException:
+            breaker.record(False)
+            observe_upstream('room', 'error', time.perf_counter() - started)
+            raise
+        breaker.record_status(resp.status_code)
+        observe_upstream('room', resp.status_code, time.perf_counter() - started)
+        if resp.status_code == 200:
+            version = resp.json()['version']
+        else:
+            app.logger.warning("room catalog version check answered %s", resp.status_code)
+    except (requests.RequestException, CircuitOpen, ValueError, KeyError, TypeError) as e:
+        app.logger.warning("room catalog version check failed: %s", e)
+    finally:
+        room_cache.version_checked(version)
+
+def watch_catalog_version():
+    while True:
+        check_catalog_version()
+        time.sleep(room_cache.ttl)
+
+_watcher_pid = None
+_watcher_lock = threading.Lock()
+
+def ensure_catalog_watcher():
+    """Start this worker's version watcher (once per process, so after a fork too)."""
+    global _watcher_pid
+    pid = os.getpid()
+    if _watcher_pid == pid:
+        return
+    with _watcher_lock:
+        if _watcher_pid == pid:
+            return
+        _watcher_pid = pid
+    threading.Thread(target=watch_catalog_version, name='room-catalog-version', daemon=True).start()
+
+def cached_room_get(path):
+    ensure_catalog_watcher()
+    key = cache_key(path, request.query_string)
+    entry, state = room_cache.get(key)
+    if state == 'fresh':
+        return cached_response(entry, 'HIT')
+    headers = room_upstream_headers()
+    if state == 'stale':
+        _, leader = room_flights.join(key)
+        if leader:
+            threading.Thread(target=refresh_room_entry, args=(key, headers, entry), daemon=True).start()
+        return cached_response(entry, 'STALE')
+
+    deadline = g.get('deadline')
+    flight, leader = room_flights.join(key)
+    if not leader:
+        room_cache.count_coalesced()
+        result = flight.wait(ROOM_CACHE_WAIT if deadline is None else min(ROOM_CACHE_WAIT, deadline.remaining()))
+        if result is not None and result.storable:
+            return cached_response(result, 'HIT')
+        return proxy_request(SERVICES['room'], path)
+    result = None
+    try:
+        result = fetch_room_entry(key, headers, entry, deadline)
+    except (requests.RequestException, CircuitOpen, DeadlineExceeded) as e:
+        return upstream_error(e)
+    finally:
+        room_flights.finish(key, result)
+    return cached_response(result, 'MISS')
+
+def cached_response(entry, state):
+    """Serve a CachedResponse, compressed and/or as a 304 for this client."""
+    encoding = negotiate(request.headers.get('Accept-Encoding'))
+    if encoding and not should_compress(request.method, entry.status, entry.lookup):
+        encoding = None
+    headers = [(name, value) for name, value in entry.headers
+               if not (encoding and name.lower() in ('etag', 'vary'))]
+    etag = entry.etag
+    if encoding:
+        headers.append(('Vary', add_vary(entry.lookup.get('vary'))))
+        if etag:
+            etag = weak_etag(etag)
+            headers.append(('ETag', etag))
+    headers.append(('Age', str(entry.age())))
+    headers.append(('X-Cache', state))
+    if entry.status == 200 and etag_matches(request.headers.get('If-None-Match'), etag):
+        return Response(status=304, headers=[(name, value) for name, value in headers
+                                             if name.lower() != 'content-type'])
+    body = entry.body
+    if encoding:
+        body = entry.variants.get(encoding)
+        if body is None:
+            body = compress(entry.body, encoding, cached=entry.storable)
+            room_cache.add_variant(entry, encoding, body)
+        headers.append(('Content-Encoding', encoding))
+    return Response(body, entry.status, headers)
+
+def invalidate_rooms_after(response):
+    # After the write has committed, so a fill racing it cannot store old data.
+    # 5xx may still have committed.
+    if response.status_code < 300 or response.status_code >= 500:
+        room_cache.invalidate()
+    return response
+
 @app.before_request
 def verify_token():
     if request.path.startswith('/healthz'):
@@ -46,18 +435,37 @@ def verify_token():
     if request.path.startswith('/api/auth'):
         return
     if request.path.startswith('/api/'):
-        print("Authorization header:", request.headers.get('Authorization'))
-        try:
-            verify_jwt_in_request()
-        except Exception as e:
-            print("JWT verification error:", str(e))
-            return jsonify({"msg": "Missing or invalid token"}), 401
+        if request.method == 'OPTIONS':
+            return
+        token = bearer_token(request.headers.get('Authorization'))
+        claims = token_cache.get(token) if token else None
+        if claims is None:
+            try:
+                verify_jwt_in_request()
+            except Exception as e:
+                app.logger.debug("JWT verification error: %s", e)
+                return jsonify({"msg": "Missing or invalid token"}), 401
+            claims = get_jwt()
+            token_cache.put(token, claims)
+        g.verified_claims = claims
 
 # Auth service routes
 @app.route('/api/auth/register', methods=['POST'])
 def auth_register():
     return proxy_request(SERVICES['auth'], '/api/auth/register')
 
+@app.route('/api/auth/refresh', methods=['POST'])
+def auth_refresh():
+    return proxy_request(SERVICES['auth_token'], '/api/auth/refresh')
+
+@app.route('/api/auth/logout', methods=['POST'])
+def auth_logout():
+    return proxy_request(SERVICES['auth_token'], '/api/auth/logout')
+
+@app.get('/api/protected/me')
+def auth_me():
+    return proxy_request(SERVICES['auth_token'], '/api/protected/me')
+
 @app.route('/api/auth/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH'])
 def auth_route(path):
     return proxy_request(SERVICES['auth'], f'/api/auth/{path}')
@@ -65,10 +473,18 @@ def auth_route(path):
 # Room service routes
 @app.route('/api/rooms', methods=['GET', 'POST'])
 def room_root():
+    if request.method not in ('GET', 'HEAD'):
+        return invalidate_rooms_after(proxy_request(SERVICES['room'], '/api/rooms'))
+    if ROOM_CACHE_ENABLED:
+        return cached_room_get('/api/rooms')
     return proxy_request(SERVICES['room'], '/api/rooms')
 
 @app.route('/api/rooms/<int:room_id>', methods=['GET', 'PUT', 'DELETE'])
 def room_id_route(room_id):
+    if request.method not in ('GET', 'HEAD'):
+        return invalidate_rooms_after(proxy_request(SERVICES['room'], f'/api/rooms/{room_id}'))
+    if ROOM_CACHE_ENABLED:
+        return cached_room_get(f'/api/rooms/{room_id}')
     return proxy_request(SERVICES['room'], f'/api/rooms/{room_id}')
 
 # Booking service routes
@@ -76,6 +492,14 @@ def room_id_route(room_id):
 def booking_root():
     return proxy_request(SERVICES['booking'], '/api/bookings')
 
+@app.get('/api/bookings/availability')
+def booking_availability():
+    return proxy_request(SERVICES['booking'], '/api/bookings/availability')
+
+@app.post('/api/bookings/bulk')
+def booking_bulk():
+    return proxy_request(SERVICES['booking'], '/api/bookings/bulk')
+
 @app.route('/api/bookings/<int:booking_id>', methods=['GET', 'PUT', 'DELETE'])
 def booking_id_route(booking_id):
     return proxy_request(SERVICES['booking'], f'/api/bookings/{booking_id}')
@@ -84,5 +508,26 @@ def booking_id_route(booking_id):
 def healthz():
     return {"ok": True}, 200
 
+@app.get('/healthz/compression')
+def compression_stats():
+    return jsonify(compressed_cache.stats()), 200
+
+@app.get('/healthz/room-cache')
+def room_cache_stats():
+    return jsonify(room_cache.stats()), 200
+
+@app.get('/healthz/upstreams')
+def upstream_stats():
+    return jsonify({breaker.name: breaker.stats() for breaker in BREAKERS.values()}), 200
+
+@app.get('/healthz/token-cache')
+def token_cache_stats():
+    return token_cache.stats(), 200
+
+# gunicorn imports this module in every worker, so each starts watching at
+# once; the call in cached_room_get covers servers that fork after import
+if ROOM_CACHE_ENABLED:
+    ensure_catalog_watcher()
+
 if __name__ == '__main__':
     app.run(port=5000, debug=True)
@@ -0,0 +1,524 @@
+# api-gateway asgi.py
+# asyncio entry point with the same routes and token check as app.py.
+# Run with: uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 3
+import asyncio
+import contextlib
+import math
+import os
+import time
+import uuid
+import jwt as pyjwt
+import httpx
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from metrics import MetricsMiddleware, metrics, observe_upstream
+from token_cache import CLAIMS_HEADER, VerifiedTokenCache, bearer_token, encode_claims
+from compression import (COMPRESS_BUFFER_MAX, COMPRESS_ENABLED, CompressedBodyCache, StreamCompressor,
+                         add_vary, cacheable, compress, negotiate, should_compress, strong_if_none_match,
+                         weak_etag)
+from response_cache import (ROOM_CACHE_ENABLED, ROOM_CACHE_WAIT, CachedResponse, ResponseCache, cache_key,
+                            etag_matches)
+from resilience import (DEADLINE_HEADER, REQUEST_DEADLINE_MS, CircuitBreaker, CircuitOpen, Deadline,
+                        DeadlineExceeded, admit)
+
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'Shivang100@')
+JWT_ALGORITHM = 'HS256'
+
+SERVICES = {
+    'auth':    os.getenv('AUTH_URL',    'http://localhost:5001'),
+    # refresh, logout and /me can go to auth-service's token_app.py
+    'auth_token': os.getenv('AUTH_TOKEN_URL', os.getenv('AUTH_URL', 'http://localhost:5001')),
+    'room':    os.getenv('ROOM_URL',    'http://localhost:5002'),
+    'booking': os.getenv('BOOKING_URL', 'http://localhost:5003'),
+}
+
+# One breaker per upstream URL (per worker), as in app.py
+_breakers_by_url = {}
+BREAKERS = {name: _breakers_by_url.setdefault(url, CircuitBreaker(name)) for name, url in SERVICES.items()}
+
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', '100'))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '3'))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', '60'))
+UPSTREAM_RETRIES = int(os.getenv('UPSTREAM_RETRIES', '2'))
+
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade',
+}
+
+token_cache = VerifiedTokenCache(maxsize=int(os.getenv('TOKEN_CACHE_SIZE', '4096')))
+FORWARD_VERIFIED_CLAIMS = os.getenv('FORWARD_VERIFIED_CLAIMS', '1') == '1'
+
+compressed_cache = CompressedBodyCache()
+# Compress bodies above this size in a worker thread instead of on the event loop
+COMPRESS_INLINE_MAX = 64 * 1024
+
+# Room GET responses shared by all users (per worker); see response_cache.py
+room_cache = ResponseCache()
+# key -> future of the fill in flight; background refresh tasks are kept referenced
+_room_flights = {}
+_background_tasks = set()
+
+metrics.register_cache('token', token_cache.stats)
+metrics.register_cache('compressed_body', compressed_cache.stats)
+metrics.register_cache('room_response', room_cache.stats, hits=('hits', 'stale_hits'))
+
+# One pooled client per upstream, created in the worker's event loop
+CLIENTS = {}
+
+
+def make_client(base_url):
+    # httpx transport retries only failed connection attempts, which is safe
+    # for every method since nothing was sent yet
+    transport = httpx.AsyncHTTPTransport(
+        retries=UPSTREAM_RETRIES,
+        limits=httpx.Limits(max_connections=UPSTREAM_POOL_SIZE,
+                            max_keepalive_connections=UPSTREAM_POOL_SIZE),
+    )
+    return httpx.AsyncClient(
+        base_url=base_url,
+        transport=transport,
+        timeout=httpx.Timeout(UPSTREAM_READ_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT),
+        follow_redirects=False,
+    )
+
+
+def verify_token(request):
+    """Mirror of app.verify_token: returns (error response or None, claims or None)."""
+    path = request.url.path
+    if path.startswith('/healthz') or path.startswith('/api/auth'):
+        return None, None
+    if not path.startswith('/api/') or request.method == 'OPTIONS':
+        return None, None
+    token = bearer_token(request.headers.get('authorization'))
+    if token is None:
+        return JSONResponse({"msg": "Missing or invalid token"}, status_code=401), None
+    claims = token_cache.get(token)
+    if claims is not None:
+        return None, claims
+    try:
+        claims = pyjwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except pyjwt.PyJWTError:
+        return JSONResponse({"msg": "Missing or invalid token"}, status_code=401), None
+    if claims.get('type') != 'access':
+        return JSONResponse({"msg": "Missing or invalid token"}, status_code=401), None
+    token_cache.put(token, claims)
+    return None, claims
+
+
+def request_deadline(request):
+    """Mirror of resilience.init_deadline; fixed the first time it is asked for."""
+    deadline = getattr(request.state, 'deadline', None)
+    if deadline is None:
+        deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER), REQUEST_DEADLINE_MS)
+        request.state.deadline = deadline
+    return deadline
+
+
+def upstream_timeout(deadline):
+    if deadline is None:
+        return httpx.Timeout(UPSTREAM_READ_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT)
+    connect, read = deadline.timeout(UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT)
+    return httpx.Timeout(read, connect=connect)
+
+
+def upstream_error(exc):
+    """Mirror of app.upstream_error."""
+    if isinstance(exc, CircuitOpen):
+        return JSONResponse({"msg": "Upstream unavailable"}, status_code=503,
+                            headers={'Retry-After': str(math.ceil(exc.retry_after))})
+    if isinstance(exc, (DeadlineExceeded, httpx.TimeoutException)):
+        return JSONResponse({"msg": "Upstream timeout"}, status_code=504)
+    return JSONResponse({"msg": "Upstream unavailable"}, status_code=502)
+
+
+async def proxy_request(request, service, path):
+    denied, claims = verify_token(request)
+    if denied is not None:
+        return denied
+    breaker = BREAKERS[service]
+    deadline = request_deadline(request)
+    try:
+        admit(breaker, deadline)
+    except (CircuitOpen, DeadlineExceeded) as e:
+        return upstream_error(e)
+    client = CLIENTS[service]
+    headers = [(key, value) for key, value in request.headers.items()
+               if key not in ('host', 'content-length', CLAIMS_HEADER.lower(), DEADLINE_HEADER.lower())
+               and key not in HOP_BY_HOP_HEADERS]
+    if deadline is not None:
+        headers.append((DEADLINE_HEADER, deadline.header()))
+    if claims is not None and FORWARD_VERIFIED_CLAIMS:
+        headers.append((CLAIMS_HEADER, encode_claims(claims)))
+    if COMPRESS_ENABLED:
+        # We hand out W/ tags for compressed bodies; services compare strong tags
+        headers = [(key, strong_if_none_match(value) if key == 'if-none-match' else value)
+                   for key, value in headers]
+    has_body = request.headers.get('content-length') not in (None, '0') or \
+        'chunked' in request.headers.get('transfer-encoding', '')
+    upstream_request = client.build_request(
+        request.method, path,
+        headers=headers,
+        params=request.query_params.multi_items(),
+        content=request.stream() if has_body else None,
+        timeout=upstream_timeout(deadline),
+    )
+    started = time.perf_counter()
+    try:
+        resp = await client.send(upstream_request, stream=True)
+    except httpx.TransportError as e:
+        breaker.record(False)
+        observe_upstream(service, 'error', time.perf_counter() - started)
+        return upstream_error(e)
+    breaker.record_status(resp.status_code)
+    observe_upstream(service, resp.status_code, time.perf_counter() - started)
+    encoding = negotiate(request.headers.get('accept-encoding'))
+    if encoding and should_compress(request.method, resp.status_code, resp.headers):
+        return await compressed_response(resp, encoding)
+    raw_headers = [(name, value) for (name, value) in resp.headers.raw
+                   if name.decode('latin-1').lower() not in HOP_BY_HOP_HEADERS]
+    response = StreamingResponse(
+        resp.aiter_raw(),
+        status_code=resp.status_code,
+        background=BackgroundTask(resp.aclose),
+    )
+    # Keep upstream header order and repeated Set-Cookie values as-is
+    response.raw_headers = raw_headers
+    return response
+
+
+async def compressed_response(resp, encoding):
+    """Mirror of app.compressed_response."""
+    raw_headers = [(name, value) for (name, value) in resp.headers.raw
+                   if name.decode('latin-1').lower() not in HOP_BY_HOP_HEADERS
+                   and name.decode('latin-1').lower() not in ('content-length', 'content-encoding', 'etag', 'vary')]
+    raw_headers.append((b'content-encoding', encoding.encode()))
+    raw_headers.append((b'vary', add_vary(resp.headers.get('vary')).encode('latin-1')))
+    etag = resp.headers.get('etag')
+    if etag:
+        raw_headers.append((b'etag', weak_etag(etag).encode('latin-1')))
+
+    length = resp.headers.get('content-length')
+    if length is not None and int(length) <= COMPRESS_BUFFER_MAX:
+        try:
+            content = await resp.aread()
+        finally:
+            await resp.aclose()
+        key = (str(resp.url), etag, encoding) if cacheable(resp.headers) else None
+        body = compressed_cache.get(key) if key else None
+        if body is None:
+            if len(content) > COMPRESS_INLINE_MAX:
+                body = await run_in_threadpool(compress, content, encoding, key is not None)
+            else:
+                body = compress(content, encoding, cached=key is not None)
+            if key:
+                compressed_cache.put(key, body)
+        response = Response(body, status_code=resp.status_code)
+        raw_headers.append((b'content-length', str(len(body)).encode()))
+        response.raw_headers = raw_headers
+        return response
+
+    compressor = StreamCompressor(encoding)
+
+    async def generate():
+        async for chunk in resp.aiter_raw():
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+        yield compressor.flush()
+
+    response = StreamingResponse(generate(), status_code=resp.status_code,
+                                 background=BackgroundTask(resp.aclose))
+    response.raw_headers = raw_headers
+    return response
+
+
+def room_upstream_headers(request, claims):
+    """Mirror of app.room_upstream_headers."""
+    headers = [('accept', 'application/json')]
+    if 'authorization' in request.headers:
+        headers.append(('authorization', request.headers['authorization']))
+    if claims is not None and FORWARD_VERIFIED_CLAIMS:
+        headers.append((CLAIMS_HEADER, encode_claims(claims)))
+    return headers
+
+
+async def fetch_room_entry(key, headers, previous, deadline=None):
+    """Mirror of app.fetch_room_entry."""
+    if previous is not None and previous.etag:
+        headers = headers + [('if-none-match', previous.etag)]
+    generation = room_cache.generation
+    breaker = BREAKERS['room']
+    admit(breaker, deadline)
+    if deadline is not None:
+        headers = headers + [(DEADLINE_HEADER, deadline.header())]
+    started = time.perf_counter()
+    try:
+        resp = await CLIENTS['room'].get(key, headers=headers, timeout=upstream_timeout(deadline))
+    except httpx.HTTPError:
+        breaker.record(False)
+        observe_upstream('room', 'error', time.perf_counter() - started)
+        raise
+    breaker.record_status(resp.status_code)
+    observe_upstream('room', resp.status_code, time.perf_counter() - started)
+    if resp.status_code == 304 and previous is not None:
+        entry = previous.renewed()
+        room_cache.put(entry, generation, revalidated=True)
+        return entry
+    entry = CachedResponse.from_upstream(key, resp.status_code, resp.headers.multi_items(), resp.content)
+    if not room_cache.put(entry, generation) and resp.status_code < 500:
+        room_cache.discard(key, generation)
+    return entry
+
+
+def _start_flight(key):
+    future = asyncio.get_running_loop().create_future()
+    _room_flights[key] = future
+    return future
+
+
+def _finish_flight(key, future, result):
+    if _room_flights.get(key) is future:
+        del _room_flights[key]
+    if not future.done():
+        future.set_result(result)
+
+
+async def refresh_room_entry(key, headers, previous, future):
+    result = None
+    try:
+        result = await fetch_room_entry(key, headers, previous)
+    except (httpx.HTTPError, CircuitOpen, DeadlineExceeded):
+        pass  # keep serving the stale entry until its window ends
+    finally:
+        _finish_flight(key, future, result)
+
+
+def service_headers():
+    """Mirror of app.service_headers; same claims as flask_jwt_extended's access tokens."""
+    now = int(time.time())
+    token = pyjwt.encode({'fresh': False, 'iat': now, 'nbf': now, 'exp': now + 900, 'jti': str(uuid.uuid4()),
+                          'type': 'access', 'sub': 'api-gateway', 'role': 'service'},
+                         JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    return [('accept', 'application/json'), ('authorization', f'Bearer {token}')]
+
+
+async def check_catalog_version():
+    """Mirror of app.check_catalog_version."""
+    version = None
+    breaker = BREAKERS['room']
+    try:
+        admit(breaker, None)
+        started = time.perf_counter()
+        try:
+            resp = await CLIENTS['room'].get('/api/rooms/version', headers=service_headers(),
+                                             timeout=upstream_timeout(None))
+        except httpx.HTTPError:
+            breaker.record(False)
+            observe_upstream('room', 'error', time.perf_counter() - started)
+            raise
+        breaker.record_status(resp.status_code)
+        observe_upstream('room', resp.status_code, time.perf_counter() - started)
+        if resp.status_code == 200:
+            version = resp.json()['version']
+    except (httpx.HTTPError, CircuitOpen, ValueError, KeyError, TypeError):
+        pass  # entries keep expiring by age until a check succeeds
+    finally:
+        room_cache.version_checked(version)
+
+
+async def watch_catalog_version():
+    """Mirror of app.watch_catalog_version; runs for the worker's lifespan."""
+    while True:
+        await check_catalog_version()
+        await asyncio.sleep(room_cache.ttl)
+
+
+async def cached_room_get(request, path):
+    denied, claims = verify_token(request)
+    if denied is not None:
+        return denied
+    key = cache_key(path, request.url.query)
+    entry, state = room_cache.get(key)
+    if state == 'fresh':
+        return await cached_response(request, entry, 'HIT')
+    headers = room_upstream_headers(request, claims)
+    if state == 'stale':
+        if key not in _room_flights:
+            task = asyncio.create_task(refresh_room_entry(key, headers, entry, _start_flight(key)))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        return await cached_response(request, entry, 'STALE')
+
+    deadline = request_deadline(request)
+    future = _room_flights.get(key)
+    if future is not None:
+        room_cache.count_coalesced()
+        wait = ROOM_CACHE_WAIT if deadline is None else min(ROOM_CACHE_WAIT, deadline.remaining())
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), wait)
+        except asyncio.TimeoutError:
+            result = None
+        if result is not None and result.storable:
+            return await cached_response(request, result, 'HIT')
+        return await proxy_request(request, 'room', path)
+    future = _start_flight(key)
+    result = None
+    try:
+        result = await fetch_room_entry(key, headers, entry, deadline)
+    except (httpx.HTTPError, CircuitOpen, DeadlineExceeded) as e:
+        return upstream_error(e)
+    finally:
+        _finish_flight(key, future, result)
+    return await cached_response(request, result, 'MISS')
+
+
+async def cached_response(request, entry, state):
+    """Mirror of app.cached_response."""
+    encoding = negotiate(request.headers.get('accept-encoding'))
+    if encoding and not should_compress(request.method, entry.status, entry.lookup):
+        encoding = None
+    headers = [(name, value) for name, value in entry.headers
+               if not (encoding and name.lower() in ('etag', 'vary'))]
+    etag = entry.etag
+    if encoding:
+        headers.append(('vary', add_vary(entry.lookup.get('vary'))))
+        if etag:
+            etag = weak_etag(etag)
+            headers.append(('etag', etag))
+    headers.append(('age', str(entry.age())))
+    headers.append(('x-cache', state))
+    if entry.status == 200 and etag_matches(request.headers.get('if-none-match'), etag):
+        response = Response(status_code=304)
+        response.raw_headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                for name, value in headers if name.lower() != 'content-type']
+        return response
+    body = entry.body
+    if encoding:
+        body = entry.variants.get(encoding)
+        if body is None:
+            if len(entry.body) > COMPRESS_INLINE_MAX:
+                body = await run_in_threadpool(compress, entry.body, encoding, entry.storable)
+            else:
+                body = compress(entry.body, encoding, cached=entry.storable)
+            room_cache.add_variant(entry, encoding, body)
+        headers.append(('content-encoding', encoding))
+    headers.append(('content-length', str(len(body))))
+    response = Response(body, status_code=entry.status)
+    response.raw_headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in headers]
+    return response
+
+
+async def invalidate_rooms_after(response):
+    """Mirror of app.invalidate_rooms_after."""
+    response = await response
+    if response.status_code < 300 or response.status_code >= 500:
+        room_cache.invalidate()
+    return response
+
+
+async def auth_register(request):
+    return await proxy_request(request, 'auth', '/api/auth/register')
+
+async def auth_refresh(request):
+    return await proxy_request(request, 'auth_token', '/api/auth/refresh')
+
+async def auth_logout(request):
+    return await proxy_request(request, 'auth_token', '/api/auth/logout')
+
+async def auth_me(request):
+    return await proxy_request(request, 'auth_token', '/api/protected/me')
+
+async def auth_route(request):
+    return await proxy_request(request, 'auth', f"/api/auth/{request.path_params['path']}")
+
+async def room_root(request):
+    if request.method not in ('GET', 'HEAD'):
+        return await invalidate_rooms_after(proxy_request(request, 'room', '/api/rooms'))
+    if ROOM_CACHE_ENABLED:
+        return await cached_room_get(request, '/api/rooms')
+    return await proxy_request(request, 'room', '/api/rooms')
+
+async def room_id_route(request):
+    path = f"/api/rooms/{request.path_params['room_id']}"
+    if request.method not in ('GET', 'HEAD'):
+        return await invalidate_rooms_after(proxy_request(request, 'room', path))
+    if ROOM_CACHE_ENABLED:
+        return await cached_room_get(request, path)
+    return await proxy_request(request, 'room', path)
+
+async def booking_root(request):
+    return await proxy_request(request, 'booking', '/api/bookings')
+
+async def booking_availability(request):
+    return await proxy_request(request, 'booking', '/api/bookings/availability')
+
+async def booking_bulk(request):
+    return await proxy_request(request, 'booking', '/api/bookings/bulk')
+
+async def booking_id_route(request):
+    return await proxy_request(request, 'booking', f"/api/bookings/{request.path_params['booking_id']}")
+
+async def healthz(request):
+    return JSONResponse({"ok": True})
+
+async def compression_stats(request):
+    return JSONResponse(compressed_cache.stats())
+
+async def room_cache_stats(request):
+    return JSONResponse(room_cache.stats())
+
+async def upstream_stats(request):
+    return JSONResponse({breaker.name: breaker.stats() for breaker in _breakers_by_url.values()})
+
+async def metrics_endpoint(request):
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    for name, url in SERVICES.items():
+        CLIENTS[name] = make_client(url)
+    watcher = asyncio.create_task(watch_catalog_version()) if ROOM_CACHE_ENABLED else None
+    try:
+        yield
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        for client in CLIENTS.values():
+            await client.aclose()
+        CLIENTS.clear()
+
+
+routes = [
+    Route('/api/auth/register', auth_register, methods=['POST']),
+    Route('/api/auth/refresh', auth_refresh, methods=['POST']),
+    Route('/api/auth/logout', auth_logout, methods=['POST']),
+    Route('/api/protected/me', auth_me, methods=['GET']),
+    Route('/api/auth/{path:path}', auth_route, methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH']),
+    Route('/api/rooms', room_root, methods=['GET', 'POST']),
+    Route('/api/rooms/{room_id:int}', room_id_route, methods=['GET', 'PUT', 'DELETE']),
+    Route('/api/bookings', booking_root, methods=['GET', 'POST']),
+    Route('/api/bookings/availability', booking_availability, methods=['GET']),
+    Route('/api/bookings/bulk', booking_bulk, methods=['POST']),
+    Route('/api/bookings/{booking_id:int}', booking_id_route, methods=['GET', 'PUT', 'DELETE']),
+    Route('/healthz', healthz, methods=['GET']),
+    Route('/healthz/compression', compression_stats, methods=['GET']),
+    Route('/healthz/room-cache', room_cache_stats, methods=['GET']),
+    Route('/healthz/upstreams', upstream_stats, methods=['GET']),
+    Route('/metrics', metrics_endpoint, methods=['GET']),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(MetricsMiddleware),
+                Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'],
+                           expose_headers=['X-Next-Cursor', 'X-Next-Offset', 'Link', 'X-Degraded'])],
+    lifespan=lifespan,
+)
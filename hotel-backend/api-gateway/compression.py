@@ -0,0 +1,163 @@
+# compression.py
+# Response compression for the gateway, shared by app.py and asgi.py.
+#
+# The encoding is negotiated from Accept-Encoding (br preferred, then
+# gzip). Bodies the upstream already encoded, bodies below
+# COMPRESS_MIN_SIZE, non-text types and no-transform responses pass
+# through untouched. Responses with an ETag are compressed once, at a
+# higher level, and the result is reused for every later request of the
+# same URL and ETag.
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip is offered
+    brotli = None
+
+COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', '1') == '1'
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+# Larger (or unknown-length) bodies are compressed chunk by chunk while streaming
+COMPRESS_BUFFER_MAX = int(os.getenv('COMPRESS_BUFFER_MAX', str(1024 * 1024)))
+COMPRESS_CACHE_BYTES = int(os.getenv('COMPRESS_CACHE_BYTES', str(32 * 1024 * 1024)))
+# Per-request work stays cheap; bodies compressed once for the cache can afford more
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '5'))
+GZIP_CACHED_LEVEL = int(os.getenv('GZIP_CACHED_LEVEL', '9'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))
+BROTLI_CACHED_QUALITY = int(os.getenv('BROTLI_CACHED_QUALITY', '9'))
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml',
+                      'image/svg+xml')
+# Encodings this gateway can produce, in order of preference
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+_CODING = re.compile(r'\s*([A-Za-z0-9*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*')
+
+
+def negotiate(accept_encoding):
+    """Best encoding the client accepts, or None for identity."""
+    if not COMPRESS_ENABLED or not accept_encoding:
+        return None
+    qualities = {}
+    for part in accept_encoding.split(','):
+        match = _CODING.fullmatch(part)
+        if not match:
+            continue
+        try:
+            q = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        qualities[match.group(1).lower()] = q
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = qualities.get(encoding, qualities.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def should_compress(method, status, headers):
+    """headers: the upstream response headers (any case-insensitive mapping)."""
+    if method == 'HEAD' or status < 200 or status in (204, 206, 304):
+        return False
+    if headers.get('content-encoding', 'identity').lower() != 'identity':
+        return False  # already encoded upstream: pass through
+    if 'no-transform' in headers.get('cache-control', '').lower():
+        return False
+    content_type = headers.get('content-type', '').lower()
+    if not content_type.startswith(COMPRESSIBLE_TYPES):
+        return False
+    length = headers.get('content-length')
+    if length is not None and length.isdigit() and int(length) < COMPRESS_MIN_SIZE:
+        return False
+    return True
+
+
+def compress(body, encoding, cached=False):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_CACHED_QUALITY if cached else BROTLI_QUALITY)
+    level = GZIP_CACHED_LEVEL if cached else GZIP_LEVEL
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+class StreamCompressor:
+    """Incremental compressor; compress() and flush() return bytes to send."""
+
+    def __init__(self, encoding):
+        if encoding == 'br':
+            c = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.flush = c.process, c.finish
+        else:
+            c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress, self.flush = c.compress, c.flush
+
+
+class CompressedBodyCache:
+    """(url, etag, encoding) -> compressed bytes, LRU bounded by total size."""
+
+    def __init__(self, max_bytes=COMPRESS_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def cacheable(headers):
+    """Only bodies with a validator, and not marked private/no-store, are reused."""
+    if not headers.get('etag'):
+        return False
+    cache_control = headers.get('cache-control', '').lower()
+    return 'no-store' not in cache_control and 'private' not in cache_control
+
+
+def weak_etag(etag):
+    # The encoded bytes differ from the upstream representation
+    return etag if etag.startswith('W/') else f'W/{etag}'
+
+
+def strong_if_none_match(value):
+    """If-None-Match uses weak comparison, so W/ can be dropped for upstreams
+    that only compare strong tags."""
+    return value.replace('W/', '')
+
+
+def add_vary(value):
+    if not value:
+        return 'Accept-Encoding'
+    if 'accept-encoding' in value.lower() or value.strip() == '*':
+        return value
+    return f'{value}, Accept-Encoding'
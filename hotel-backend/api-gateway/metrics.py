@@ -0,0 +1,337 @@
+# metrics.py
+# Request, upstream, SQL and cache metrics in the Prometheus text format,
+# served on /metrics next to /healthz.
+#
+# Each worker keeps its counters and histograms in memory (one dict update
+# under a lock per observation) and writes a snapshot to METRICS_DIR every
+# METRICS_FLUSH_INTERVAL seconds. /metrics merges the snapshots of every
+# worker started by the same gunicorn/uvicorn master, so a scrape covers
+# the whole service whichever worker answers it; other workers' numbers
+# are at most one interval old. Counters of exited workers are kept, their
+# in-flight gauges are not. With METRICS_DIR empty only the answering
+# worker is reported.
+#
+# Keep this file identical in every service (bench/check_shared_modules.py).
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+
+try:
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+except ImportError:  # the gateway has no database
+    Engine = None
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'hotel-metrics'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by route, method and status.', None),
+    'http_request_duration_seconds': ('histogram', 'Time until the response headers were ready.',
+                                      LATENCY_BUCKETS),
+    'http_requests_in_flight': ('gauge', 'Requests being handled.', None),
+    'upstream_requests_total': ('counter', 'Calls to other services by upstream and status.', None),
+    'upstream_request_duration_seconds': ('histogram', 'Time until the upstream response arrived.',
+                                          LATENCY_BUCKETS),
+    'upstream_rejected_total': ('counter', 'Calls not made: circuit open or deadline too close.', None),
+    'circuit_breaker_open': ('gauge', 'Workers whose circuit breaker for the upstream is not closed.', None),
+    'replicated_events_total': ('counter', 'Change events from other services applied to local copies.', None),
+    'db_queries_per_request': ('histogram', 'SQL statements executed per request.', QUERY_COUNT_BUCKETS),
+    'db_time_per_request_seconds': ('histogram', 'Time spent in SQL statements per request.',
+                                    LATENCY_BUCKETS),
+    'db_query_duration_seconds': ('histogram', 'Duration of single SQL statements.', LATENCY_BUCKETS),
+    'cache_hits_total': ('counter', 'In-process cache hits.', None),
+    'cache_misses_total': ('counter', 'In-process cache misses.', None),
+    'cache_hit_ratio': ('gauge', 'Hits / (hits + misses) since start.', None),
+}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._gauges = {}
+        self._histograms = {}  # (name, labels) -> [per-bucket counts..., +Inf count, sum]
+        self._caches = []      # (name, stats(), hit keys, miss keys)
+        self._flusher_pid = None
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        index = bisect_left(buckets, value)
+        key = (name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            hist[index] += 1
+            hist[-1] += value
+
+    def register_cache(self, name, stats, hits=('hits',), misses=('misses',)):
+        """stats() -> dict; the hit and miss keys are summed into cache_*_total."""
+        self._caches.append((name, stats, hits, misses))
+
+    def snapshot(self):
+        counters = []
+        for name, stats, hits, misses in self._caches:
+            values = stats()
+            labels = (('cache', name),)
+            counters.append(['cache_hits_total', labels, sum(values.get(k, 0) for k in hits)])
+            counters.append(['cache_misses_total', labels, sum(values.get(k, 0) for k in misses)])
+        with self._lock:
+            counters += [[name, labels, value] for (name, labels), value in self._counters.items()]
+            return {
+                'pid': os.getpid(),
+                'counters': counters,
+                'gauges': [[name, labels, value] for (name, labels), value in self._gauges.items()],
+                'histograms': [[name, labels, list(hist)] for (name, labels), hist in self._histograms.items()],
+            }
+
+    # --- cross-worker snapshots ---
+
+    def _dir(self):
+        # One directory per master, so restarts never mix with old workers
+        return os.path.join(METRICS_DIR, str(os.getppid()))
+
+    def ensure_flusher(self):
+        pid = os.getpid()
+        if not METRICS_DIR or self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError:
+                pass  # next interval retries; /metrics still reports this worker
+
+    def flush(self):
+        directory = self._dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(path + '.tmp', path)
+
+    def _snapshots(self):
+        own = self.snapshot()
+        snapshots = [own]
+        if not METRICS_DIR:
+            return snapshots
+        directory = self._dir()
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return snapshots
+        for name in names:
+            if not name.endswith('.json') or name == f'{own["pid"]}.json':
+                continue
+            try:
+                with open(os.path.join(directory, name)) as fh:
+                    snapshots.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self):
+        counters, gauges, histograms = {}, {}, {}
+        for snap in self._snapshots():
+            live = snap['pid'] == os.getpid() or _alive(snap['pid'])
+            for name, labels, value in snap['counters']:
+                key = (name, _labels(labels))
+                counters[key] = counters.get(key, 0) + value
+            if live:
+                for name, labels, value in snap['gauges']:
+                    key = (name, _labels(labels))
+                    gauges[key] = gauges.get(key, 0) + value
+            for name, labels, hist in snap['histograms']:
+                key = (name, _labels(labels))
+                merged = histograms.get(key)
+                if merged is None or len(merged) != len(hist):
+                    histograms[key] = list(hist)
+                else:
+                    histograms[key] = [a + b for a, b in zip(merged, hist)]
+        for (name, labels), hits in list(counters.items()):
+            if name == 'cache_hits_total':
+                lookups = hits + counters.get(('cache_misses_total', labels), 0)
+                gauges[('cache_hit_ratio', labels)] = round(hits / lookups, 4) if lookups else 0.0
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            source = histograms if kind == 'histogram' else counters if kind == 'counter' else gauges
+            series = sorted((labels, value) for (n, labels), value in source.items() if n == name)
+            if not series:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in series:
+                if kind != 'histogram':
+                    lines.append(f'{name}{_format(labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _number(bound)
+                    lines.append(f'{name}_bucket{_format(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{name}_sum{_format(labels)} {_number(value[-1])}')
+                lines.append(f'{name}_count{_format(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(pairs):
+    return tuple((k, v) for k, v in pairs)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def _number(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+# One registry per process
+metrics = Registry()
+
+
+def observe_upstream(upstream, status, seconds):
+    """status: the HTTP status, or 'error' when no response arrived."""
+    if not METRICS_ENABLED:
+        return
+    metrics.inc('upstream_requests_total', (('upstream', upstream), ('status', str(status))))
+    metrics.observe('upstream_request_duration_seconds', (('upstream', upstream),), seconds)
+
+
+def observe_request(route, method, status, seconds, queries=None, db_seconds=None):
+    metrics.inc('http_requests_total', (('route', route), ('method', method), ('status', str(status))))
+    labels = (('route', route), ('method', method))
+    metrics.observe('http_request_duration_seconds', labels, seconds)
+    if queries is not None:
+        metrics.observe('db_queries_per_request', (('route', route),), queries)
+        metrics.observe('db_time_per_request_seconds', (('route', route),), db_seconds)
+
+
+def metrics_response():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_flask(app):
+    """Time every request of a Flask app and add the /metrics route."""
+    app.add_url_rule('/metrics', 'metrics', metrics_response)
+    if not METRICS_ENABLED:
+        return
+
+    def start():
+        metrics.ensure_flusher()
+        metrics.add('http_requests_in_flight')
+        # [started, SQL statements, SQL seconds]; updated by the engine hooks below
+        g._metrics = [time.perf_counter(), 0, 0.0]
+
+    def status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    def finish(exc):
+        state = g.pop('_metrics', None)
+        if state is None:
+            return
+        metrics.add('http_requests_in_flight', (), -1)
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        # Only services with a database report the per-request SQL histograms
+        queries = state[1] if 'sqlalchemy' in app.extensions else None
+        observe_request(route, request.method, g.pop('_metrics_status', 500),
+                        time.perf_counter() - state[0], queries, state[2])
+
+    # Ahead of any other hook, so requests those reject are timed too
+    app.before_request_funcs.setdefault(None, []).insert(0, start)
+    app.after_request(status)
+    app.teardown_request(finish)
+
+
+class MetricsMiddleware:
+    """ASGI counterpart of init_flask; serve metrics.render() on /metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        metrics.ensure_flusher()
+        metrics.add('http_requests_in_flight')
+        started = time.perf_counter()
+        state = {'status': 500, 'seconds': None}
+
+        async def timed_send(message):
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+                state['seconds'] = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            metrics.add('http_requests_in_flight', (), -1)
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            seconds = state['seconds'] if state['seconds'] is not None else time.perf_counter() - started
+            observe_request(route, scope['method'], state['status'], seconds)
+
+
+if Engine is not None and METRICS_ENABLED:
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _query_started(conn, cursor, statement, parameters, context, executemany):
+        conn.info['metrics_query_started'] = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _query_finished(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('metrics_query_started', None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        metrics.observe('db_query_duration_seconds', (), seconds)
+        if has_request_context():
+            state = g.get('_metrics')
+            if state is not None:
+                state[1] += 1
+                state[2] += seconds
@@ -0,0 +1,271 @@
+# response_cache.py
+# Shared cache of room-service GET responses, used by app.py and asgi.py.
+#
+# Room listings and room details are the same for every authenticated
+# user, so entries are keyed by path and normalized query string only; the
+# token is still verified by the gateway before the cache is consulted.
+# Entries are fresh for ROOM_CACHE_TTL seconds and may then be served for
+# ROOM_CACHE_STALE more seconds while one background request revalidates
+# them with If-None-Match (a 304 from room-service just renews the entry).
+# Concurrent misses for the same key wait for a single upstream call.
+#
+# Room writes that pass through this gateway worker clear the cache at
+# once. Writes through other workers, replicas or straight to room-service
+# bump its catalog version, which a background watcher in every worker
+# reads once per ROOM_CACHE_TTL (never on the request path), clearing the
+# cache when it moved. Hits are served from memory without any upstream
+# call, and whatever a worker serves was current at most about
+# ROOM_CACHE_TTL ago. While room-service cannot be asked, entries expire by
+# age alone.
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode
+
+ROOM_CACHE_ENABLED = os.getenv('ROOM_CACHE_ENABLED', '1') == '1'
+ROOM_CACHE_TTL = float(os.getenv('ROOM_CACHE_TTL', '5'))
+ROOM_CACHE_STALE = float(os.getenv('ROOM_CACHE_STALE', '30'))
+ROOM_CACHE_BYTES = int(os.getenv('ROOM_CACHE_BYTES', str(16 * 1024 * 1024)))
+# Larger bodies are passed through uncached
+ROOM_CACHE_MAX_ENTRY = int(os.getenv('ROOM_CACHE_MAX_ENTRY', str(2 * 1024 * 1024)))
+# Waiters give up on a coalesced fill after this long and go upstream themselves
+ROOM_CACHE_WAIT = float(os.getenv('ROOM_CACHE_WAIT', '10'))
+
+# Rough per-entry cost of the key, headers and bookkeeping
+ENTRY_OVERHEAD = 512
+# Response headers never stored with an entry
+UNSTORED_HEADERS = {'content-length', 'content-encoding', 'transfer-encoding', 'connection',
+                    'keep-alive', 'date', 'server'}
+
+
+def cache_key(path, query_string):
+    """path?query with the query pairs sorted, so parameter order does not matter."""
+    if isinstance(query_string, bytes):
+        query_string = query_string.decode('latin-1')
+    pairs = sorted(parse_qsl(query_string, keep_blank_values=True))
+    return f'{path}?{urlencode(pairs)}' if pairs else path
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against one entity tag."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    wanted = etag[2:] if etag.startswith('W/') else etag
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith('W/') else tag) == wanted:
+            return True
+    return False
+
+
+class CachedResponse:
+    """A buffered upstream response and, once stored, its compressed variants."""
+
+    def __init__(self, key, status, headers, body, stored_at=None):
+        self.key = key
+        self.status = status
+        self.headers = headers  # [(name, value)] without UNSTORED_HEADERS
+        self.body = body
+        self.stored_at = time.time() if stored_at is None else stored_at
+        self.lookup = {name.lower(): value for name, value in headers}
+        self.lookup['content-length'] = str(len(body))
+        self.etag = self.lookup.get('etag')
+        self.variants = {}  # encoding -> compressed body
+
+    @classmethod
+    def from_upstream(cls, key, status, raw_headers, body):
+        headers = [(name, value) for name, value in raw_headers if name.lower() not in UNSTORED_HEADERS]
+        return cls(key, status, headers, body)
+
+    def renewed(self):
+        # Same representation, confirmed by a 304
+        entry = CachedResponse(self.key, self.status, self.headers, self.body)
+        entry.variants = dict(self.variants)
+        return entry
+
+    @property
+    def storable(self):
+        cache_control = self.lookup.get('cache-control', '').lower()
+        return (self.status == 200
+                and 'no-store' not in cache_control and 'private' not in cache_control
+                and 'set-cookie' not in self.lookup
+                and self.lookup.get('vary', '').strip() != '*'
+                and len(self.body) <= ROOM_CACHE_MAX_ENTRY)
+
+    @property
+    def size(self):
+        return ENTRY_OVERHEAD + len(self.body) + sum(len(b) for b in self.variants.values())
+
+    def age(self, now=None):
+        return max(0, int((now or time.time()) - self.stored_at))
+
+
+class ResponseCache:
+    """key -> CachedResponse, LRU bounded by total bytes.
+
+    Invalidation bumps a generation counter; a fill that started before an
+    invalidation is not stored, so it cannot bring back pre-write data.
+    """
+
+    def __init__(self, max_bytes=ROOM_CACHE_BYTES, ttl=ROOM_CACHE_TTL, stale=ROOM_CACHE_STALE):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale = stale
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.revalidated = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.catalog_version = None  # last version room-service reported
+        self.version_checks = 0
+
+    def version_checked(self, version):
+        """Record a check's result (None if it failed); clears the cache when the version moved."""
+        with self._lock:
+            if version is None:
+                return False
+            self.version_checks += 1
+            changed = version != self.catalog_version
+            self.catalog_version = version
+        if changed:
+            # Fills that started before this are not stored either
+            self.invalidate()
+        return changed
+
+    def get(self, key):
+        """(entry, state): state is 'fresh', 'stale', 'expired' or 'miss'.
+
+        Expired entries are still returned so the refill can send their ETag.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, 'miss'
+            age = now - entry.stored_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry, 'fresh'
+            if age < self.ttl + self.stale:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return entry, 'stale'
+            self.misses += 1
+            return entry, 'expired'
+
+    def put(self, entry, generation, revalidated=False):
+        if not entry.storable:
+            return False
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self._remove(entry.key)
+            self._entries[entry.key] = entry
+            self._bytes += entry.size
+            if revalidated:
+                self.revalidated += 1
+            else:
+                self.fills += 1
+            self._evict()
+            return True
+
+    def add_variant(self, entry, encoding, body):
+        with self._lock:
+            if encoding in entry.variants:
+                return
+            entry.variants[encoding] = body
+            if self._entries.get(entry.key) is entry:
+                self._bytes += len(body)
+                self._evict()
+
+    def discard(self, key, generation):
+        # Upstream stopped serving this representation (e.g. the room is gone)
+        with self._lock:
+            if generation == self.generation:
+                self._remove(key)
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+            self.invalidations += 1
+
+    def count_coalesced(self):
+        with self._lock:
+            self.coalesced += 1
+
+    def _remove(self, key):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "stale": self.stale,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "fills": self.fills,
+                "revalidated": self.revalidated,
+                "coalesced": self.coalesced,
+                "invalidations": self.invalidations,
+                "catalog_version": self.catalog_version,
+                "version_checks": self.version_checks,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+class Flights:
+    """One in-flight upstream fill per key; other threads wait for its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def join(self, key):
+        """(flight, leader). The leader must call finish(key, result)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def finish(self, key, result):
+        with self._lock:
+            flight = self._flights.pop(key, None)
+        if flight is not None:
+            flight.result = result
+            flight.done.set()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+    def wait(self, timeout=ROOM_CACHE_WAIT):
+        return self.result if self.done.wait(timeout) else None
@@ -0,0 +1,71 @@
+# token_cache.py
+# Bounded cache of access tokens the gateway has already verified.
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Header carrying verified claims to the services; always stripped from client input
+CLAIMS_HEADER = 'X-Verified-Claims'
+
+
+class VerifiedTokenCache:
+    """Maps a full encoded token to its claims until the token's exp.
+
+    The whole token is the key, not just its signature segment, so a token
+    with a tampered header or payload can never hit an entry.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # token -> (exp, claims)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token, claims):
+        exp = claims.get('exp')
+        if not exp:
+            return
+        with self._lock:
+            self._entries[token] = (float(exp), claims)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def bearer_token(auth_header):
+    parts = (auth_header or '').split()
+    if len(parts) == 2 and parts[0] == 'Bearer':
+        return parts[1]
+    return None
+
+
+def encode_claims(claims):
+    raw = json.dumps(claims, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode()
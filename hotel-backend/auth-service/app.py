@@ -3,17 +3,22 @@ import os
 from datetime import timedelta
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from flask_jwt_extended import (
-    JWTManager, create_access_token, create_refresh_token,
-    jwt_required, get_jwt_identity, get_jwt
-)
+from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token
+from database import configure_database
+from metrics import init_flask
+from resilience import init_deadline
 from models import db, User  # assumes models.py defines SQLAlchemy db and User
+from passwords import PasswordPoolBusy
+from tokens import init_tokens
 
 app = Flask(__name__)
+init_flask(app)
+init_deadline(app, error_key='msg')
 
 # --- Core config (now env-driven) ---
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///auth.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite by default; set SQLALCHEMY_DATABASE_URI (or DATABASE_URL) to a
+# postgresql:// URL in production. Pool and timeouts: see database.py
+configure_database(app, 'sqlite:///auth.db', 'auth-service')
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'Shivang100@')
 
 # --- Token expirations ---
@@ -25,10 +30,16 @@ jwt = JWTManager(app)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
 
+# Schema is managed by migrate.py, which runs before the workers start
 with app.app_context():
-    db.create_all()
+    # refresh, logout and /api/protected/me; token_app.py serves the same
+    # routes without the user and password machinery
+    init_tokens(app, jwt, db.engine)
 
 
+def busy_response():
+    return jsonify({'msg': 'Authentication is busy, please retry'}), 503, {'Retry-After': '1'}
+
 @app.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.get_json() or {}
@@ -40,7 +51,10 @@ def register():
     if User.query.filter_by(username=username).first():
         return jsonify({'msg': 'Username already exists'}), 400
     user = User(username=username, email=email, role=data.get('role', 'customer'))
-    user.set_password(password)
+    try:
+        user.set_password(password)
+    except PasswordPoolBusy:
+        return busy_response()
     db.session.add(user)
     db.session.commit()
     access_token  = create_access_token(identity=str(user.id),
@@ -61,7 +75,13 @@ def login():
     username = (data.get('username') or '').strip().lower()
     password = data.get('password') or ''
     user = User.query.filter_by(username=username).first()
-    if user and user.check_password(password):
+    try:
+        valid = bool(user) and user.check_password(password)
+    except PasswordPoolBusy:
+        return busy_response()
+    if valid:
+        if db.session.is_modified(user):
+            db.session.commit()  # rehashed with current parameters
         access_token  = create_access_token(identity=str(user.id),
                                             additional_claims={"role": user.role, "email": user.email})
         refresh_token = create_refresh_token(identity=str(user.id),
@@ -73,29 +93,13 @@ def login():
         }), 200
     return jsonify({'msg': 'Invalid username or password'}), 401
 
-@app.route('/api/auth/refresh', methods=['POST'])
-@jwt_required(refresh=True)
-def refresh():
-    user_id = get_jwt_identity()
-    claims  = get_jwt()
-    new_access = create_access_token(
-        identity=user_id,
-        additional_claims={"role": claims.get("role"), "email": claims.get("email")}
-    )
-    return jsonify(access_token=new_access), 200
-
-@app.route('/api/protected/me', methods=['GET'])
-@jwt_required()
-def me():
-    user_id = get_jwt_identity()
-    claims  = get_jwt()
-    return jsonify({"id": user_id, "role": claims.get('role'), "email": claims.get('email')}), 200
-
 @app.get('/healthz')
 def healthz():
     return {"ok": True}, 200
 
 if __name__ == '__main__':
+    # Local runs only; deployments run migrate.py as a separate step
+    from migrate import upgrade
     with app.app_context():
-        db.create_all()
+        upgrade(db.engine)
     app.run(port=5001, debug=True)
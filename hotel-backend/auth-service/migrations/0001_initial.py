@@ -0,0 +1,18 @@
+# The user table as db.create_all() used to create it. Existing databases
+# already have it and only get the version recorded.
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+user = Table(
+    'user', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(80), unique=True, nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password_hash', String(128), nullable=False),
+    Column('role', String(20)),
+)
+
+
+def upgrade(conn):
+    user.create(conn, checkfirst=True)
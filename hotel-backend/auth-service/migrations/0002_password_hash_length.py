@@ -0,0 +1,8 @@
+# scrypt hashes do not fit in 128 characters. SQLite ignores VARCHAR
+# lengths, so only PostgreSQL needs the ALTER.
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('ALTER TABLE "user" ALTER COLUMN password_hash TYPE VARCHAR(255)'))
@@ -0,0 +1,15 @@
+# Refresh-token revocations synced by revocation.py
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+revoked_tokens = Table(
+    'revoked_tokens', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('jti', String(64), unique=True, nullable=False),
+    Column('expires_at', DateTime, nullable=False, index=True),
+)
+
+
+def upgrade(conn):
+    revoked_tokens.create(conn, checkfirst=True)
@@ -0,0 +1,3 @@
+# auth-service schema migrations, applied by migrate.py
+SERVICE = 'auth'
+DEFAULT_DATABASE_URI = 'sqlite:///auth.db'
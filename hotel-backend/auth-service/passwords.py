@@ -0,0 +1,94 @@
+# passwords.py
+# Password hashing off the request thread.
+#
+# The KDF runs in a small per-worker process pool so a burst of logins
+# cannot occupy every gunicorn worker's CPU. At most
+# PASSWORD_POOL_MAX_PENDING hashes may be queued or running per worker;
+# beyond that callers get PasswordPoolBusy and should answer 503.
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Any werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+# 0 hashes inline on the request thread (handy for local runs and tests)
+PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', '2'))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv('PASSWORD_POOL_MAX_PENDING', '16'))
+PASSWORD_POOL_TIMEOUT = float(os.getenv('PASSWORD_POOL_TIMEOUT', '10'))
+
+
+class PasswordPoolBusy(Exception):
+    """Too many hashes queued; the caller should shed load."""
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, PASSWORD_POOL_MAX_PENDING))
+# method -> canonical prefix, filled inside the pool processes
+_canonical_methods = {}
+
+
+def _executor():
+    # One pool per process: gunicorn forks workers after import
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_POOL_WORKERS)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _run(fn, *args):
+    if PASSWORD_POOL_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise PasswordPoolBusy()
+    try:
+        future = _executor().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=PASSWORD_POOL_TIMEOUT)
+    except FutureTimeout:
+        raise PasswordPoolBusy()
+
+
+def canonical_method(method=PASSWORD_HASH_METHOD):
+    """The method prefix werkzeug writes for method, e.g. 'scrypt:32768:8:1'.
+
+    Finding it costs one full hash per process, so it is only called from
+    the functions that run in the pool.
+    """
+    prefix = _canonical_methods.get(method)
+    if prefix is None:
+        prefix = _canonical_methods[method] = generate_password_hash('', method=method).split('$', 1)[0]
+    return prefix
+
+
+def needs_rehash(stored_hash, method=PASSWORD_HASH_METHOD):
+    return stored_hash.split('$', 1)[0] != canonical_method(method)
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored_hash, password, method):
+    ok = check_password_hash(stored_hash, password)
+    new_hash = generate_password_hash(password, method=method) if ok and needs_rehash(stored_hash, method) else None
+    return ok, new_hash
+
+
+def hash_password(password):
+    return _run(_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(stored_hash, password):
+    """Return (ok, new_hash). new_hash is set when the stored parameters are outdated."""
+    return _run(_verify, stored_hash, password, PASSWORD_HASH_METHOD)
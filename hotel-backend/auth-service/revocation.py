@@ -0,0 +1,138 @@
+# revocation.py
+# In-memory set of revoked refresh-token JTIs, kept in sync with the
+# revoked_tokens table in batches.
+#
+# Lookups never touch the database. A background thread per worker writes
+# locally revoked JTIs and pulls rows written by other workers every
+# REVOCATION_SYNC_INTERVAL seconds, so a logout is effective at once in the
+# worker that handled it and within about two intervals everywhere else.
+# The only database read on the request path is one catch-up per worker.
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, insert, select
+
+REVOCATION_SYNC_INTERVAL = float(os.getenv('REVOCATION_SYNC_INTERVAL', '2'))
+REVOCATION_BATCH_SIZE = int(os.getenv('REVOCATION_BATCH_SIZE', '500'))
+# Incremental syncs read by id; a periodic full reload also picks up rows
+# whose transaction committed out of id order
+REVOCATION_FULL_SYNC_EVERY = int(os.getenv('REVOCATION_FULL_SYNC_EVERY', '30'))
+
+log = logging.getLogger(__name__)
+
+
+class RevocationSet:
+    def __init__(self, table, interval=REVOCATION_SYNC_INTERVAL, batch_size=REVOCATION_BATCH_SIZE):
+        self.table = table
+        self.interval = interval
+        self.batch_size = batch_size
+        self.engine = None
+        self._revoked = {}  # jti -> expiry (unix seconds)
+        self._pending = {}
+        self._last_id = 0
+        self._syncs = 0
+        self._lock = threading.Lock()
+        self._thread_pid = None
+
+    def bind(self, engine):
+        """Attach the engine and load what is already revoked."""
+        self.engine = engine
+        try:
+            self.sync()
+        except Exception as e:
+            # Table not created yet; the sync thread keeps retrying
+            log.warning('revocation list not loaded: %s', e)
+
+    def _ensure_thread(self):
+        # gunicorn forks after import: every worker needs its own thread
+        # and must not reuse connections opened by the parent
+        pid = os.getpid()
+        if self._thread_pid == pid or self.engine is None:
+            return
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            self._thread_pid = pid
+        self.engine.dispose(close=False)
+        # Catch up once with whatever was revoked since the parent loaded
+        try:
+            self.sync()
+        except Exception as e:
+            log.warning('revocation sync failed: %s', e)
+        threading.Thread(target=self._loop, name='revocation-sync', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sync()
+            except Exception as e:
+                log.warning('revocation sync failed: %s', e)
+
+    def is_revoked(self, jti):
+        self._ensure_thread()
+        return jti in self._revoked
+
+    def revoke(self, jti, expires_at):
+        self._ensure_thread()
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._pending[jti] = expires_at
+
+    def flush(self):
+        """Write locally revoked JTIs in batches."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        items = list(pending.items())
+        try:
+            for i in range(0, len(items), self.batch_size):
+                rows = [{'jti': jti, 'expires_at': _to_datetime(exp)}
+                        for jti, exp in items[i:i + self.batch_size]]
+                with self.engine.begin() as conn:
+                    existing = set(conn.execute(
+                        select(self.table.c.jti).where(self.table.c.jti.in_([r['jti'] for r in rows]))).scalars())
+                    rows = [r for r in rows if r['jti'] not in existing]
+                    if rows:
+                        conn.execute(insert(self.table), rows)
+        except Exception:
+            with self._lock:
+                for jti, exp in pending.items():
+                    self._pending.setdefault(jti, exp)
+            raise
+
+    def sync(self):
+        self.flush()
+        now = time.time()
+        full = self._syncs % REVOCATION_FULL_SYNC_EVERY == 0
+        self._syncs += 1
+        query = select(self.table.c.id, self.table.c.jti, self.table.c.expires_at)
+        if not full:
+            query = query.where(self.table.c.id > self._last_id)
+        with self.engine.begin() as conn:
+            rows = conn.execute(query.order_by(self.table.c.id)).all()
+            if full:
+                # Expired tokens fail verification anyway; keep the table small
+                conn.execute(delete(self.table).where(self.table.c.expires_at < _to_datetime(now)))
+        with self._lock:
+            for row_id, jti, expires_at in rows:
+                self._revoked[jti] = _to_timestamp(expires_at)
+                self._last_id = max(self._last_id, row_id)
+            for jti in [j for j, exp in self._revoked.items() if exp < now]:
+                del self._revoked[jti]
+
+    def stats(self):
+        return {'revoked': len(self._revoked), 'pending': len(self._pending), 'last_id': self._last_id}
+
+
+def _to_datetime(ts):
+    # Stored naive UTC, like the rest of the schema
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)
+
+
+def _to_timestamp(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
@@ -0,0 +1,42 @@
+# auth-service token_app.py
+# Lightweight entry point for the token routes only (refresh, logout,
+# /api/protected/me). It shares config and the revocation table with
+# app.py but never loads users or hashes passwords, so its latency does
+# not depend on login traffic. Point the gateway's AUTH_TOKEN_URL at it:
+#   gunicorn token_app:app --bind 0.0.0.0:5004 --workers 2
+import os
+from datetime import timedelta
+from flask import Flask
+from flask_cors import CORS
+from flask_jwt_extended import JWTManager
+from database import configure_database
+from metrics import init_flask
+from resilience import init_deadline
+from models import db
+from tokens import init_tokens
+
+app = Flask(__name__)
+init_flask(app)
+init_deadline(app, error_key='msg')
+
+configure_database(app, 'sqlite:///auth.db', 'auth-token')
+app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'Shivang100@')
+app.config['JWT_ACCESS_TOKEN_EXPIRES']  = timedelta(minutes=30)
+app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=7)
+
+# Only used for the engine behind the revocation sync
+db.init_app(app)
+jwt = JWTManager(app)
+CORS(app, resources={r"/api/*": {"origins": "*"}})
+
+with app.app_context():
+    init_tokens(app, jwt, db.engine)
+
+
+@app.get('/healthz')
+def healthz():
+    return {"ok": True}, 200
+
+
+if __name__ == '__main__':
+    app.run(port=5004, debug=True)
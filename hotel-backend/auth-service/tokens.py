@@ -0,0 +1,60 @@
+# tokens.py
+# Token routes that only need the JWT itself: refresh, me and logout.
+#
+# Registered on the main app and on token_app.py, which serves them from
+# workers that never load users or touch the password pool. The only
+# state is the in-memory revocation set for refresh tokens.
+from flask import Blueprint, jsonify
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, jwt_required
+
+from models import RevokedToken
+from revocation import RevocationSet
+
+tokens = Blueprint('tokens', __name__)
+revoked_tokens = RevocationSet(RevokedToken.__table__)
+
+
+def init_tokens(app, jwt, engine):
+    """Register the token routes and the refresh-token revocation check."""
+    revoked_tokens.bind(engine)
+
+    @jwt.token_in_blocklist_loader
+    def is_revoked(jwt_header, jwt_payload):
+        # Access tokens are short-lived and verified by every service
+        # without calling us, so only refresh tokens can be revoked
+        return jwt_payload.get('type') == 'refresh' and revoked_tokens.is_revoked(jwt_payload['jti'])
+
+    app.register_blueprint(tokens)
+
+
+@tokens.route('/api/auth/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    user_id = get_jwt_identity()
+    claims  = get_jwt()
+    new_access = create_access_token(
+        identity=user_id,
+        additional_claims={"role": claims.get("role"), "email": claims.get("email")}
+    )
+    return jsonify(access_token=new_access), 200
+
+
+@tokens.route('/api/auth/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    claims = get_jwt()
+    revoked_tokens.revoke(claims['jti'], claims['exp'])
+    return jsonify({'msg': 'Logged out'}), 200
+
+
+@tokens.route('/api/protected/me', methods=['GET'])
+@jwt_required()
+def me():
+    user_id = get_jwt_identity()
+    claims  = get_jwt()
+    return jsonify({"id": user_id, "role": claims.get('role'), "email": claims.get('email')}), 200
+
+
+@tokens.get('/healthz/revocations')
+def revocation_stats():
+    return revoked_tokens.stats(), 200
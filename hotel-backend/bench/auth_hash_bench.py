@@ -0,0 +1,148 @@
+# bench/auth_hash_bench.py
+# Logins per second per core for password hash settings.
+#
+#   python bench/auth_hash_bench.py                      # KDF only, in-process
+#   python bench/auth_hash_bench.py --http --duration 15 # through auth-service
+#
+# The --http mode starts auth-service under gunicorn, hammers
+# /api/auth/login and measures /api/auth/refresh latency at the same time,
+# so the effect of the password pool on other auth routes is visible.
+# With --token-app the refreshes go to a separate token_app.py process.
+#
+#   python bench/auth_hash_bench.py --http --token-app --methods scrypt:32768:8:1
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from harness import (free_port, gunicorn_cmd, migrate, service_dir, start_process, stop_processes,
+                     summarize, wait_healthy)
+
+DEFAULT_METHODS = 'scrypt:32768:8:1,pbkdf2:sha256:600000,pbkdf2:sha256:260000'
+
+
+def kdf_rate(method, seconds):
+    stored = generate_password_hash('correct horse battery staple', method=method)
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        check_password_hash(stored, 'correct horse battery staple')
+        count += 1
+    elapsed = time.perf_counter() - started
+    return {'method': method, 'verifications': count,
+            'per_core_per_s': round(count / elapsed, 2),
+            'ms_per_verification': round(elapsed / count * 1000, 2)}
+
+
+async def http_storm(base_url, refresh_url, concurrency, duration):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0,
+                                 limits=httpx.Limits(max_connections=concurrency + 4)) as client:
+        creds = {'username': 'benchuser', 'password': 'bench-password-1'}
+        resp = await client.post('/api/auth/register', json={**creds, 'email': 'bench@example.com'})
+        if resp.status_code not in (201, 400):
+            raise RuntimeError(f'register failed: {resp.status_code} {resp.text}')
+        resp = await client.post('/api/auth/login', json=creds)
+        refresh_headers = {'Authorization': f"Bearer {resp.json()['refresh_token']}"}
+
+        stop_at = time.perf_counter() + duration
+        login_lat, refresh_lat = [], []
+        statuses = {}
+        errors = 0
+
+        async def login_worker():
+            nonlocal errors
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    r = await client.post('/api/auth/login', json=creds)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+                if r.status_code == 200:
+                    login_lat.append(time.perf_counter() - started)
+
+        async def refresh_worker():
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    r = await client.post(f'{refresh_url}/api/auth/refresh', headers=refresh_headers)
+                    if r.status_code == 200:
+                        refresh_lat.append(time.perf_counter() - started)
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        await asyncio.gather(refresh_worker(), *(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    logins = summarize(login_lat, errors, elapsed)
+    logins['statuses'] = {str(k): v for k, v in sorted(statuses.items())}
+    logins['per_core_per_s'] = round(logins['rps'] / (os.cpu_count() or 1), 2)
+    return {'login': logins, 'refresh_during_storm': summarize(refresh_lat, 0, elapsed)}
+
+
+def run_http(method, args, workdir):
+    port = free_port()
+    env = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, method.replace(":", "_") + ".db")}',
+        'PASSWORD_HASH_METHOD': method,
+        'PASSWORD_POOL_WORKERS': str(args.pool_workers),
+        'PASSWORD_POOL_MAX_PENDING': str(args.max_pending),
+    }
+    migrate('auth-service', env)
+    procs = [start_process(gunicorn_cmd('app:app', port, workers=args.workers),
+                           service_dir('auth-service'), env, os.path.join(workdir, 'auth.log'))]
+    refresh_port = port
+    try:
+        wait_healthy(f'http://127.0.0.1:{port}/healthz')
+        if args.token_app:
+            refresh_port = free_port()
+            procs.append(start_process(gunicorn_cmd('token_app:app', refresh_port, workers=2),
+                                       service_dir('auth-service'), env, os.path.join(workdir, 'token.log')))
+            wait_healthy(f'http://127.0.0.1:{refresh_port}/healthz')
+        result = asyncio.run(http_storm(f'http://127.0.0.1:{port}', f'http://127.0.0.1:{refresh_port}',
+                                        args.concurrency, args.duration))
+    finally:
+        stop_processes(procs)
+    result['method'] = method
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Password hashing throughput benchmark')
+    parser.add_argument('--methods', default=DEFAULT_METHODS)
+    parser.add_argument('--seconds', type=float, default=3.0, help='per method, KDF mode')
+    parser.add_argument('--http', action='store_true')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--token-app', action='store_true', help='serve refresh from token_app.py')
+    parser.add_argument('--pool-workers', type=int, default=2)
+    parser.add_argument('--max-pending', type=int, default=16)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    methods = [m for m in args.methods.split(',') if m]
+    results = {'params': vars(args), 'cpu_count': os.cpu_count(),
+               'kdf': [kdf_rate(m, args.seconds) for m in methods]}
+    if args.http:
+        workdir = tempfile.mkdtemp(prefix='auth-bench-')
+        results['http'] = [run_http(m, args, workdir) for m in methods]
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# bench/booking_race.py
+# Concurrency stress test for booking creation: fire many parallel creates
+# for the same room and dates at a multi-worker booking-service and check
+# that exactly one succeeds. A second round books distinct rooms to show
+# throughput without contention. Exits non-zero if the invariant breaks.
+#
+#   python bench/booking_race.py --requests 300 --workers 4
+#   python bench/booking_race.py --database-uri postgresql+psycopg2://...
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from harness import (free_port, gunicorn_cmd, make_token, migrate, service_dir, start_process,
+                     stop_processes, summarize, wait_healthy)
+
+BILLING = {
+    'fullName': 'Race Tester', 'email': 'race@example.com', 'phone': '1234567890',
+    'address1': '1 Test Street', 'city': 'Pune', 'state': 'MH', 'postalCode': '411001',
+    'country': 'India',
+}
+
+
+async def fire(base_url, token, payloads, concurrency):
+    headers = {'Authorization': f'Bearer {token}'}
+    limits = httpx.Limits(max_connections=concurrency)
+    statuses = {}
+    latencies = []
+    errors = 0
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def one(payload):
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                resp = await client.post('/api/bookings', json=payload, headers=headers)
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(p) for p in payloads))
+        elapsed = time.perf_counter() - started
+    result = summarize(latencies, errors, elapsed)
+    result['statuses'] = {str(k): v for k, v in sorted(statuses.items())}
+    return result
+
+
+def payload(room_id):
+    return {'booking_mode': 'daily', 'room_id': room_id, 'check_in_date': '2030-01-10',
+            'check_out_date': '2030-01-12', 'billing': BILLING}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel booking creation stress test')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--database-uri', help='defaults to a fresh SQLite file')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='booking-race-')
+    db_uri = args.database_uri or f'sqlite:///{os.path.join(workdir, "bookings.db")}'
+    port = free_port()
+    env = {
+        'SQLALCHEMY_DATABASE_URI': db_uri,
+        # Enrichment is not under test; point it at a closed port and fail fast
+        'ROOMS_BASE_URL': f'http://127.0.0.1:{free_port()}',
+        'UPSTREAM_RETRIES': '0',
+        'BOOKING_LOCK_RETRIES': '50',
+    }
+    migrate('booking-service', env)
+    proc = start_process(gunicorn_cmd('app:app', port, workers=args.workers),
+                         service_dir('booking-service'), env, os.path.join(workdir, 'booking.log'))
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_healthy(f'{base_url}/healthz')
+        token = make_token(identity='1', role='customer')
+        same_slot = asyncio.run(fire(base_url, token, [payload(1)] * args.requests, args.concurrency))
+        distinct = asyncio.run(fire(base_url, token,
+                                    [payload(1000 + i) for i in range(args.requests)], args.concurrency))
+    finally:
+        stop_processes([proc])
+
+    results = {'params': vars(args), 'same_slot': same_slot, 'distinct_rooms': distinct}
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    print(text)
+
+    ok = same_slot['statuses'].get('201') == 1 and \
+        same_slot['statuses'].get('409', 0) == args.requests - 1 and \
+        distinct['statuses'].get('201') == args.requests
+    if not ok:
+        print(f'FAIL: expected exactly one 201 for the shared slot; logs in {workdir}', file=sys.stderr)
+        sys.exit(1)
+    print('OK: exactly one booking won the shared slot', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
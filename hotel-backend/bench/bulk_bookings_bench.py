@@ -0,0 +1,130 @@
+# bench/bulk_bookings_bench.py
+# Approving and cancelling many bookings: one PUT per booking versus
+# POST /api/bookings/bulk, against a real booking-service (enriching from
+# a real room-service) on SQLite.
+#
+#   python bench/bulk_bookings_bench.py --bookings 500
+#   python bench/bulk_bookings_bench.py --database-uri postgresql+psycopg2://...
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from harness import (free_port, gunicorn_cmd, make_token, migrate, service_dir, start_process,
+                     stop_processes, wait_healthy)
+from room_cache_bench import seed_rooms
+
+BILLING = {
+    'fullName': 'Bulk Tester', 'email': 'bulk@example.com', 'phone': '1234567890',
+    'address1': '1 Test Street', 'city': 'Pune', 'state': 'MH', 'postalCode': '411001',
+    'country': 'India',
+}
+
+
+async def create_bookings(client, count, rooms):
+    # One stay per room and night, so every booking is free to be re-activated later
+    async def one(i):
+        day = date(2031, 1, 1) + timedelta(days=i // rooms)
+        resp = await client.post('/api/bookings', json={
+            'booking_mode': 'daily', 'room_id': 1 + i % rooms,
+            'check_in_date': day.isoformat(), 'check_out_date': (day + timedelta(days=1)).isoformat(),
+            'billing': BILLING,
+        })
+        resp.raise_for_status()
+        return resp.json()['id']
+    sem = asyncio.Semaphore(16)
+
+    async def bounded(i):
+        async with sem:
+            return await one(i)
+    return await asyncio.gather(*(bounded(i) for i in range(count)))
+
+
+async def one_by_one(client, ids, status, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    statuses = {}
+
+    async def one(booking_id):
+        async with sem:
+            resp = await client.put(f'/api/bookings/{booking_id}', json={'status': status})
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in ids))
+    return time.perf_counter() - started, statuses
+
+
+async def in_bulk(client, ids, status):
+    started = time.perf_counter()
+    resp = await client.post('/api/bookings/bulk', json={'op': 'update', 'ids': ids,
+                                                         'changes': {'status': status}})
+    elapsed = time.perf_counter() - started
+    return elapsed, {resp.status_code: 1}, resp.json()
+
+
+async def run(base_url, args):
+    headers = {'Authorization': f"Bearer {make_token(identity='1', role='admin')}"}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=300.0,
+                                 limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        ids = await create_bookings(client, args.bookings, args.rooms)
+        results = {}
+        for label, status in (('confirm', 'confirmed'), ('cancel', 'cancelled')):
+            elapsed, statuses = await one_by_one(client, ids, status, args.concurrency)
+            results[f'{label}_one_by_one'] = {'elapsed_s': round(elapsed, 3),
+                                              'per_booking_ms': round(elapsed / len(ids) * 1000, 2),
+                                              'statuses': {str(k): v for k, v in statuses.items()}}
+            # Reset so the bulk run makes the same transition
+            await client.post('/api/bookings/bulk', json={'op': 'update', 'ids': ids,
+                                                          'changes': {'status': 'pending'}})
+            elapsed, statuses, body = await in_bulk(client, ids, status)
+            results[f'{label}_bulk'] = {'elapsed_s': round(elapsed, 3),
+                                        'per_booking_ms': round(elapsed / len(ids) * 1000, 2),
+                                        'statuses': {str(k): v for k, v in statuses.items()},
+                                        'succeeded': body['succeeded'], 'failed': body['failed']}
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk booking operations benchmark')
+    parser.add_argument('--bookings', type=int, default=500)
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--database-uri', help='booking database; defaults to a fresh SQLite file')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bulk-bookings-')
+    room_env = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'rooms.db')}"}
+    migrate('room-service', room_env)
+    room_port, booking_port = free_port(), free_port()
+    room = start_process(gunicorn_cmd('app:app', room_port, workers=2), service_dir('room-service'),
+                         room_env, os.path.join(workdir, 'room.log'))
+    booking_env = {
+        'SQLALCHEMY_DATABASE_URI': args.database_uri or f"sqlite:///{os.path.join(workdir, 'bookings.db')}",
+        'ROOMS_BASE_URL': f'http://127.0.0.1:{room_port}',
+    }
+    migrate('booking-service', booking_env)
+    booking = start_process(gunicorn_cmd('app:app', booking_port, workers=args.workers),
+                            service_dir('booking-service'), booking_env, os.path.join(workdir, 'booking.log'))
+    try:
+        wait_healthy(f'http://127.0.0.1:{room_port}/healthz')
+        wait_healthy(f'http://127.0.0.1:{booking_port}/healthz')
+        seed_rooms(f'http://127.0.0.1:{room_port}', args.rooms)
+        results = {'params': vars(args), 'results': asyncio.run(run(f'http://127.0.0.1:{booking_port}', args))}
+    finally:
+        stop_processes([booking, room])
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# bench/check_shared_modules.py
+# Fail when the copies of a shared module differ between services.
+#
+#   python bench/check_shared_modules.py
+#
+# database.py, migrate.py, metrics.py, resilience.py and gateway_claims.py
+# are copied into each service's build context rather than installed from
+# one package. Every copy carries the "Keep this file identical in every
+# service" marker; this compares every service's copy of each marked file
+# by content hash and exits 1 listing the ones that diverged. Run it before committing
+# a change to any of them.
+import hashlib
+import os
+import sys
+from collections import defaultdict
+
+from harness import service_dir
+
+SERVICES = ('api-gateway', 'auth-service', 'booking-service', 'room-service')
+MARKER = '# Keep this file identical in every service'
+
+
+def shared_copies():
+    """file name -> {service: sha256} for every file that carries MARKER in any service.
+
+    Copies are compared by name, so one that lost its marker still counts.
+    """
+    names = set()
+    for service in SERVICES:
+        directory = service_dir(service)
+        for name in os.listdir(directory):
+            if name.endswith('.py'):
+                with open(os.path.join(directory, name), 'rb') as fh:
+                    if MARKER.encode() in fh.read():
+                        names.add(name)
+    copies = defaultdict(dict)
+    for name in names:
+        for service in SERVICES:
+            path = os.path.join(service_dir(service), name)
+            if os.path.exists(path):
+                with open(path, 'rb') as fh:
+                    copies[name][service] = hashlib.sha256(fh.read()).hexdigest()
+    return copies
+
+
+def main():
+    diverged = 0
+    for name, by_service in sorted(shared_copies().items()):
+        digests = set(by_service.values())
+        status = 'ok' if len(digests) == 1 else 'DIVERGED'
+        print(f'{name:20} {status:9} {", ".join(sorted(by_service))}')
+        if len(digests) > 1:
+            diverged += 1
+            for service, digest in sorted(by_service.items()):
+                print(f'    {service:16} {digest[:16]}')
+    return 1 if diverged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# bench/compare.py
+# Compare two e2e_bench.py result files, e.g. from two commits.
+#
+#   python bench/compare.py base.json new.json --threshold 10
+#
+# Prints throughput, p50 and p99 per scenario and operation, and peak RSS
+# and CPU per request per service, with the relative change. Exits 1 when
+# any throughput dropped, or any p99, RSS or CPU figure grew, by more than
+# --threshold percent.
+import argparse
+import json
+import sys
+
+# metric -> True when higher is better
+OPERATION_METRICS = {'rps': True, 'p50_ms': False, 'p99_ms': False}
+SERVICE_METRICS = {'rss_kb_peak': False, 'cpu_ms_per_request': False}
+# p50 is shown but too noisy to fail on
+GATED = {'rps', 'p99_ms', 'rss_kb_peak', 'cpu_ms_per_request'}
+
+
+def change(base, new):
+    if not base:
+        return None
+    return (new - base) / base * 100
+
+
+def compare(base, new, threshold):
+    """Yield (row label, metric, base value, new value, % change, regressed)."""
+    for scenario, new_result in new['scenarios'].items():
+        base_result = base['scenarios'].get(scenario)
+        if base_result is None:
+            continue
+        rows = [(f'{scenario}', base_result['total'], new_result['total'], OPERATION_METRICS)]
+        rows += [(f'{scenario}/{op}', base_result['operations'][op], values, OPERATION_METRICS)
+                 for op, values in new_result['operations'].items() if op in base_result['operations']]
+        rows += [(f'{scenario}@{service}', base_result['services'][service], values, SERVICE_METRICS)
+                 for service, values in new_result['services'].items() if service in base_result['services']]
+        for label, old_values, new_values, metrics in rows:
+            for metric, higher_is_better in metrics.items():
+                pct = change(old_values[metric], new_values[metric])
+                worse = pct is not None and (-pct if higher_is_better else pct) > threshold
+                yield label, metric, old_values[metric], new_values[metric], pct, worse and metric in GATED
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two e2e benchmark results')
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent')
+    args = parser.parse_args()
+    with open(args.base) as fh:
+        base = json.load(fh)
+    with open(args.new) as fh:
+        new = json.load(fh)
+
+    for key in ('dataset_size', 'database', 'gateway', 'workers', 'concurrency'):
+        if base['params'].get(key) != new['params'].get(key):
+            print(f"warning: {key} differs: {base['params'].get(key)} vs {new['params'].get(key)}")
+    print(f"base {base['meta'].get('commit')}  new {new['meta'].get('commit')}")
+    print(f"{'':32} {'metric':>20} {'base':>12} {'new':>12} {'change':>9}")
+    regressions = 0
+    for label, metric, old, value, pct, regressed in compare(base, new, args.threshold):
+        regressions += regressed
+        shown = '' if pct is None else f'{pct:+.1f}%'
+        print(f"{label:32} {metric:>20} {old:>12} {value:>12} {shown:>9}{'  REGRESSION' if regressed else ''}")
+    if regressions:
+        print(f'{regressions} regression(s) beyond {args.threshold}%')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
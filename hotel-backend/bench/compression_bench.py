@@ -0,0 +1,140 @@
+# bench/compression_bench.py
+# Bytes on the wire and CPU cost of gateway response compression, per
+# response size.
+#
+#   python bench/compression_bench.py                 # codec cost, in-process
+#   python bench/compression_bench.py --http          # through the gateway
+#
+# The in-process part times compression.compress() on room-like JSON for
+# each encoding at the per-request and the cached level. The --http part
+# puts the sync gateway in front of a stub upstream serving the same
+# bodies and reports wire bytes per response and gateway CPU per request
+# for identity, gzip and br clients.
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from harness import (cpu_seconds, free_port, gunicorn_cmd, make_token, service_dir, start_process,
+                     stop_processes, summarize, wait_healthy)
+from stub_upstream import make_body
+
+sys.path.insert(0, service_dir('api-gateway'))
+import compression  # noqa: E402
+
+DEFAULT_SIZES = '1024,8192,65536,524288,2097152'
+
+
+def codec_costs(sizes, seconds):
+    results = []
+    for size in sizes:
+        body = make_body(size, kind='rooms')
+        row = {'size': len(body), 'encodings': {}}
+        for encoding in compression.SUPPORTED_ENCODINGS:
+            for cached in (False, True):
+                count, out = 0, b''
+                started = time.process_time()
+                while True:
+                    out = compression.compress(body, encoding, cached=cached)
+                    count += 1
+                    if time.process_time() - started >= seconds:
+                        break
+                cpu = (time.process_time() - started) / count
+                row['encodings'][f"{encoding}{'-cached' if cached else ''}"] = {
+                    'bytes': len(out),
+                    'ratio': round(len(body) / len(out), 2),
+                    'cpu_ms': round(cpu * 1000, 3),
+                    'mb_per_s': round(len(body) / cpu / 1e6, 1),
+                }
+        results.append(row)
+    return results
+
+
+async def fetch_many(base_url, headers, concurrency, total):
+    wire, latencies = [], []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with sem:
+                started = time.perf_counter()
+                async with client.stream('GET', '/api/bookings', headers=headers) as resp:
+                    size = 0
+                    async for chunk in resp.aiter_raw():
+                        size += len(chunk)
+                latencies.append(time.perf_counter() - started)
+                wire.append(size)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+    return wire, summarize(latencies, 0, elapsed)
+
+
+def http_costs(sizes, args, workdir):
+    results = []
+    token = make_token()
+    for size in sizes:
+        stub_port, gw_port = free_port(), free_port()
+        stub = start_process([sys.executable, '-m', 'uvicorn', 'stub_upstream:app', '--host', '127.0.0.1',
+                              '--port', str(stub_port), '--log-level', 'warning'],
+                             os.path.dirname(os.path.abspath(__file__)),
+                             {'STUB_DELAY_MS': '0', 'STUB_BODY_BYTES': str(size), 'STUB_BODY_KIND': 'rooms'},
+                             os.path.join(workdir, f'stub-{size}.log'))
+        upstream = f'http://127.0.0.1:{stub_port}'
+        gateway = start_process(gunicorn_cmd('app:app', gw_port, workers=1), service_dir('api-gateway'),
+                                {'AUTH_URL': upstream, 'ROOM_URL': upstream, 'BOOKING_URL': upstream},
+                                os.path.join(workdir, f'gateway-{size}.log'))
+        row = {'size': size, 'clients': {}}
+        try:
+            wait_healthy(f'{upstream}/healthz')
+            wait_healthy(f'http://127.0.0.1:{gw_port}/healthz')
+            for accept in ('identity', 'gzip', 'br'):
+                headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': accept}
+                before = cpu_seconds(gateway.pid)
+                wire, load = asyncio.run(fetch_many(f'http://127.0.0.1:{gw_port}', headers,
+                                                    args.concurrency, args.requests))
+                cpu = cpu_seconds(gateway.pid) - before
+                row['clients'][accept] = {
+                    'wire_bytes': round(sum(wire) / len(wire)),
+                    'gateway_cpu_ms_per_request': round(cpu / args.requests * 1000, 3),
+                    'p50_ms': load['p50_ms'],
+                    'rps': load['rps'],
+                }
+        finally:
+            stop_processes([gateway, stub])
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gateway compression benchmark')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='response sizes in bytes')
+    parser.add_argument('--seconds', type=float, default=0.5, help='CPU time per codec measurement')
+    parser.add_argument('--http', action='store_true')
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    results = {'params': vars(args), 'encodings': list(compression.SUPPORTED_ENCODINGS),
+               'codec': codec_costs(sizes, args.seconds)}
+    if args.http:
+        results['http'] = http_costs(sizes, args, tempfile.mkdtemp(prefix='compression-bench-'))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+# bench/e2e_bench.py
+# End-to-end load test: auth, room and booking services plus the gateway,
+# all on gunicorn (or the ASGI gateway on uvicorn), against a seeded data
+# set (see seed.py), driven through the gateway like the frontend does.
+#
+#   python bench/e2e_bench.py --dataset small --output base.json
+#   python bench/e2e_bench.py --dataset large --scenarios mixed,admin --duration 60
+#   python bench/e2e_bench.py --database-uri postgresql+psycopg2://bench@localhost/hotel_bench
+#   python bench/compare.py base.json new.json
+#
+# Each scenario is a weighted mix of operations (MIXES). Per scenario the
+# JSON output has overall and per-operation throughput and latency, the
+# HTTP statuses seen, and CPU time and peak RSS per service. Without
+# --database-uri every service gets a fresh SQLite file.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from harness import (BACKEND_DIR, cpu_seconds, free_port, gunicorn_cmd, migrate, rss_kb, service_dir,
+                     start_process, stop_processes, summarize, wait_healthy)
+from seed import (DATASETS, NEW_BOOKINGS_START, PASSWORD, ROOM_TYPES, ROOM_WORDS, customer_username,
+                  seed_all)
+
+SERVICES = ('auth', 'room', 'booking', 'gateway')
+
+# scenario -> {operation: weight}
+MIXES = {
+    'login': {'login': 1},
+    'browse': {'search_rooms': 5, 'search_text': 2, 'room_detail': 3},
+    'book': {'create_booking': 1},
+    'admin': {'admin_list': 3, 'admin_filter': 1},
+    'mixed': {'login': 2, 'search_rooms': 30, 'search_text': 10, 'room_detail': 20, 'catalog': 2,
+              'create_booking': 10, 'my_bookings': 16, 'admin_list': 8, 'admin_filter': 2},
+}
+
+BILLING = {
+    'fullName': 'Load Tester', 'email': 'load@bench.example.com', 'phone': '9000000000',
+    'address1': '1 Bench Street', 'city': 'Pune', 'state': 'MH', 'postalCode': '411001',
+    'country': 'India',
+}
+
+
+class Session:
+    """What the operations need: seeded sizes, logged-in tokens, a PRNG."""
+
+    def __init__(self, dataset, customer_tokens, admin_token, seed):
+        self.dataset = dataset
+        self.customer_tokens = customer_tokens
+        self.admin = {'Authorization': f'Bearer {admin_token}'}
+        self.rng = random.Random(seed)
+        self.new_bookings = 0
+
+    def customer(self):
+        return {'Authorization': f'Bearer {self.rng.choice(self.customer_tokens)}'}
+
+    def room_id(self):
+        return 1 + self.rng.randrange(self.dataset['rooms'])
+
+
+async def op_login(client, s):
+    username = customer_username(1 + s.rng.randrange(s.dataset['customers']))
+    return await client.post('/api/auth/login', json={'username': username, 'password': PASSWORD})
+
+
+async def op_search_rooms(client, s):
+    params = {'room_type': s.rng.choice(ROOM_TYPES), 'max_price': s.rng.choice((4000, 8000, 12000)),
+              'sort': s.rng.choice(('price_per_day', '-price_per_day', 'name')),
+              'limit': 20, 'offset': 20 * s.rng.randrange(5)}
+    return await client.get('/api/rooms', params=params, headers=s.customer())
+
+
+async def op_search_text(client, s):
+    return await client.get('/api/rooms', params={'q': s.rng.choice(ROOM_WORDS), 'limit': 20},
+                            headers=s.customer())
+
+
+async def op_room_detail(client, s):
+    return await client.get(f'/api/rooms/{s.room_id()}', headers=s.customer())
+
+
+async def op_catalog(client, s):
+    # The unfiltered listing: every room in one response
+    return await client.get('/api/rooms', headers=s.customer())
+
+
+async def op_create_booking(client, s):
+    # Walk rooms, then days, past the seeded stays: no two requests collide
+    n = s.new_bookings
+    s.new_bookings += 1
+    day = NEW_BOOKINGS_START + timedelta(days=n // s.dataset['rooms'])
+    return await client.post('/api/bookings', headers=s.customer(), json={
+        'booking_mode': 'daily', 'room_id': 1 + n % s.dataset['rooms'],
+        'check_in_date': day.isoformat(), 'check_out_date': (day + timedelta(days=1)).isoformat(),
+        'billing': BILLING,
+    })
+
+
+async def op_my_bookings(client, s):
+    return await client.get('/api/bookings', params={'limit': 20}, headers=s.customer())
+
+
+async def op_admin_list(client, s):
+    # A page somewhere in the whole table, as when paging through the admin screen
+    cursor = s.rng.randrange(max(1, s.dataset['bookings']))
+    return await client.get('/api/bookings', params={'limit': 50, 'cursor': cursor}, headers=s.admin)
+
+
+async def op_admin_filter(client, s):
+    params = {'limit': 50, 'status': s.rng.choice(('pending', 'confirmed', 'cancelled')),
+              'room_id': s.room_id()}
+    return await client.get('/api/bookings', params=params, headers=s.admin)
+
+
+OPERATIONS = {name[3:]: fn for name, fn in globals().items() if name.startswith('op_')}
+
+
+async def sample_services(pids, interval, peaks, stop):
+    while not stop.is_set():
+        for name, pid in pids.items():
+            rss = await asyncio.to_thread(rss_kb, pid)
+            peaks[name] = max(peaks.get(name, 0), rss)
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_scenario(base_url, session, mix, pids, concurrency, duration):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    errors = dict.fromkeys(names, 0)
+    statuses = {name: {} for name in names}
+    cpu_before = {name: cpu_seconds(pid) for name, pid in pids.items()}
+    peaks, stop = {}, asyncio.Event()
+    sampler = asyncio.create_task(sample_services(pids, 0.5, peaks, stop))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        stop_at = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < stop_at:
+                name = session.rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    resp = await OPERATIONS[name](client, session)
+                except httpx.HTTPError:
+                    errors[name] += 1
+                    continue
+                seen = statuses[name]
+                seen[resp.status_code] = seen.get(resp.status_code, 0) + 1
+                if resp.status_code >= 500:
+                    errors[name] += 1
+                    continue
+                latencies[name].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+
+    total = summarize([x for values in latencies.values() for x in values], sum(errors.values()), elapsed)
+    ops = {}
+    for name in names:
+        ops[name] = summarize(latencies[name], errors[name], elapsed)
+        ops[name]['statuses'] = {str(code): count for code, count in sorted(statuses[name].items())}
+    services = {}
+    for name, pid in pids.items():
+        cpu = cpu_seconds(pid) - cpu_before[name]
+        services[name] = {'cpu_s': round(cpu, 3),
+                          'cpu_ms_per_request': round(cpu * 1000 / max(total['requests'], 1), 3),
+                          'rss_kb_peak': peaks.get(name, 0), 'rss_kb_end': rss_kb(pid)}
+    return {'total': total, 'operations': ops, 'services': services}
+
+
+async def log_in(base_url, username):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        resp = await client.post('/api/auth/login', json={'username': username, 'password': PASSWORD})
+        resp.raise_for_status()
+        return resp.json()['access_token']
+
+
+async def log_in_all(base_url, usernames):
+    return await asyncio.gather(*(log_in(base_url, name) for name in usernames))
+
+
+def git_revision():
+    def git(*cmd):
+        return subprocess.run(['git', *cmd], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    try:
+        return {'commit': git('rev-parse', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain'))}
+    except OSError:
+        return {'commit': None, 'dirty': None}
+
+
+def start_services(args, uris, workdir):
+    ports = {name: free_port() for name in SERVICES}
+    common = {'METRICS_DIR': os.path.join(workdir, 'metrics')}
+
+    def start(name, service, cmd, env):
+        return start_process(cmd, service_dir(service), dict(common, **env), os.path.join(workdir, f'{name}.log'))
+
+    procs = {
+        'auth': start('auth', 'auth-service', gunicorn_cmd('app:app', ports['auth'], args.workers),
+                      {'SQLALCHEMY_DATABASE_URI': uris['auth']}),
+        'room': start('room', 'room-service', gunicorn_cmd('app:app', ports['room'], args.workers),
+                      {'SQLALCHEMY_DATABASE_URI': uris['room']}),
+        'booking': start('booking', 'booking-service', gunicorn_cmd('app:app', ports['booking'], args.workers),
+                         {'SQLALCHEMY_DATABASE_URI': uris['booking'],
+                          'ROOMS_BASE_URL': f"http://127.0.0.1:{ports['room']}"}),
+    }
+    if args.gateway == 'sync':
+        gateway_cmd = gunicorn_cmd('app:app', ports['gateway'], args.workers)
+    else:
+        gateway_cmd = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+                       '--port', str(ports['gateway']), '--workers', str(args.workers), '--log-level', 'warning']
+    procs['gateway'] = start('gateway', 'api-gateway', gateway_cmd, {
+        'AUTH_URL': f"http://127.0.0.1:{ports['auth']}",
+        'ROOM_URL': f"http://127.0.0.1:{ports['room']}",
+        'BOOKING_URL': f"http://127.0.0.1:{ports['booking']}",
+    })
+    return procs, ports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end hotel backend benchmark')
+    parser.add_argument('--dataset', choices=sorted(DATASETS), default='small')
+    parser.add_argument('--rooms', type=int, help='override the data set')
+    parser.add_argument('--bookings', type=int, help='override the data set')
+    parser.add_argument('--scenarios', default=','.join(MIXES), help=f"comma separated: {', '.join(MIXES)}")
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=3.0, help='seconds of the mixed scenario first')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=2, help='per service')
+    parser.add_argument('--gateway', choices=('sync', 'asgi'), default='sync')
+    parser.add_argument('--sessions', type=int, default=20, help='customers logged in up front')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-uri', help='one database for all services; defaults to SQLite files')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = set(scenarios).difference(MIXES)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix='e2e-bench-')
+    if args.database_uri:
+        uris = dict.fromkeys(('auth', 'room', 'booking'), args.database_uri)
+    else:
+        uris = {name: f"sqlite:///{os.path.join(workdir, f'{name}.db')}" for name in ('auth', 'room', 'booking')}
+    for name in ('auth', 'room', 'booking'):
+        migrate(f'{name}-service', {'SQLALCHEMY_DATABASE_URI': uris[name]})
+    dataset = dict(DATASETS[args.dataset])
+    dataset.update({k: v for k, v in (('rooms', args.rooms), ('bookings', args.bookings)) if v})
+    seeded = seed_all(uris, **dataset)
+
+    procs, ports = start_services(args, uris, workdir)
+    pids = {name: proc.pid for name, proc in procs.items()}
+    base_url = f"http://127.0.0.1:{ports['gateway']}"
+    results = {
+        'meta': dict(git_revision(), timestamp=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                     python=platform.python_version(), platform=platform.platform(), cpus=os.cpu_count()),
+        'params': dict(vars(args), dataset_size=dataset, database='postgresql' if args.database_uri else 'sqlite'),
+        'seed': seeded,
+        'scenarios': {},
+    }
+    try:
+        for name in SERVICES:
+            wait_healthy(f'http://127.0.0.1:{ports[name]}/healthz', timeout=60)
+        usernames = [customer_username(n) for n in range(1, min(args.sessions, dataset['customers']) + 1)]
+        customer_tokens = asyncio.run(log_in_all(base_url, usernames))
+        admin_token = asyncio.run(log_in(base_url, 'admin'))
+        session = Session(dataset, customer_tokens, admin_token, args.seed)
+        if args.warmup:
+            asyncio.run(run_scenario(base_url, session, MIXES['mixed'], pids, args.concurrency, args.warmup))
+        for name in scenarios:
+            results['scenarios'][name] = asyncio.run(
+                run_scenario(base_url, session, MIXES[name], pids, args.concurrency, args.duration))
+    finally:
+        stop_processes(list(procs.values()))
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
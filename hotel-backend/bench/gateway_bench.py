@@ -0,0 +1,80 @@
+# bench/gateway_bench.py
+# Compare the sync Flask gateway (app:app on gunicorn) with the asyncio one
+# (asgi:app on uvicorn) in front of local stub upstreams.
+#
+#   python bench/gateway_bench.py --concurrency 64 --duration 15 --delay-ms 20
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from harness import (free_port, gunicorn_cmd, make_token, run_load, service_dir,
+                     start_process, stop_processes, wait_healthy)
+
+
+def start_stub(port, delay_ms, body_bytes, logdir):
+    cmd = [sys.executable, '-m', 'uvicorn', 'stub_upstream:app', '--host', '127.0.0.1',
+           '--port', str(port), '--workers', '2', '--log-level', 'warning']
+    env = {'STUB_DELAY_MS': str(delay_ms), 'STUB_BODY_BYTES': str(body_bytes)}
+    return start_process(cmd, os.path.dirname(os.path.abspath(__file__)), env,
+                         os.path.join(logdir, f'stub-{port}.log'))
+
+
+def bench_gateway(engine, upstream_url, workers, concurrency, duration, logdir):
+    port = free_port()
+    env = {'AUTH_URL': upstream_url, 'ROOM_URL': upstream_url, 'BOOKING_URL': upstream_url}
+    if engine == 'sync':
+        cmd = gunicorn_cmd('app:app', port, workers=workers)
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+               '--port', str(port), '--workers', str(workers), '--log-level', 'warning']
+    proc = start_process(cmd, service_dir('api-gateway'), env, os.path.join(logdir, f'gateway-{engine}.log'))
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        wait_healthy(f'{base_url}/healthz')
+        headers = {'Authorization': f'Bearer {make_token()}'}
+
+        def request(client, i):
+            return client.get('/api/rooms', headers=headers)
+
+        run_load(base_url, request, concurrency=min(concurrency, 8), duration=1.0)  # warm-up
+        return run_load(base_url, request, concurrency=concurrency, duration=duration)
+    finally:
+        stop_processes([proc])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync vs asyncio gateway benchmark')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--delay-ms', type=float, default=20.0)
+    parser.add_argument('--body-bytes', type=int, default=2048)
+    parser.add_argument('--engines', default='sync,async')
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    logdir = tempfile.mkdtemp(prefix='gateway-bench-')
+    stub_port = free_port()
+    stub = start_stub(stub_port, args.delay_ms, args.body_bytes, logdir)
+    results = {'params': vars(args), 'results': {}}
+    try:
+        wait_healthy(f'http://127.0.0.1:{stub_port}/healthz')
+        for engine in args.engines.split(','):
+            results['results'][engine] = bench_gateway(
+                engine, f'http://127.0.0.1:{stub_port}', args.workers,
+                args.concurrency, args.duration, logdir)
+            print(engine, json.dumps(results['results'][engine]), file=sys.stderr)
+    finally:
+        stop_processes([stub])
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
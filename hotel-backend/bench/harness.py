@@ -0,0 +1,183 @@
+# bench/harness.py
+# Shared helpers for the benchmark scripts: process control, tokens, load loop.
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import jwt as pyjwt
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'Shivang100@')
+
+
+def service_dir(name):
+    return os.path.join(BACKEND_DIR, name)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_process(cmd, cwd, env=None, log_path=None):
+    full_env = dict(os.environ)
+    full_env.update(env or {})
+    out = open(log_path, 'wb') if log_path else subprocess.DEVNULL
+    return subprocess.Popen(cmd, cwd=cwd, env=full_env, stdout=out, stderr=subprocess.STDOUT)
+
+
+def migrate(service, env=None):
+    """Run the service's migrate.py against the database configured in env."""
+    full_env = dict(os.environ)
+    full_env.update(env or {})
+    subprocess.run([sys.executable, 'migrate.py'], cwd=service_dir(service), env=full_env,
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def wait_healthy(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'{url} did not become healthy within {timeout}s')
+
+
+def stop_processes(procs):
+    for proc in procs:
+        if proc.poll() is None:
+            proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def gunicorn_cmd(module, port, workers=3, worker_class=None):
+    cmd = [sys.executable, '-m', 'gunicorn', module, '--bind', f'127.0.0.1:{port}',
+           '--workers', str(workers), '--timeout', '120']
+    if worker_class:
+        cmd += ['--worker-class', worker_class]
+    return cmd
+
+
+def make_token(identity='1', role='customer', token_type='access', ttl=3600):
+    """Token shaped like the ones flask_jwt_extended issues in auth-service."""
+    now = datetime.now(timezone.utc)
+    claims = {
+        'fresh': False,
+        'iat': now,
+        'jti': str(uuid.uuid4()),
+        'type': token_type,
+        'sub': str(identity),
+        'nbf': now,
+        'exp': now + timedelta(seconds=ttl),
+        'role': role,
+        'email': f'user{identity}@example.com',
+    }
+    return pyjwt.encode(claims, JWT_SECRET_KEY, algorithm='HS256')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def _load(base_url, make_request, concurrency, duration):
+    """make_request(client, i) -> awaitable httpx.Response; ok = status < 500."""
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        stop_at = time.perf_counter() + duration
+        counter = iter(range(10 ** 12))
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    resp = await make_request(client, next(counter))
+                    if resp.status_code >= 500:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, errors, elapsed)
+
+
+def run_load(base_url, make_request, concurrency=50, duration=10.0):
+    return asyncio.run(_load(base_url, make_request, concurrency, duration))
+
+
+def _with_children(pid):
+    # All descendants: workers and their own children (e.g. auth's password pool)
+    pids = [pid]
+    try:
+        for parent in pids:
+            children = subprocess.run(['pgrep', '-P', str(parent)], capture_output=True, text=True).stdout.split()
+            pids += [int(c) for c in children]
+    except OSError:
+        pass
+    return pids
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of a process and its descendants (gunicorn workers)."""
+    ticks = os.sysconf('SC_CLK_TCK')
+    total = 0.0
+    for p in _with_children(pid):
+        try:
+            with open(f'/proc/{p}/stat') as fh:
+                fields = fh.read().rsplit(')', 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / ticks
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+def rss_kb(pid):
+    """Resident set size of a process and its descendants (gunicorn workers), in KiB."""
+    total = 0
+    for p in _with_children(pid):
+        try:
+            with open(f'/proc/{p}/status') as fh:
+                for line in fh:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+    return total
@@ -0,0 +1,79 @@
+# bench/metrics_bench.py
+# Cost of the /metrics instrumentation: room-service serving
+# GET /api/rooms/<id> with METRICS_ENABLED=0 and =1, plus the time a scrape
+# of /metrics takes once the histograms are populated.
+#
+#   python bench/metrics_bench.py --duration 10 --concurrency 32
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+from harness import (cpu_seconds, free_port, gunicorn_cmd, migrate, run_load, service_dir,
+                     start_process, stop_processes, wait_healthy)
+from room_cache_bench import seed_rooms
+
+
+def measure(enabled, args, workdir):
+    env = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, f'rooms-{enabled}.db')}",
+        'METRICS_ENABLED': enabled,
+        'METRICS_DIR': os.path.join(workdir, 'metrics'),
+        'METRICS_FLUSH_INTERVAL': '1',
+    }
+    migrate('room-service', env)
+    port = free_port()
+    proc = start_process(gunicorn_cmd('app:app', port, workers=args.workers), service_dir('room-service'),
+                         env, os.path.join(workdir, f'room-{enabled}.log'))
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_healthy(f'{base_url}/healthz')
+        seed_rooms(base_url, args.rooms)
+        run_load(base_url, lambda client, i: client.get(f'/api/rooms/{1 + i % args.rooms}'),
+                 concurrency=args.concurrency, duration=1.0)  # warm-up
+        cpu_before = cpu_seconds(proc.pid)
+        result = run_load(base_url, lambda client, i: client.get(f'/api/rooms/{1 + i % args.rooms}'),
+                          concurrency=args.concurrency, duration=args.duration)
+        result['cpu_ms_per_request'] = round((cpu_seconds(proc.pid) - cpu_before) * 1000
+                                             / max(result['requests'], 1), 3)
+        if enabled == '1':
+            time.sleep(1.5)  # every worker has flushed
+            scrapes = []
+            with httpx.Client(base_url=base_url) as client:
+                for _ in range(20):
+                    started = time.perf_counter()
+                    resp = client.get('/metrics')
+                    scrapes.append(time.perf_counter() - started)
+            result['scrape_ms'] = round(sorted(scrapes)[len(scrapes) // 2] * 1000, 2)
+            result['scrape_bytes'] = len(resp.content)
+        return result
+    finally:
+        stop_processes([proc])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Metrics instrumentation overhead benchmark')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--rooms', type=int, default=20)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='metrics-bench-')
+    results = {'params': vars(args),
+               'metrics_off': measure('0', args, workdir),
+               'metrics_on': measure('1', args, workdir)}
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
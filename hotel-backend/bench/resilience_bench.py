@@ -0,0 +1,98 @@
+# bench/resilience_bench.py
+# Room reads through the gateway while room-service hangs: with circuit
+# breakers and deadlines disabled versus enabled.
+#
+#   python bench/resilience_bench.py --room-delay-ms 8000 --duration 30
+#
+# room-service is replaced by stub_upstream.py answering after
+# --room-delay-ms, longer than the protected gateway's deadline. The sync
+# gateway is real, on gunicorn, with its room response cache off so every
+# read goes upstream. (Booking listings no longer call room-service; they
+# read booking-service's replicated room_snapshots.) Reported per mode:
+# throughput, latency and statuses, plus the gateway's breaker states at
+# the end.
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import httpx
+
+from harness import (free_port, gunicorn_cmd, make_token, run_load, service_dir, start_process, stop_processes,
+                     wait_healthy)
+
+MODES = {
+    # Breakers never open and requests carry no deadline
+    'unprotected': {'BREAKER_FAILURE_THRESHOLD': '1000000', 'REQUEST_DEADLINE_MS': '0'},
+    # Below the 15s default so the breaker opens within a short run
+    'protected': {'REQUEST_DEADLINE_MS': '2000'},
+}
+
+
+def breaker_stats(url):
+    try:
+        return httpx.get(url, timeout=5).json()
+    except httpx.HTTPError:
+        return 'no answer within 5s: every worker busy'
+
+
+def run_mode(mode, args, workdir):
+    env = dict(MODES[mode], METRICS_DIR=os.path.join(workdir, 'metrics'))
+    room_port, gateway_port = free_port(), free_port()
+    stub = start_process([sys.executable, '-m', 'uvicorn', 'stub_upstream:app', '--host', '127.0.0.1',
+                          '--port', str(room_port), '--log-level', 'warning'],
+                         os.path.dirname(os.path.abspath(__file__)), {'STUB_DELAY_MS': str(args.room_delay_ms)},
+                         os.path.join(workdir, f'stub-{mode}.log'))
+    gateway = start_process(gunicorn_cmd('app:app', gateway_port, workers=args.workers), service_dir('api-gateway'),
+                            dict(env, ROOM_URL=f'http://127.0.0.1:{room_port}', ROOM_CACHE_ENABLED='0',
+                                 AUTH_URL='http://127.0.0.1:9', BOOKING_URL='http://127.0.0.1:9'),
+                            os.path.join(workdir, f'gateway-{mode}.log'))
+    base_url = f'http://127.0.0.1:{gateway_port}'
+    try:
+        wait_healthy(f'{base_url}/healthz')
+        headers = {'Authorization': f"Bearer {make_token()}"}
+        if args.client_deadline_ms:
+            headers['X-Request-Deadline-Ms'] = str(args.client_deadline_ms)
+        statuses = {}
+
+        async def request(client, i):
+            path = '/api/rooms' if i % 2 else f'/api/rooms/{i % args.rooms + 1}'
+            resp = await client.get(path, headers=headers)
+            statuses[str(resp.status_code)] = statuses.get(str(resp.status_code), 0) + 1
+            return resp
+
+        result = run_load(base_url, request, concurrency=args.concurrency, duration=args.duration)
+        result['statuses'] = statuses
+        result['breakers'] = breaker_stats(f'{base_url}/healthz/upstreams')
+        return result
+    finally:
+        stop_processes([gateway, stub])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Circuit breaker and deadline benchmark')
+    parser.add_argument('--room-delay-ms', type=int, default=8000)
+    parser.add_argument('--client-deadline-ms', type=int, help='X-Request-Deadline-Ms sent by the client')
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='resilience-bench-')
+    results = {'params': vars(args)}
+    for mode in args.modes.split(','):
+        results[mode] = run_mode(mode, args, workdir)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
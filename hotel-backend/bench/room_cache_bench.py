@@ -0,0 +1,169 @@
+# bench/room_cache_bench.py
+# Catalog read traffic through the gateway with and without the shared
+# room response cache, against a real room-service on SQLite.
+#
+#   python bench/room_cache_bench.py --rooms 200 --duration 10
+#   python bench/room_cache_bench.py --engine async
+#
+# Reports client rps/latency and how many requests reached room-service
+# (counted from its access log) per client request, with the gateway's
+# background catalog version checks counted apart. The hit check sends a
+# burst for one warmed key and counts what still reached room-service
+# (should be nothing). A burst of concurrent GETs right after a room update
+# shows coalesced misses.
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+
+import httpx
+
+from harness import (free_port, gunicorn_cmd, make_token, migrate, run_load, service_dir, start_process,
+                     stop_processes, wait_healthy)
+
+ROOM_TYPES = ('Deluxe', 'Suite', 'Standard', 'Family')
+# Not in the load mix, so the hit check starts from an empty entry
+HIT_CHECK_PATH = '/api/rooms?limit=5'
+
+
+def upstream_requests(access_log):
+    with open(access_log) as fh:
+        return sum(1 for line in fh if '/api/rooms' in line and '/api/rooms/version' not in line)
+
+
+def version_checks(access_log):
+    with open(access_log) as fh:
+        return sum(1 for line in fh if '/api/rooms/version' in line)
+
+
+def seed_rooms(base_url, count):
+    headers = {'Authorization': f"Bearer {make_token(identity='1', role='admin')}"}
+    rng = random.Random(11)
+    with httpx.Client(base_url=base_url, headers=headers, timeout=30.0) as client:
+        for i in range(count):
+            resp = client.post('/api/rooms', json={
+                'name': f'Room {i}', 'room_type': rng.choice(ROOM_TYPES),
+                'description': 'Sea view, king bed, balcony. ' * 4,
+                'price_per_day': rng.randint(2000, 12000), 'price_per_hour': rng.randint(200, 900),
+                'main_image': f'/uploads/rooms/{i}.jpg',
+                'secondary_images': [f'/uploads/rooms/{i}-{j}.jpg' for j in range(3)],
+            })
+            resp.raise_for_status()
+
+
+def start_gateway(engine, port, workers, env, log_path):
+    if engine == 'sync':
+        cmd = gunicorn_cmd('app:app', port, workers=workers)
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+               '--port', str(port), '--workers', str(workers), '--log-level', 'warning']
+    return start_process(cmd, service_dir('api-gateway'), env, log_path)
+
+
+async def burst(base_url, headers, count, path='/api/rooms'):
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=60.0,
+                                 limits=httpx.Limits(max_connections=count)) as client:
+        responses = await asyncio.gather(*(client.get(path) for _ in range(count)))
+    return {state: sum(1 for r in responses if r.headers.get('x-cache') == state)
+            for state in ('HIT', 'MISS', 'STALE', None)}
+
+
+def bench_mode(args, enabled, room_url, access_log, workdir):
+    port = free_port()
+    env = {'ROOM_URL': room_url, 'AUTH_URL': room_url, 'BOOKING_URL': room_url,
+           'ROOM_CACHE_ENABLED': '1' if enabled else '0', 'ROOM_CACHE_TTL': str(args.ttl)}
+    gateway = start_gateway(args.engine, port, args.workers, env,
+                            os.path.join(workdir, f"gateway-{'on' if enabled else 'off'}.log"))
+    base_url = f'http://127.0.0.1:{port}'
+    headers = {'Authorization': f'Bearer {make_token()}'}
+    rng = random.Random(5)
+
+    def request(client, i):
+        roll = rng.random()
+        if roll < 0.6:
+            return client.get('/api/rooms', headers=headers)
+        if roll < 0.9:
+            return client.get(f'/api/rooms/{rng.randint(1, args.rooms)}', headers=headers)
+        return client.get('/api/rooms', params={'room_type': rng.choice(ROOM_TYPES), 'limit': '20'},
+                          headers=headers)
+
+    try:
+        wait_healthy(f'{base_url}/healthz')
+        before, checks_before = upstream_requests(access_log), version_checks(access_log)
+        load = run_load(base_url, request, concurrency=args.concurrency, duration=args.duration)
+        load['upstream_requests'] = upstream_requests(access_log) - before
+        load['upstream_per_request'] = round(load['upstream_requests'] / max(1, load['requests']), 4)
+        load['version_checks'] = version_checks(access_log) - checks_before
+        if enabled:
+            # Warm every worker, then a burst of hits must stay in the gateway
+            asyncio.run(burst(base_url, headers, args.burst, HIT_CHECK_PATH))
+            before, checks_before = upstream_requests(access_log), version_checks(access_log)
+            states = asyncio.run(burst(base_url, headers, args.burst, HIT_CHECK_PATH))
+            load['hit_check'] = {
+                'requests': args.burst,
+                'x_cache': {str(k): v for k, v in states.items() if v},
+                'upstream_requests': upstream_requests(access_log) - before,
+                'version_checks': version_checks(access_log) - checks_before,
+            }
+            admin = {'Authorization': f"Bearer {make_token(identity='1', role='admin')}"}
+            httpx.put(f'{base_url}/api/rooms/1', json={'price_per_day': 4321}, headers=admin,
+                      timeout=30.0).raise_for_status()
+            before = upstream_requests(access_log)
+            states = asyncio.run(burst(base_url, headers, args.burst))
+            load['burst_after_write'] = {
+                'requests': args.burst,
+                'x_cache': {str(k): v for k, v in states.items() if v},
+                # The worker that proxied the PUT refills at once; the others
+                # keep their entries until their next version check
+                'upstream_requests': upstream_requests(access_log) - before,
+            }
+        return load
+    finally:
+        stop_processes([gateway])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gateway room response cache benchmark')
+    parser.add_argument('--engine', choices=('sync', 'async'), default='sync')
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--room-workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--ttl', type=float, default=5.0)
+    parser.add_argument('--burst', type=int, default=100)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='room-cache-bench-')
+    access_log = os.path.join(workdir, 'room-access.log')
+    env = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'rooms.db')}"}
+    migrate('room-service', env)
+    room_port = free_port()
+    room = start_process(gunicorn_cmd('app:app', room_port, workers=args.room_workers)
+                         + ['--access-logfile', access_log],
+                         service_dir('room-service'), env, os.path.join(workdir, 'room.log'))
+    room_url = f'http://127.0.0.1:{room_port}'
+    results = {'params': vars(args), 'results': {}}
+    try:
+        wait_healthy(f'{room_url}/healthz')
+        seed_rooms(room_url, args.rooms)
+        for enabled in (False, True):
+            mode = 'cache_on' if enabled else 'cache_off'
+            results['results'][mode] = bench_mode(args, enabled, room_url, access_log, workdir)
+            print(mode, json.dumps(results['results'][mode]), file=sys.stderr)
+    finally:
+        stop_processes([room])
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# bench/seed.py
+# Deterministic data sets for the end-to-end benchmarks, written straight
+# into migrated auth, room and booking databases (SQLite or PostgreSQL).
+#
+#   python bench/seed.py --dataset large --database-uri postgresql+psycopg2://bench@localhost/hotel_bench
+#
+# Seeding replaces every user, room and booking in the target databases.
+# Rows use fixed ids: user 1 is the admin, users 2.. are customers
+# bench<n> (all with PASSWORD), rooms are 1..rooms. Seeded stays are
+# daily or hourly and never overlap within a room; they start at
+# BOOKINGS_START, so bookings created during a run (see NEW_BOOKINGS_START)
+# cannot collide with them. booking-service's room snapshots are written
+# as already caught up with room-service's outbox, so runs do not start
+# with a sync.
+import argparse
+import json
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import MetaData, create_engine, text
+from werkzeug.security import generate_password_hash
+
+DATASETS = {
+    'small': {'customers': 200, 'rooms': 10_000, 'bookings': 1_000},
+    'large': {'customers': 5_000, 'rooms': 10_000, 'bookings': 100_000},
+}
+
+PASSWORD = 'bench-password'
+# Same default as auth-service/passwords.py, so logins never rehash
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+ROOM_TYPES = ('single', 'double', 'deluxe', 'suite', 'family')
+ROOM_WORDS = ('garden', 'sea', 'city', 'pool', 'mountain', 'lake', 'quiet', 'corner', 'balcony', 'terrace')
+STATUSES = ('pending', 'confirmed', 'confirmed', 'confirmed', 'cancelled', 'completed')
+
+BOOKINGS_START = date(2030, 1, 1)
+NEW_BOOKINGS_START = date(2040, 1, 1)
+
+CHUNK = 5000
+
+# room-service's events.SUMMARY_FIELDS
+ROOM_EVENT_FIELDS = ('id', 'name', 'room_type', 'price_per_day', 'price_per_hour', 'main_image')
+
+
+def customer_username(n):
+    return f'bench{n}'
+
+
+def _engine(uri):
+    return create_engine(uri, future=True)
+
+
+def _table(conn, name):
+    metadata = MetaData()
+    metadata.reflect(conn, only=[name])
+    return metadata.tables[name]
+
+
+def _replace(conn, table, rows):
+    conn.execute(table.delete())
+    for start in range(0, len(rows), CHUNK):
+        conn.execute(table.insert(), rows[start:start + CHUNK])
+    if conn.dialect.name == 'postgresql' and rows:
+        # Explicit ids leave the serial sequence behind
+        conn.execute(text(f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+                          f"(SELECT max(id) FROM \"{table.name}\"))"))
+
+
+def seed_users(uri, customers):
+    password_hash = generate_password_hash(PASSWORD, method=PASSWORD_HASH_METHOD)
+    rows = [{'id': 1, 'username': 'admin', 'email': 'admin@bench.example.com',
+             'password_hash': password_hash, 'role': 'admin'}]
+    rows += [{'id': n + 1, 'username': customer_username(n), 'email': f'{customer_username(n)}@bench.example.com',
+              'password_hash': password_hash, 'role': 'customer'} for n in range(1, customers + 1)]
+    with _engine(uri).begin() as conn:
+        _replace(conn, _table(conn, 'user'), rows)
+    return len(rows)
+
+
+def room_rows(count, seed=1):
+    rng = random.Random(seed)
+    rows = []
+    for room_id in range(1, count + 1):
+        room_type = ROOM_TYPES[room_id % len(ROOM_TYPES)]
+        words = rng.sample(ROOM_WORDS, 3)
+        price = round(rng.uniform(1500, 15000), 2)
+        rows.append({
+            'id': room_id,
+            'name': f'{words[0].title()} {room_type.title()} {room_id}',
+            'room_type': room_type,
+            'description': f'{room_type.title()} room with {words[1]} and {words[2]} views.',
+            'price_per_day': price,
+            'price_per_hour': round(price / 12, 2),
+            'main_image': f'/uploads/rooms/{room_id}.jpg',
+            'secondary_images': json.dumps([f'/uploads/rooms/{room_id}-{k}.jpg' for k in range(2)]),
+        })
+    return rows
+
+
+def seed_rooms(uri, count):
+    rows = room_rows(count)
+    now = datetime.utcnow()
+    # One event per room, as room-service's outbox migration starts it; event id = room id
+    events = [{'id': row['id'], 'room_id': row['id'], 'event_type': 'room.upserted', 'created_at': now,
+               'payload': json.dumps({k: row[k] for k in ROOM_EVENT_FIELDS})} for row in rows]
+    with _engine(uri).begin() as conn:
+        _replace(conn, _table(conn, 'room'), rows)
+        _replace(conn, _table(conn, 'room_events'), events)
+        # Readers cache by catalog version, so start from a fresh one
+        _replace(conn, _table(conn, 'catalog_version'), [{'id': 1, 'version': 1}])
+    return len(rows)
+
+
+def seed_room_snapshots(uri, count):
+    """booking-service's copy of seed_rooms(count), synced up to its last event."""
+    rows = [{'room_id': row['id'], 'name': row['name'], 'room_type': row['room_type'],
+             'main_image': row['main_image'], 'event_id': row['id']} for row in room_rows(count)]
+    with _engine(uri).begin() as conn:
+        table = _table(conn, 'room_snapshots')
+        conn.execute(table.delete())
+        for start in range(0, len(rows), CHUNK):
+            conn.execute(table.insert(), rows[start:start + CHUNK])
+        state = _table(conn, 'room_sync_state')
+        conn.execute(state.delete())
+        conn.execute(state.insert().values(id=1, cursor=count, updated_at=datetime.utcnow()))
+    return len(rows)
+
+
+def seed_bookings(uri, count, rooms, customers, seed=1):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        room_id = 1 + i % rooms
+        # Every room gets a 4-day block per round: up to 3 nights, then a day for hourly stays
+        block = BOOKINGS_START + timedelta(days=4 * (i // rooms))
+        row = {
+            'id': i + 1,
+            'customer_id': 2 + rng.randrange(customers),
+            'room_id': room_id,
+            'booking_date': block - timedelta(days=rng.randrange(1, 60)),
+            'status': rng.choice(STATUSES),
+            'bill_full_name': f'Bench Customer {i}',
+            'bill_email': f'guest{i}@bench.example.com',
+            'bill_phone': '9000000000',
+            'bill_gstin': None,
+            'bill_address1': f'{i} Bench Street',
+            'bill_address2': None,
+            'bill_city': 'Pune',
+            'bill_state': 'MH',
+            'bill_postal_code': '411001',
+            'bill_country': 'India',
+            'check_in_date': None, 'check_out_date': None, 'start_time': None, 'duration_hours': None,
+        }
+        if rng.random() < 0.9:
+            nights = rng.randint(1, 3)
+            row.update(booking_mode='daily', check_in_date=block, check_out_date=block + timedelta(days=nights),
+                       slot_start=datetime.combine(block, datetime.min.time()),
+                       slot_end=datetime.combine(block + timedelta(days=nights), datetime.min.time()))
+        else:
+            day = block + timedelta(days=3)
+            start = datetime.combine(day, datetime.min.time()) + timedelta(hours=rng.randint(8, 18))
+            hours = rng.randint(1, 4)
+            row.update(booking_mode='hourly', start_time=start.time(), duration_hours=hours,
+                       slot_start=start, slot_end=start + timedelta(hours=hours))
+        rows.append(row)
+    with _engine(uri).begin() as conn:
+        _replace(conn, _table(conn, 'bookings'), rows)
+    return len(rows)
+
+
+def seed_all(uris, customers, rooms, bookings):
+    """uris: {'auth': ..., 'room': ..., 'booking': ...} of migrated databases; returns row counts and timings."""
+    report = {}
+    for name, seed in (('users', lambda: seed_users(uris['auth'], customers)),
+                       ('rooms', lambda: seed_rooms(uris['room'], rooms)),
+                       ('room_snapshots', lambda: seed_room_snapshots(uris['booking'], rooms)),
+                       ('bookings', lambda: seed_bookings(uris['booking'], bookings, rooms, customers))):
+        started = time.perf_counter()
+        report[name] = {'rows': seed(), 'seconds': round(time.perf_counter() - started, 2)}
+    return report
+
+
+def main():
+    from harness import migrate
+
+    parser = argparse.ArgumentParser(description='Seed benchmark data sets')
+    parser.add_argument('--dataset', choices=sorted(DATASETS), default='small')
+    parser.add_argument('--database-uri', required=True, help='one database for all three services')
+    args = parser.parse_args()
+
+    env = {'SQLALCHEMY_DATABASE_URI': args.database_uri}
+    for service in ('auth-service', 'room-service', 'booking-service'):
+        migrate(service, env)
+    uris = dict.fromkeys(('auth', 'room', 'booking'), args.database_uri)
+    print(json.dumps(seed_all(uris, **DATASETS[args.dataset]), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# bench/stub_upstream.py
+# Minimal ASGI upstream standing in for auth/room/booking during benchmarks.
+# STUB_DELAY_MS simulates service work, STUB_BODY_BYTES sets the JSON size.
+# STUB_BODY_KIND=rooms serves room-like records with realistic entropy.
+import asyncio
+import json
+import os
+import random
+
+DELAY = float(os.getenv('STUB_DELAY_MS', '20')) / 1000.0
+BODY_BYTES = int(os.getenv('STUB_BODY_BYTES', '2048'))
+
+BODY_KIND = os.getenv('STUB_BODY_KIND', 'pad')
+
+_WORDS = ('sea', 'view', 'suite', 'balcony', 'king', 'queen', 'bed', 'garden', 'deluxe', 'family',
+          'twin', 'breakfast', 'pool', 'spa', 'city', 'quiet', 'spacious', 'modern', 'classic', 'wifi')
+
+
+def room_record(i, rng):
+    digest = '%064x' % rng.getrandbits(256)
+    return {
+        "id": i,
+        "name": ' '.join(rng.choice(_WORDS).title() for _ in range(3)) + f' {i}',
+        "room_type": rng.choice(('single', 'double', 'suite', 'family')),
+        "description": ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(12, 30))),
+        "price_per_day": round(rng.uniform(40, 400), 2),
+        "price_per_hour": round(rng.uniform(5, 40), 2),
+        "main_image": f'/uploads/{digest}.jpg',
+        "secondary_images": [],
+    }
+
+
+def make_body(size, kind=BODY_KIND, seed=7):
+    """JSON array of roughly size bytes."""
+    if kind == 'rooms':
+        rng = random.Random(seed)
+        records, total = [], 2
+        while total < size:
+            record = room_record(len(records) + 1, rng)
+            records.append(record)
+            total += len(json.dumps(record)) + 2
+        return json.dumps(records).encode()
+    return json.dumps([{"id": i, "name": f"room-{i}", "pad": "x" * 64}
+                       for i in range(max(1, size // 90))]).encode()
+
+
+_BODY = make_body(BODY_BYTES)
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get('more_body', False)
+    if DELAY:
+        await asyncio.sleep(DELAY)
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(_BODY)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': _BODY})
@@ -1,57 +1,174 @@
 # bookings-service app.py
 import os
+import time
 import requests
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
 from datetime import datetime
-from flask import Flask, request, jsonify
+from urllib.parse import urlencode
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, get_jwt
-from models import db, Booking
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, get_jwt
+from gateway_claims import jwt_required
+from database import configure_database
+from metrics import init_flask, observe_upstream
+from models import db, Booking, RoomSnapshot
+from availability import (NON_BLOCKING_STATUSES, RoomBusy, busy_room_ids, daily_slot, find_conflict,
+                          hourly_slot, run_locked, slot_for)
+from bulk import UPDATABLE_FIELDS, BatchError, ItemError, apply_batch, parse_batch, parse_changes
+from resilience import DEADLINE_HEADER, CircuitBreaker, admit, init_deadline
+from room_events import ROOM_EVENTS_TRANSPORT, TRANSPORTS, RoomSync, snapshots_stale
+from serializers import BookingProjection, dumps, parse_fields
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///bookings.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+init_flask(app)
+init_deadline(app)
+configure_database(app, 'sqlite:///bookings.db', 'booking-service')
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'Shivang100@')
 
 db.init_app(app)
 jwt = JWTManager(app)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Next-Offset', 'Link', 'X-Degraded'])
 
 ROOMS_BASE_URL = os.getenv('ROOMS_BASE_URL', 'http://localhost:5002')
 
+# Pooled keep-alive connections to room-service (same knobs as the gateway)
+UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', '20'))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '3'))
+UPSTREAM_READ_TIMEOUT = float(os.getenv('UPSTREAM_READ_TIMEOUT', '5'))
+UPSTREAM_RETRIES = int(os.getenv('UPSTREAM_RETRIES', '2'))
 
+class NoTimeoutRetry(Retry):
+    # A read timeout means the upstream is slow, not gone: retrying it only
+    # multiplies the wait, so it is left to the circuit breaker
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if isinstance(error, ReadTimeoutError):
+            raise error
+        return super().increment(method, url, response, error, _pool, _stacktrace)
 
+def make_session(pool_size, retries):
+    retry = NoTimeoutRetry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=0,
+        backoff_factor=0.05,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
 
-with app.app_context():
-    db.create_all()
+rooms_session = make_session(UPSTREAM_POOL_SIZE, UPSTREAM_RETRIES)
+ROOMS_TIMEOUT = (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT)
+# Per worker; see resilience.py
+room_breaker = CircuitBreaker('room')
+# Time a request keeps for itself after its last room-service call; a call
+# is not started with less than that left for it either
+ROOMS_DEADLINE_RESERVE = float(os.getenv('ROOMS_DEADLINE_RESERVE_MS', '50')) / 1000
+DEGRADED_HEADER = 'X-Degraded'
 
+def rooms_get(url, headers=None, timeout=ROOMS_TIMEOUT, **kwargs):
+    """GET from room-service within the caller's deadline (X-Request-Deadline-Ms).
+
+    Raises CircuitOpen or DeadlineExceeded without calling when room-service
+    keeps failing or the time left is too short; requests errors as usual.
+    Outside a request (the room sync poller) there is no deadline.
+    """
+    deadline = g.get('deadline')
+    admit(room_breaker, deadline, reserve=2 * ROOMS_DEADLINE_RESERVE)
+    if deadline is not None:
+        headers = dict(headers or {}, **{DEADLINE_HEADER: deadline.header(ROOMS_DEADLINE_RESERVE)})
+        connect, read = deadline.timeout(*timeout, reserve=ROOMS_DEADLINE_RESERVE)
+        timeout = (connect, read)
+    started = time.perf_counter()
+    try:
+        r = rooms_session.get(url, headers=headers, timeout=timeout, **kwargs)
+    except requests.RequestException:
+        room_breaker.record(False)
+        observe_upstream('room', 'error', time.perf_counter() - started)
+        raise
+    room_breaker.record_status(r.status_code)
+    observe_upstream('room', r.status_code, time.perf_counter() - started)
+    return r
+
+def degrade(what):
+    """Note that the response leaves something out, e.g. room details."""
+    g.setdefault('degraded', set()).add(what)
+
+# Retries when the per-room booking lock is contended
+BOOKING_LOCK_RETRIES = int(os.getenv('BOOKING_LOCK_RETRIES', '5'))
+
+# Upper bound on operations per POST /api/bookings/bulk
+BOOKINGS_BULK_MAX = int(os.getenv('BOOKINGS_BULK_MAX', '500'))
+
+# Listing is keyset-paginated on id; page size is always bounded
+BOOKINGS_PAGE_SIZE = int(os.getenv('BOOKINGS_PAGE_SIZE', '50'))
+BOOKINGS_MAX_PAGE_SIZE = int(os.getenv('BOOKINGS_MAX_PAGE_SIZE', '200'))
+
+def service_headers():
+    # The poller acts for no user, so it signs a token of its own
+    token = create_access_token(identity='booking-service', additional_claims={'role': 'service'})
+    return {'Authorization': f'Bearer {token}'}
+
+# Room details come from the local room_snapshots table; see room_events.py
+room_sync = None
+if ROOM_EVENTS_TRANSPORT and ROOM_EVENTS_TRANSPORT not in TRANSPORTS:
+    raise RuntimeError(f'Unknown ROOM_EVENTS_TRANSPORT {ROOM_EVENTS_TRANSPORT!r}; '
+                       f'use one of {", ".join(TRANSPORTS)} or leave it empty')
+if ROOM_EVENTS_TRANSPORT:
+    room_sync = RoomSync(app, TRANSPORTS[ROOM_EVENTS_TRANSPORT](ROOMS_BASE_URL, rooms_get, service_headers))
+    # gunicorn imports this module in every worker, so each starts polling
+    # at once; the hook covers servers that fork after import
+    room_sync.ensure_started()
+
+    @app.before_request
+    def start_room_sync():
+        room_sync.ensure_started()
+
+
+@app.after_request
+def mark_degraded(response):
+    if g.get('degraded'):
+        response.headers[DEGRADED_HEADER] = ','.join(sorted(g.degraded))
+    return response
 
 @app.route('/')
 def index():
     return jsonify({"message": "Booking Service running"})
 
-def fetch_room(room_id: int):
-    try:
-        headers = {}
-        auth_header = request.headers.get("Authorization")
-        if auth_header:
-            headers["Authorization"] = auth_header
-        r = requests.get(f"{ROOMS_BASE_URL}/api/rooms/{room_id}", headers=headers, timeout=5)
-        if r.status_code == 200:
-            return r.json()
-        return None
-    except Exception:
-        return None
+def check_room_snapshots():
+    # Judged from the shared sync state, so every worker and replica agrees
+    if snapshots_stale():
+        degrade('room-snapshots')
+
+def apply_room(b_dict: dict, room) -> dict:
+    if room:
+        b_dict["room_name"] = room.name
+        b_dict["room_type"] = room.room_type
+        b_dict["room_main_image"] = room.main_image
+    return b_dict
 
 def enrich_booking_dict(b_dict: dict) -> dict:
     room_id = b_dict.get("room_id")
     if not room_id:
         return b_dict
-    room = fetch_room(room_id)
-    if room:
-        b_dict["room_name"] = room.get("name")
-        b_dict["room_type"] = room.get("room_type")
-        b_dict["room_main_image"] = room.get("main_image")
-    return b_dict
+    check_room_snapshots()
+    return apply_room(b_dict, db.session.get(RoomSnapshot, room_id))
+
+def enrich_booking_dicts(b_dicts: list) -> list:
+    room_ids = {b.get("room_id") for b in b_dicts if b.get("room_id")}
+    rooms = {}
+    if room_ids:
+        check_room_snapshots()
+        rooms = {r.room_id: r for r in RoomSnapshot.query.filter(RoomSnapshot.room_id.in_(room_ids))}
+    return [apply_room(b, rooms.get(b.get("room_id"))) for b in b_dicts]
 
 @app.post('/api/bookings')
 @jwt_required()
@@ -85,19 +202,14 @@ def create_booking():
         check_in = check_out = None
         start_time = None
         duration_hours = None
+        today = datetime.utcnow().date()
 
         if booking_mode == 'daily':
             check_in = datetime.strptime(data['check_in_date'], "%Y-%m-%d").date()
             check_out = datetime.strptime(data['check_out_date'], "%Y-%m-%d").date()
             if check_in >= check_out:
                 return jsonify({"error": "Check-in date must be before check-out date"}), 400
-            conflicting_booking = Booking.query.filter(
-                Booking.room_id == int(data['room_id']),
-                Booking.check_out_date > check_in,
-                Booking.check_in_date < check_out,
-            ).first()
-            if conflicting_booking:
-                return jsonify({"error": "Booking dates overlap with existing booking"}), 409
+            slot_start, slot_end = daily_slot(check_in, check_out)
 
         if booking_mode == 'hourly':
             start_time = datetime.strptime(data['start_time'], "%H:%M").time()
@@ -105,6 +217,11 @@ def create_booking():
                 duration_hours = int(data['duration_hours'])
             except ValueError:
                 return jsonify({"error": "Invalid duration_hours, must be integer"}), 400
+            if duration_hours <= 0:
+                return jsonify({"error": "duration_hours must be positive"}), 400
+            # Optional 'date' (YYYY-MM-DD) for the slot; defaults to today
+            slot_day = datetime.strptime(data['date'], "%Y-%m-%d").date() if data.get('date') else today
+            slot_start, slot_end = hourly_slot(slot_day, start_time, duration_hours)
 
         booking = Booking(
             customer_id=int(user_id),
@@ -112,9 +229,11 @@ def create_booking():
             booking_mode=booking_mode,
             check_in_date=check_in if booking_mode == 'daily' else None,
             check_out_date=check_out if booking_mode == 'daily' else None,
-            booking_date=datetime.utcnow().date(),
+            booking_date=today,
             start_time=start_time if booking_mode == 'hourly' else None,
             duration_hours=duration_hours if booking_mode == 'hourly' else None,
+            slot_start=slot_start,
+            slot_end=slot_end,
             status=data.get('status', 'pending'),
             bill_full_name=billing.get('fullName'),
             bill_email=billing.get('email'),
@@ -127,11 +246,23 @@ def create_booking():
             bill_postal_code=billing.get('postalCode'),
             bill_country=billing.get('country') or 'India',
         )
-        db.session.add(booking)
-        db.session.commit()
+
+        def insert_if_free():
+            if find_conflict(booking.room_id, slot_start, slot_end):
+                db.session.rollback()
+                return False
+            db.session.add(booking)
+            db.session.commit()
+            return True
+
+        # Check and insert atomically per room so concurrent workers cannot double-book
+        if not run_locked(booking.room_id, insert_if_free, retries=BOOKING_LOCK_RETRIES):
+            return jsonify({"error": "Booking dates overlap with existing booking"}), 409
         created = enrich_booking_dict(booking.to_dict())
         return jsonify(created), 201
 
+    except RoomBusy:
+        return jsonify({"error": "Room is busy, please retry"}), 503, {"Retry-After": "1"}
     except ValueError:
         return jsonify({"error": "Invalid date or time format"}), 400
     except Exception as e:
@@ -141,11 +272,100 @@ def create_booking():
 @app.get('/api/bookings')
 @jwt_required()
 def list_bookings():
+    # Query params: cursor (last id seen), limit, status, room_id,
+    # customer_id (admin only), date_from/date_to (YYYY-MM-DD, stay overlap),
+    # fields (comma separated top-level keys, see serializers.py).
+    # The next page's cursor is returned in the X-Next-Cursor header.
     user_id = get_jwt_identity()
     claims = get_jwt()
     user_role = claims.get('role')
-    bookings = Booking.query.all() if user_role == 'admin' else Booking.query.filter_by(customer_id=int(user_id)).all()
-    result = [enrich_booking_dict(b.to_dict()) for b in bookings]
+    args = request.args
+    try:
+        limit = int(args.get('limit', BOOKINGS_PAGE_SIZE))
+        cursor = int(args['cursor']) if args.get('cursor') else None
+        room_id = int(args['room_id']) if args.get('room_id') else None
+        customer_id = int(args['customer_id']) if args.get('customer_id') else None
+    except ValueError:
+        return jsonify({"error": "limit, cursor, room_id and customer_id must be integers"}), 400
+    try:
+        date_from = datetime.strptime(args['date_from'], "%Y-%m-%d").date() if args.get('date_from') else None
+        date_to = datetime.strptime(args['date_to'], "%Y-%m-%d").date() if args.get('date_to') else None
+    except ValueError:
+        return jsonify({"error": "Invalid date format, expected YYYY-MM-DD"}), 400
+    try:
+        projection = BookingProjection(parse_fields(args.get('fields')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = max(1, min(limit, BOOKINGS_MAX_PAGE_SIZE))
+
+    query = Booking.query
+    if user_role != 'admin':
+        query = query.filter(Booking.customer_id == int(user_id))
+    elif customer_id is not None:
+        query = query.filter(Booking.customer_id == customer_id)
+    if args.get('status'):
+        statuses = [st for st in args['status'].split(',') if st]
+        query = query.filter(Booking.status.in_(statuses))
+    if room_id is not None:
+        query = query.filter(Booking.room_id == room_id)
+    if date_from is not None:
+        query = query.filter(Booking.check_out_date >= date_from)
+    if date_to is not None:
+        query = query.filter(Booking.check_in_date <= date_to)
+    if cursor is not None:
+        query = query.filter(Booking.id > cursor)
+
+    if projection.wants_room:
+        check_room_snapshots()
+    rows = projection.select(query).order_by(Booking.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    result = projection.to_dicts(rows)
+    response = Response(dumps(result), mimetype='application/json')
+    if has_more:
+        next_cursor = str(rows[-1][0])
+        response.headers['X-Next-Cursor'] = next_cursor
+        next_args = args.to_dict()
+        next_args['cursor'] = next_cursor
+        next_args['limit'] = str(limit)
+        response.headers['Link'] = f'<{request.path}?{urlencode(next_args)}>; rel="next"'
+    return response, 200
+
+@app.get('/api/bookings/availability')
+@jwt_required()
+def availability():
+    # Window: check_in_date + check_out_date, or date + start_time + duration_hours.
+    # Optional room_ids=1,2,3 limits the answer to those rooms and lists the free ones.
+    args = request.args
+    try:
+        if args.get('check_in_date') and args.get('check_out_date'):
+            check_in = datetime.strptime(args['check_in_date'], "%Y-%m-%d").date()
+            check_out = datetime.strptime(args['check_out_date'], "%Y-%m-%d").date()
+            if check_in >= check_out:
+                return jsonify({"error": "Check-in date must be before check-out date"}), 400
+            slot_start, slot_end = daily_slot(check_in, check_out)
+        elif args.get('date') and args.get('start_time') and args.get('duration_hours'):
+            day = datetime.strptime(args['date'], "%Y-%m-%d").date()
+            start_time = datetime.strptime(args['start_time'], "%H:%M").time()
+            duration_hours = int(args['duration_hours'])
+            if duration_hours <= 0:
+                return jsonify({"error": "duration_hours must be positive"}), 400
+            slot_start, slot_end = hourly_slot(day, start_time, duration_hours)
+        else:
+            return jsonify({"error": "Provide check_in_date and check_out_date, "
+                                     "or date, start_time and duration_hours"}), 400
+        room_ids = [int(r) for r in args.get('room_ids', '').split(',') if r.strip()]
+    except ValueError:
+        return jsonify({"error": "Invalid date, time or id format"}), 400
+
+    busy = busy_room_ids(slot_start, slot_end, room_ids or None)
+    result = {
+        "start": slot_start.isoformat(),
+        "end": slot_end.isoformat(),
+        "busy_room_ids": sorted(busy),
+    }
+    if room_ids:
+        result["available_room_ids"] = [r for r in dict.fromkeys(room_ids) if r not in busy]
     return jsonify(result), 200
 
 @app.get('/api/bookings/<int:booking_id>')
@@ -163,7 +383,9 @@ def get_booking(booking_id):
 @app.put('/api/bookings/<int:booking_id>')
 @jwt_required()
 def update_booking(booking_id):
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
     user_id = int(get_jwt_identity())
     claims = get_jwt()
     user_role = claims.get('role')
@@ -176,45 +398,63 @@ def update_booking(booking_id):
         if data['status'] != 'cancellation_requested':
             return jsonify({"error": "Insufficient permissions to update status"}), 403
 
-    if 'check_in_date' in data and 'check_out_date' in data:
+    # Validate everything before the room is locked
+    try:
+        changes = {}
+        if any(key in data for key in UPDATABLE_FIELDS):
+            changes = parse_changes({key: data[key] for key in UPDATABLE_FIELDS if key in data})
+    except ItemError as e:
+        return jsonify({"error": str(e)}), e.status
+    # 'date' moves an hourly booking to another day, as in create_booking
+    slot_day = None
+    if booking.booking_mode == 'hourly' and data.get('date') is not None:
         try:
-            check_in = datetime.strptime(data['check_in_date'], '%Y-%m-%d').date()
-            check_out = datetime.strptime(data['check_out_date'], '%Y-%m-%d').date()
-        except ValueError:
+            slot_day = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
             return jsonify({"error": "Invalid date format, expected YYYY-MM-DD"}), 400
-        if check_in >= check_out:
-            return jsonify({"error": "Check-in date must be before check-out date"}), 400
-        conflicting_booking = Booking.query.filter(
-            Booking.room_id == booking.room_id,
-            Booking.id != booking.id,
-            Booking.check_out_date > check_in,
-            Booking.check_in_date < check_out,
-        ).first()
-        if conflicting_booking:
-            return jsonify({"error": "Booking dates overlap with existing booking"}), 409
+    check_in = changes.get('check_in_date', booking.check_in_date)
+    check_out = changes.get('check_out_date', booking.check_out_date)
+    if booking.booking_mode == 'daily' and check_in and check_out and check_in >= check_out:
+        return jsonify({"error": "Check-in date must be before check-out date"}), 400
 
-    for key in ['status', 'check_in_date', 'check_out_date', 'start_time', 'duration_hours']:
-        if key in data:
-            if 'date' in key:
-                booking_date = datetime.strptime(data[key], '%Y-%m-%d').date()
-                setattr(booking, key, booking_date)
-            elif key == 'start_time':
-                setattr(booking, key, datetime.strptime(data[key], '%H:%M').time())
-            elif key == 'duration_hours':
-                try:
-                    setattr(booking, key, int(data[key]))
-                except ValueError:
-                    return jsonify({"error": "Invalid duration_hours, must be integer"}), 400
-            else:
-                setattr(booking, key, data[key])
+    def write():
+        # Read the row again inside this transaction, i.e. while the room is held
+        current = db.session.get(Booking, booking_id, populate_existing=True)
+        if current is None:
+            return None
+        previous_status = current.status
+        for key, value in changes.items():
+            setattr(current, key, value)
+        slot_start, slot_end = slot_for(current, day=slot_day)
+        reactivated = previous_status in NON_BLOCKING_STATUSES and current.status not in NON_BLOCKING_STATUSES
+        if (slot_start, slot_end) != (current.slot_start, current.slot_end) or reactivated:
+            if slot_start is not None and find_conflict(current.room_id, slot_start, slot_end,
+                                                        exclude_id=current.id):
+                db.session.rollback()
+                return False
+            current.slot_start, current.slot_end = slot_start, slot_end
+        db.session.commit()
+        return current
 
     try:
-        db.session.commit()
+        if changes or slot_day is not None:
+            # Hold the room while the new interval is checked and written
+            room_id = booking.room_id
+            db.session.rollback()
+            written = run_locked(room_id, write, retries=BOOKING_LOCK_RETRIES)
+        else:
+            written = write()
+    except RoomBusy:
+        return jsonify({"error": "Room is busy, please retry"}), 503, {"Retry-After": "1"}
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": "Database error: " + str(e)}), 500
+    if written is None:
+        return jsonify({"error": "Booking not found"}), 404
+    if written is False:
+        return jsonify({"error": "Booking dates overlap with existing booking"}), 409
 
-    b = enrich_booking_dict(booking.to_dict())
+    b = enrich_booking_dict(written.to_dict())
     return jsonify(b), 200
 
 @app.delete('/api/bookings/<int:booking_id>')
@@ -233,11 +473,60 @@ def delete_booking(booking_id):
         return jsonify({"error": "Database error: " + str(e)}), 500
     return '', 204
 
+@app.post('/api/bookings/bulk')
+@jwt_required()
+def bulk_bookings():
+    # Body: {"operations": [{"op": "update", "id": 1, "changes": {"status": "confirmed"}},
+    #                       {"op": "delete", "id": 2}], "atomic": false}
+    # or {"op": "update", "ids": [1, 2, 3], "changes": {...}} for one change to many.
+    # 200 when every operation succeeded, otherwise 207 with per-operation
+    # results. An atomic batch applies nothing unless every operation is
+    # valid and answers with the status of the first failure.
+    claims = get_jwt()
+    if claims.get('role') != 'admin':
+        return jsonify({"error": "Admin privileges required"}), 403
+    try:
+        items, atomic = parse_batch(request.get_json(silent=True), BOOKINGS_BULK_MAX)
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        results, applied = apply_batch(items, atomic=atomic, lock_retries=BOOKING_LOCK_RETRIES)
+    except RoomBusy:
+        return jsonify({"error": "Rooms are busy, please retry"}), 503, {"Retry-After": "1"}
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Database error: " + str(e)}), 500
+
+    updated = [r['booking'] for r in results if 'booking' in r]
+    if updated:
+        enrich_booking_dicts(updated)
+    failures = [r for r in results if r['status'] >= 400]
+    body = {"applied": applied, "succeeded": len(results) - len(failures), "failed": len(failures),
+            "results": results}
+    if not failures:
+        return jsonify(body), 200
+    if atomic:
+        first = next(r for r in failures if r['status'] != 424)
+        return jsonify(body), first['status']
+    return jsonify(body), 207
+
+@app.get('/room-sync/stats')
+def room_sync_stats():
+    if room_sync is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(room_sync.stats()), 200
+
+@app.get('/healthz/upstreams')
+def upstream_stats():
+    return jsonify({room_breaker.name: room_breaker.stats()}), 200
+
 @app.get('/healthz')
 def healthz():
     return {"ok": True}, 200
 
 if __name__ == '__main__':
+    # Local runs only; deployments run migrate.py as a separate step
+    from migrate import upgrade
     with app.app_context():
-        db.create_all()
+        upgrade(db.engine)
     app.run(port=5003, debug=True)
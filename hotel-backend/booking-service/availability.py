@@ -0,0 +1,148 @@
+# availability.py
+# Interval checks for rooms. Every booking occupies the half-open interval
+# [slot_start, slot_end): daily stays run midnight to midnight, hourly
+# bookings run from start_time for duration_hours on their day. One
+# overlap predicate on the (room_id, slot_start, slot_end) index therefore
+# covers both booking modes.
+import random
+import time as _time
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import or_, text
+from sqlalchemy.exc import OperationalError
+
+from models import db, Booking
+
+# Bookings in these states no longer hold the room
+NON_BLOCKING_STATUSES = ('cancelled', 'rejected')
+
+# First key of the two-int Postgres advisory lock, so room locks cannot
+# collide with advisory locks taken for other purposes
+ROOM_LOCK_NAMESPACE = 7301
+
+
+class RoomBusy(Exception):
+    """The room lock could not be taken after all retries."""
+
+
+def daily_slot(check_in, check_out):
+    return datetime.combine(check_in, time.min), datetime.combine(check_out, time.min)
+
+
+def hourly_slot(day, start_time, duration_hours):
+    start = datetime.combine(day, start_time)
+    return start, start + timedelta(hours=duration_hours)
+
+
+def slot_for(booking, day=None):
+    """Interval a booking occupies, or (None, None) when it is incomplete."""
+    if booking.booking_mode == 'hourly':
+        if booking.start_time is None or not booking.duration_hours:
+            return None, None
+        if day is None:
+            day = booking.slot_start.date() if booking.slot_start else booking.booking_date
+        if day is None:
+            return None, None
+        return hourly_slot(day, booking.start_time, booking.duration_hours)
+    if booking.check_in_date is None or booking.check_out_date is None:
+        return None, None
+    return daily_slot(booking.check_in_date, booking.check_out_date)
+
+
+def _blocking(query):
+    return query.filter(or_(Booking.status.is_(None), Booking.status.notin_(NON_BLOCKING_STATUSES)))
+
+
+def find_conflict(room_id, slot_start, slot_end, exclude_id=None):
+    """First booking holding room_id anywhere inside [slot_start, slot_end)."""
+    query = Booking.query.filter(
+        Booking.room_id == room_id,
+        Booking.slot_start < slot_end,
+        Booking.slot_end > slot_start,
+    )
+    if exclude_id is not None:
+        query = query.filter(Booking.id != exclude_id)
+    return _blocking(query).first()
+
+
+def busy_room_ids(slot_start, slot_end, room_ids=None):
+    """Set of rooms with at least one blocking booking in the window, in one query."""
+    query = db.session.query(Booking.room_id).filter(
+        Booking.slot_start < slot_end,
+        Booking.slot_end > slot_start,
+    )
+    if room_ids:
+        query = query.filter(Booking.room_id.in_(room_ids))
+    return {room_id for (room_id,) in _blocking(query).distinct()}
+
+
+def lock_room(room_id):
+    """Serialize conflict-check-then-write per room until the transaction ends.
+
+    PostgreSQL takes a transaction-scoped advisory lock keyed by the room, so
+    other rooms proceed in parallel. SQLite has no row locks, so the
+    transaction is started with BEGIN IMMEDIATE, which takes the database
+    write lock before the overlap check runs. Other backends are not locked.
+    Must be called before anything else touches the database in the current
+    transaction.
+    """
+    lock_rooms([room_id])
+
+
+def lock_rooms(room_ids):
+    """lock_room for several rooms, taken in ascending id order so two
+    batches locking overlapping rooms cannot deadlock."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for room_id in sorted(set(room_ids)):
+            db.session.execute(text('SELECT pg_advisory_xact_lock(:ns, :room_id)'),
+                               {'ns': ROOM_LOCK_NAMESPACE, 'room_id': room_id})
+    elif dialect == 'sqlite':
+        db.session.execute(text('BEGIN IMMEDIATE'))
+
+
+def blocking_intervals(room_ids, slot_start, slot_end, exclude_ids=()):
+    """{room_id: [(slot_start, slot_end, booking_id)]} of blocking bookings on
+    those rooms inside [slot_start, slot_end), in one query."""
+    query = db.session.query(Booking.room_id, Booking.slot_start, Booking.slot_end, Booking.id).filter(
+        Booking.room_id.in_(room_ids),
+        Booking.slot_start < slot_end,
+        Booking.slot_end > slot_start,
+    )
+    if exclude_ids:
+        query = query.filter(Booking.id.notin_(exclude_ids))
+    intervals = {}
+    for room_id, start, end, booking_id in _blocking(query):
+        intervals.setdefault(room_id, []).append((start, end, booking_id))
+    return intervals
+
+
+def _retryable(exc):
+    message = str(exc.orig if getattr(exc, 'orig', None) is not None else exc).lower()
+    return any(marker in message for marker in (
+        'database is locked', 'deadlock', 'could not serialize', 'lock timeout',
+    ))
+
+
+def run_locked(room_id, work, retries=5, backoff=0.02):
+    """Run work() under lock_room(room_id), retrying lock contention errors.
+
+    work() does the overlap check and the write and must commit or roll back
+    itself. Raises RoomBusy when every attempt hit contention.
+    """
+    return run_locked_rooms([room_id], work, retries=retries, backoff=backoff)
+
+
+def run_locked_rooms(room_ids, work, retries=5, backoff=0.02):
+    """run_locked for a set of rooms locked together (see lock_rooms)."""
+    for attempt in range(retries + 1):
+        try:
+            lock_rooms(room_ids)
+            return work()
+        except OperationalError as exc:
+            db.session.rollback()
+            if not _retryable(exc):
+                raise
+            if attempt == retries:
+                raise RoomBusy(room_ids) from exc
+            _time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
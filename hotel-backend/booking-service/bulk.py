@@ -0,0 +1,213 @@
+# bulk.py
+# Batch updates and deletes of bookings (POST /api/bookings/bulk).
+#
+# However many items a batch has, it costs a fixed number of statements:
+# one read of the rooms involved, one lock pass over them (see
+# availability.lock_rooms), one load of the bookings, one overlap query
+# for every interval the batch moves or re-activates, and one commit.
+# Items are checked in request order against the existing bookings and
+# the items before them and get a result each. Unless the batch is
+# atomic, valid items are applied even when others fail.
+from datetime import datetime
+from types import SimpleNamespace
+
+from availability import NON_BLOCKING_STATUSES, blocking_intervals, run_locked_rooms, slot_for
+from models import db, Booking
+
+OPERATIONS = ('update', 'delete')
+# What PUT /api/bookings/<id> lets an admin change
+UPDATABLE_FIELDS = ('status', 'check_in_date', 'check_out_date', 'start_time', 'duration_hours')
+
+
+class BatchError(ValueError):
+    """The request body is not a batch at all; nothing was looked at."""
+
+
+class ItemError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_batch(payload, max_items):
+    """Return (items, atomic). Malformed items carry an 'error' instead of failing the batch.
+
+    Accepts {"operations": [{"op", "id", "changes"}, ...]} or the shorthand
+    {"op": ..., "ids": [...], "changes": {...}} applying one change to every id.
+    """
+    if not isinstance(payload, dict):
+        raise BatchError('Expected a JSON object')
+    if 'operations' in payload:
+        operations = payload['operations']
+        if not isinstance(operations, list):
+            raise BatchError('operations must be a list')
+    elif 'ids' in payload:
+        if not isinstance(payload['ids'], list):
+            raise BatchError('ids must be a list')
+        operations = [{'op': payload.get('op'), 'id': booking_id, 'changes': payload.get('changes')}
+                      for booking_id in payload['ids']]
+    else:
+        raise BatchError('Provide operations, or op and ids')
+    if not operations:
+        raise BatchError('The batch is empty')
+    if len(operations) > max_items:
+        raise BatchError(f'At most {max_items} operations per batch')
+
+    items, seen = [], set()
+    for index, operation in enumerate(operations):
+        item = {'index': index, 'op': None, 'id': None}
+        items.append(item)
+        if not isinstance(operation, dict):
+            item['error'] = (400, 'Each operation must be an object')
+            continue
+        item['op'], item['id'] = operation.get('op'), operation.get('id')
+        try:
+            if item['op'] not in OPERATIONS:
+                raise ItemError(400, f"op must be one of: {', '.join(OPERATIONS)}")
+            if not isinstance(item['id'], int) or isinstance(item['id'], bool):
+                raise ItemError(400, 'id must be an integer')
+            if item['id'] in seen:
+                raise ItemError(400, 'Booking appears more than once in the batch')
+            seen.add(item['id'])
+            if item['op'] == 'update':
+                item['changes'] = parse_changes(operation.get('changes'))
+        except ItemError as e:
+            item['error'] = (e.status, str(e))
+    return items, bool(payload.get('atomic', False))
+
+
+def parse_changes(changes):
+    if not isinstance(changes, dict) or not changes:
+        raise ItemError(400, 'changes must be a non-empty object')
+    unknown = set(changes).difference(UPDATABLE_FIELDS)
+    if unknown:
+        raise ItemError(400, f"Cannot change: {', '.join(sorted(unknown))}")
+    parsed = {}
+    try:
+        for key in ('check_in_date', 'check_out_date'):
+            if key in changes:
+                parsed[key] = datetime.strptime(changes[key], '%Y-%m-%d').date()
+        if 'start_time' in changes:
+            parsed['start_time'] = datetime.strptime(changes['start_time'], '%H:%M').time()
+    except (TypeError, ValueError):
+        raise ItemError(400, 'Invalid date or time format')
+    if 'duration_hours' in changes:
+        try:
+            parsed['duration_hours'] = int(changes['duration_hours'])
+        except (TypeError, ValueError):
+            raise ItemError(400, 'Invalid duration_hours, must be integer')
+        if parsed['duration_hours'] <= 0:
+            raise ItemError(400, 'duration_hours must be positive')
+    if 'status' in changes:
+        if not isinstance(changes['status'], str) or not changes['status']:
+            raise ItemError(400, 'status must be a non-empty string')
+        parsed['status'] = changes['status']
+    return parsed
+
+
+def _blocks(status, slot_start):
+    return slot_start is not None and status not in NON_BLOCKING_STATUSES
+
+
+def _resolve(booking, changes):
+    """New field values and slot for an update, validated against the booking."""
+    values = {key: changes.get(key, getattr(booking, key)) for key in UPDATABLE_FIELDS}
+    if booking.booking_mode == 'daily' and values['check_in_date'] and values['check_out_date'] \
+            and values['check_in_date'] >= values['check_out_date']:
+        raise ItemError(400, 'Check-in date must be before check-out date')
+    target = SimpleNamespace(booking_mode=booking.booking_mode, slot_start=booking.slot_start,
+                             booking_date=booking.booking_date, **values)
+    values['slot_start'], values['slot_end'] = slot_for(target)
+    return values
+
+
+def apply_batch(items, atomic=False, lock_retries=5):
+    """Validate and apply parsed items; returns (results, applied).
+
+    results[i] is {"index", "id", "op", "status", "error" | "booking"}.
+    Raises availability.RoomBusy when the room locks stay contended.
+    """
+    ids = [item['id'] for item in items if 'error' not in item]
+    update_ids = [item['id'] for item in items if 'error' not in item and item['op'] == 'update']
+    # room_id never changes, so it can be read before the rooms are locked
+    room_ids = set()
+    if update_ids:
+        room_ids = {room_id for (room_id,) in
+                    db.session.query(Booking.room_id).filter(Booking.id.in_(update_ids)).distinct()}
+    db.session.rollback()
+    return run_locked_rooms(room_ids, lambda: _apply(items, ids, room_ids, atomic), retries=lock_retries)
+
+
+def _apply(items, ids, locked_rooms, atomic):
+    bookings = {b.id: b for b in Booking.query.filter(Booking.id.in_(ids))} if ids else {}
+    results = []
+    plans = []  # (result, booking, values or None for a delete)
+    for item in items:
+        result = {'index': item['index'], 'id': item['id'], 'op': item['op']}
+        results.append(result)
+        try:
+            if 'error' in item:
+                raise ItemError(*item['error'])
+            booking = bookings.get(item['id'])
+            if booking is None:
+                raise ItemError(404, 'Booking not found')
+            values = None
+            if item['op'] == 'update':
+                if booking.room_id not in locked_rooms:
+                    raise ItemError(503, 'Room is busy, please retry')  # created after the room read
+                values = _resolve(booking, item['changes'])
+            plans.append((result, booking, values))
+        except ItemError as e:
+            result['status'], result['error'] = e.status, str(e)
+
+    # Rooms still held by the batch's own bookings, unless the batch frees them
+    moving = [(result, booking, values) for result, booking, values in plans if values is not None
+              and _blocks(values['status'], values['slot_start'])
+              and ((values['slot_start'], values['slot_end']) != (booking.slot_start, booking.slot_end)
+                   or not _blocks(booking.status, booking.slot_start))]
+    if moving:
+        occupied = blocking_intervals(
+            {booking.room_id for _, booking, _ in moving},
+            min(values['slot_start'] for _, _, values in moving),
+            max(values['slot_end'] for _, _, values in moving),
+            exclude_ids=list(bookings),
+        )
+        occupied = {room_id: {booking_id: (start, end) for start, end, booking_id in intervals}
+                    for room_id, intervals in occupied.items()}
+        freed = {booking.id for _, booking, values in plans
+                 if values is None or not _blocks(values['status'], values['slot_start'])}
+        for booking in bookings.values():
+            if booking.id not in freed and _blocks(booking.status, booking.slot_start):
+                occupied.setdefault(booking.room_id, {})[booking.id] = (booking.slot_start, booking.slot_end)
+        for plan in moving:
+            result, booking, values = plan
+            room = occupied.setdefault(booking.room_id, {})
+            start, end = values['slot_start'], values['slot_end']
+            conflict = next((other for other, (s, e) in room.items()
+                             if other != booking.id and s < end and e > start), None)
+            if conflict is not None:
+                result['status'] = 409
+                result['error'] = f'Booking dates overlap with existing booking {conflict}'
+                plans.remove(plan)
+            else:
+                room[booking.id] = (start, end)
+
+    failed = len(plans) < len(items)
+    if atomic and failed:
+        db.session.rollback()
+        for result, _, _ in plans:
+            result['status'], result['error'] = 424, 'Not applied: another operation in the batch failed'
+        return results, False
+
+    for result, booking, values in plans:
+        if values is None:
+            db.session.delete(booking)
+            result['status'] = 204
+            continue
+        for key, value in values.items():
+            setattr(booking, key, value)
+        result['status'] = 200
+        # Serialized before the commit expires the instances
+        result['booking'] = booking.to_dict()
+    db.session.commit()
+    return results, bool(plans)
@@ -0,0 +1,57 @@
+# gateway_claims.py
+# Opt-in trust of the claims the api-gateway already verified.
+#
+# With TRUST_GATEWAY_CLAIMS=1, jwt_required() accepts the X-Verified-Claims
+# header set by the gateway instead of re-checking the token signature.
+# Only enable it when the service is reachable exclusively through the
+# gateway (which strips that header from client requests).
+#
+# Keep this file identical in every service (bench/check_shared_modules.py).
+import base64
+import json
+import os
+import time
+from functools import wraps
+
+from flask import current_app, g, request
+from flask_jwt_extended import jwt_required as _jwt_required
+
+TRUST_GATEWAY_CLAIMS = os.getenv('TRUST_GATEWAY_CLAIMS', '0') == '1'
+CLAIMS_HEADER = 'X-Verified-Claims'
+
+
+def claims_from_gateway():
+    raw = request.headers.get(CLAIMS_HEADER)
+    if not raw:
+        return None
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(raw.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(claims, dict) or claims.get('type') != 'access':
+        return None
+    if float(claims.get('exp') or 0) <= time.time():
+        return None
+    return claims
+
+
+def jwt_required(optional=False, fresh=False, refresh=False, **kwargs):
+    """Drop-in for flask_jwt_extended.jwt_required honouring gateway claims."""
+    def wrapper(fn):
+        verified = _jwt_required(optional=optional, fresh=fresh, refresh=refresh, **kwargs)(fn)
+
+        @wraps(fn)
+        def decorator(*args, **kw):
+            if TRUST_GATEWAY_CLAIMS and not refresh and not fresh:
+                claims = claims_from_gateway()
+                if claims is not None:
+                    g._jwt_extended_jwt = claims
+                    g._jwt_extended_jwt_header = {}
+                    g._jwt_extended_jwt_user = {"loaded_user": None}
+                    g._jwt_extended_jwt_location = "headers"
+                    return current_app.ensure_sync(fn)(*args, **kw)
+            return verified(*args, **kw)
+
+        return decorator
+
+    return wrapper
@@ -0,0 +1,152 @@
+# migrate.py
+# Versioned schema migrations. Run once per deploy before the workers start
+# (docker-compose *-migrate services, k8s init containers):
+#
+#   python migrate.py                   apply pending migrations
+#   python migrate.py --status          list applied and pending versions
+#   python migrate.py --target 0002     stop after that version
+#
+# Migrations are migrations/NNNN_<name>.py modules with upgrade(conn). Each
+# runs in one transaction together with its schema_migrations row. Modules
+# that set TRANSACTIONAL = False (CREATE INDEX CONCURRENTLY on PostgreSQL)
+# run on an autocommit connection and must be idempotent. Runners are
+# serialized by an advisory lock on PostgreSQL and by the write lock on
+# SQLite, so every replica may run this safely.
+#
+# Keep this file identical in every service (bench/check_shared_modules.py).
+import argparse
+import importlib
+import pkgutil
+import re
+import sys
+import zlib
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+
+import migrations
+from database import configure_database
+from models import db
+
+# First key of the two-int advisory lock, next to booking-service's room locks
+MIGRATION_LOCK_NAMESPACE = 7300
+
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('service', String(50), primary_key=True),
+    Column('version', String(20), primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def discover():
+    """[(version, name, module)] sorted by version."""
+    found = []
+    for info in pkgutil.iter_modules(migrations.__path__):
+        match = re.match(r'^(\d{4})_(\w+)$', info.name)
+        if match:
+            module = importlib.import_module(f'migrations.{info.name}')
+            found.append((match.group(1), match.group(2), module))
+    return sorted(found, key=lambda m: m[0])
+
+
+def _begin(conn):
+    trans = conn.begin()
+    if conn.dialect.name == 'sqlite':
+        # Take the write lock now so concurrent runners queue up here
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+    return trans
+
+
+def _applied(conn):
+    rows = conn.execute(select(schema_migrations.c.version)
+                        .where(schema_migrations.c.service == migrations.SERVICE))
+    return {version for (version,) in rows}
+
+
+def _record(conn, version, name):
+    conn.execute(schema_migrations.insert().values(
+        service=migrations.SERVICE, version=version, name=name, applied_at=datetime.utcnow()))
+
+
+def _lock_args():
+    return {'ns': MIGRATION_LOCK_NAMESPACE, 'key': zlib.crc32(migrations.SERVICE.encode()) & 0x7fffffff}
+
+
+def upgrade(engine, target=None, log=print):
+    """Apply pending migrations up to target (inclusive); returns the versions applied."""
+    done = []
+    with engine.connect() as conn:
+        postgres = conn.dialect.name == 'postgresql'
+        if postgres:
+            conn.execute(text('SELECT pg_advisory_lock(:ns, :key)'), _lock_args())
+            conn.commit()
+        try:
+            with _begin(conn):
+                schema_migrations.create(conn, checkfirst=True)
+            for version, name, module in discover():
+                if target and version > target:
+                    break
+                if getattr(module, 'TRANSACTIONAL', True):
+                    with _begin(conn):
+                        if version in _applied(conn):
+                            continue
+                        log(f'applying {version}_{name}')
+                        module.upgrade(conn)
+                        _record(conn, version, name)
+                else:
+                    with _begin(conn):
+                        pending = version not in _applied(conn)
+                    if not pending:
+                        continue
+                    log(f'applying {version}_{name} (non-transactional)')
+                    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as auto:
+                        module.upgrade(auto)
+                    with _begin(conn):
+                        if version not in _applied(conn):
+                            _record(conn, version, name)
+                done.append(version)
+        finally:
+            if postgres:
+                conn.rollback()
+                conn.execute(text('SELECT pg_advisory_unlock(:ns, :key)'), _lock_args())
+                conn.commit()
+    return done
+
+
+def status(engine):
+    with engine.connect() as conn:
+        applied = _applied(conn) if inspect(conn).has_table('schema_migrations') else set()
+    return [(version, name, version in applied) for version, name, _ in discover()]
+
+
+def make_app():
+    # Same instance folder as app.py, so relative SQLite paths match
+    app = Flask(__name__)
+    configure_database(app, migrations.DEFAULT_DATABASE_URI, f'{migrations.SERVICE}-migrate')
+    db.init_app(app)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply schema migrations')
+    parser.add_argument('--status', action='store_true')
+    parser.add_argument('--target', help='last version to apply, e.g. 0002')
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        if args.status:
+            for version, name, applied in status(db.engine):
+                print(f"{version}_{name}: {'applied' if applied else 'pending'}")
+            return 0
+        done = upgrade(db.engine, target=args.target)
+        print(f'{migrations.SERVICE}: {len(done)} migration(s) applied')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
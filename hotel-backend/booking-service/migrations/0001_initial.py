@@ -0,0 +1,33 @@
+# The bookings table as db.create_all() used to create it. Existing
+# databases already have it and only get the version recorded.
+from sqlalchemy import Column, Date, Integer, MetaData, String, Table, Time
+
+metadata = MetaData()
+
+bookings = Table(
+    'bookings', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('customer_id', Integer, nullable=False, index=True),
+    Column('room_id', Integer, nullable=False, index=True),
+    Column('booking_mode', String(10), nullable=False),
+    Column('check_in_date', Date),
+    Column('check_out_date', Date),
+    Column('booking_date', Date),
+    Column('start_time', Time),
+    Column('duration_hours', Integer),
+    Column('status', String(30)),
+    Column('bill_full_name', String(120), nullable=False),
+    Column('bill_email', String(120), nullable=False),
+    Column('bill_phone', String(30), nullable=False),
+    Column('bill_gstin', String(20)),
+    Column('bill_address1', String(200), nullable=False),
+    Column('bill_address2', String(200)),
+    Column('bill_city', String(100), nullable=False),
+    Column('bill_state', String(100), nullable=False),
+    Column('bill_postal_code', String(20), nullable=False),
+    Column('bill_country', String(80), nullable=False),
+)
+
+
+def upgrade(conn):
+    bookings.create(conn, checkfirst=True)
@@ -0,0 +1,63 @@
+# The availability engine's schema change: slot_start/slot_end, the
+# interval each booking occupies (see availability.py), backfilled for
+# existing rows. Hourly bookings without a booking_date stay NULL, as
+# there is no day to place them on. The interval is computed here as the
+# engine defined it when the columns were added, so later changes to
+# availability.py cannot change what this migration writes. Columns that
+# already exist (tables created with them) are left as they are.
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, String, Table, Time, inspect, select, text
+
+BATCH_SIZE = 500
+
+metadata = MetaData()
+
+bookings = Table(
+    'bookings', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('booking_mode', String(10)),
+    Column('check_in_date', Date),
+    Column('check_out_date', Date),
+    Column('booking_date', Date),
+    Column('start_time', Time),
+    Column('duration_hours', Integer),
+    Column('slot_start', DateTime),
+    Column('slot_end', DateTime),
+)
+
+
+def slot_for(row):
+    # Daily: midnight to midnight; hourly: start_time plus duration_hours on booking_date
+    if row.booking_mode == 'hourly':
+        if row.start_time is None or not row.duration_hours or row.booking_date is None:
+            return None, None
+        start = datetime.combine(row.booking_date, row.start_time)
+        return start, start + timedelta(hours=row.duration_hours)
+    if row.check_in_date is None or row.check_out_date is None:
+        return None, None
+    return datetime.combine(row.check_in_date, time.min), datetime.combine(row.check_out_date, time.min)
+
+
+def upgrade(conn):
+    existing = {col['name'] for col in inspect(conn).get_columns('bookings')}
+    for name in ('slot_start', 'slot_end'):
+        if name not in existing:
+            column_type = bookings.c[name].type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE bookings ADD COLUMN {name} {column_type}'))
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(bookings)
+            .where(bookings.c.slot_start.is_(None), bookings.c.id > last_id)
+            .order_by(bookings.c.id)
+            .limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        for row in rows:
+            start, end = slot_for(row)
+            if start is not None:
+                conn.execute(bookings.update().where(bookings.c.id == row.id)
+                             .values(slot_start=start, slot_end=end))
+        last_id = rows[-1].id
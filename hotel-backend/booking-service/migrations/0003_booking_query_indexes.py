@@ -0,0 +1,35 @@
+# Indexes for keyset paging per filter and for availability lookups. Built
+# CONCURRENTLY on PostgreSQL so bookings keep being written meanwhile.
+from sqlalchemy import Column, Date, DateTime, Index, Integer, MetaData, String, Table
+
+TRANSACTIONAL = False
+
+metadata = MetaData()
+
+bookings = Table(
+    'bookings', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('customer_id', Integer),
+    Column('room_id', Integer),
+    Column('check_in_date', Date),
+    Column('check_out_date', Date),
+    Column('status', String(30)),
+    Column('slot_start', DateTime),
+    Column('slot_end', DateTime),
+)
+
+c = bookings.c
+INDEXES = [
+    Index('ix_bookings_status_id', c.status, c.id, postgresql_concurrently=True),
+    Index('ix_bookings_room_id_id', c.room_id, c.id, postgresql_concurrently=True),
+    Index('ix_bookings_customer_id_id', c.customer_id, c.id, postgresql_concurrently=True),
+    Index('ix_bookings_check_in_date_id', c.check_in_date, c.id, postgresql_concurrently=True),
+    Index('ix_bookings_room_slot', c.room_id, c.slot_start, c.slot_end, postgresql_concurrently=True),
+    Index('ix_bookings_room_dates', c.room_id, c.check_in_date, c.check_out_date,
+          postgresql_concurrently=True),
+]
+
+
+def upgrade(conn):
+    for index in INDEXES:
+        index.create(conn, checkfirst=True)
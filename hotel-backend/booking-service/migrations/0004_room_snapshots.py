@@ -0,0 +1,27 @@
+# Local room snapshots replicated from room-service's change events (see
+# room_events.py). They fill in on the first sync, starting at event 0.
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+
+metadata = MetaData()
+
+room_snapshots = Table(
+    'room_snapshots', metadata,
+    Column('room_id', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(120)),
+    Column('room_type', String(50)),
+    Column('main_image', String(250)),
+    Column('event_id', Integer, nullable=False),
+)
+
+room_sync_state = Table(
+    'room_sync_state', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('cursor', Integer, nullable=False),
+    Column('updated_at', DateTime),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+    if conn.execute(select(room_sync_state.c.id).where(room_sync_state.c.id == 1)).first() is None:
+        conn.execute(room_sync_state.insert().values(id=1, cursor=0))
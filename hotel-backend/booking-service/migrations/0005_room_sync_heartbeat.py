@@ -0,0 +1,8 @@
+# room_sync_state.synced_at: when any worker last read room-service's
+# change feed, so every replica judges room_snapshots' staleness alike.
+from sqlalchemy import inspect, text
+
+
+def upgrade(conn):
+    if 'synced_at' not in {col['name'] for col in inspect(conn).get_columns('room_sync_state')}:
+        conn.execute(text('ALTER TABLE room_sync_state ADD COLUMN synced_at TIMESTAMP'))
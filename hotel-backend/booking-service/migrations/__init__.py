@@ -0,0 +1,3 @@
+# booking-service schema migrations, applied by migrate.py
+SERVICE = 'booking'
+DEFAULT_DATABASE_URI = 'sqlite:///bookings.db'
@@ -4,6 +4,16 @@ db = SQLAlchemy()
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    # Composite (filter, id) indexes back keyset pagination on id per filter
+    __table_args__ = (
+        db.Index('ix_bookings_status_id', 'status', 'id'),
+        db.Index('ix_bookings_room_id_id', 'room_id', 'id'),
+        db.Index('ix_bookings_customer_id_id', 'customer_id', 'id'),
+        db.Index('ix_bookings_check_in_date_id', 'check_in_date', 'id'),
+        # Availability lookups: room first, then the occupied interval
+        db.Index('ix_bookings_room_slot', 'room_id', 'slot_start', 'slot_end'),
+        db.Index('ix_bookings_room_dates', 'room_id', 'check_in_date', 'check_out_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
 
 
@@ -16,6 +26,9 @@ class Booking(db.Model):
     start_time = db.Column(db.Time)
     duration_hours = db.Column(db.Integer)
     status = db.Column(db.String(30), default='pending')
+    # Half-open interval the booking holds the room for (see availability.py)
+    slot_start = db.Column(db.DateTime)
+    slot_end = db.Column(db.DateTime)
 
     bill_full_name   = db.Column(db.String(120), nullable=False)
     bill_email       = db.Column(db.String(120), nullable=False)
@@ -41,6 +54,9 @@ class Booking(db.Model):
             "start_time": self.start_time.strftime("%H:%M") if self.start_time else None,
             "duration_hours": self.duration_hours,
             "status": self.status,
+            # The interval held, which also gives an hourly booking's day
+            "slot_start": self.slot_start.isoformat() if self.slot_start else None,
+            "slot_end": self.slot_end.isoformat() if self.slot_end else None,
 
             "billing": {
                 "fullName": self.bill_full_name,
@@ -55,3 +71,23 @@ class Booking(db.Model):
                 "country": self.bill_country,
             }
         }
+
+
+class RoomSnapshot(db.Model):
+    # Local copy of the room fields bookings show, kept by room_events.py
+    __tablename__ = 'room_snapshots'
+    room_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(120))
+    room_type = db.Column(db.String(50))
+    main_image = db.Column(db.String(250))
+    event_id = db.Column(db.Integer, nullable=False)  # room-service event it was taken from
+
+
+class RoomSyncState(db.Model):
+    # Single row: the last room-service event applied to room_snapshots
+    __tablename__ = 'room_sync_state'
+    id = db.Column(db.Integer, primary_key=True)
+    cursor = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
+    # Last time any worker of any replica reached room-service's feed
+    synced_at = db.Column(db.DateTime)
@@ -0,0 +1,192 @@
+# room_events.py
+# room_snapshots: the room fields bookings show (name, type, main image),
+# replicated from room-service's change events so that booking reads join
+# them locally instead of calling room-service.
+#
+# A transport delivers room-service's events in id order; RoomSync applies
+# each batch to room_snapshots and moves room_sync_state.cursor in one
+# transaction. The 'outbox' transport polls GET /api/rooms/events (see
+# room-service events.py). A broker consumer only has to provide the same
+# fetch(after, limit): the events with ids above after, oldest first.
+#
+# Every worker runs a poller thread from the time it starts. The cursor is
+# moved with a conditional UPDATE before anything else is written, so when
+# two workers fetch the same batch only the first one applies it.
+#
+# Successful polls also stamp room_sync_state.synced_at (at most every
+# stale_after / 3 seconds while idle). Staleness is judged from that shared
+# row, so every worker and replica agrees on it, including ones that do not
+# sync themselves.
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from metrics import metrics
+from models import RoomSnapshot, RoomSyncState, db
+
+# 'outbox', or empty to leave room_snapshots to other replicas
+ROOM_EVENTS_TRANSPORT = os.getenv('ROOM_EVENTS_TRANSPORT', 'outbox')
+# Pause between polls once caught up; a full batch is followed at once
+ROOM_SYNC_INTERVAL = float(os.getenv('ROOM_SYNC_INTERVAL', '1'))
+ROOM_SYNC_BATCH = int(os.getenv('ROOM_SYNC_BATCH', '500'))
+# With no successful poll anywhere for this long, room details are reported
+# as possibly stale
+ROOM_SYNC_STALE_AFTER = float(os.getenv('ROOM_SYNC_STALE_AFTER', '30'))
+
+ROOM_UPSERTED = 'room.upserted'
+ROOM_DELETED = 'room.deleted'
+
+
+def snapshots_stale(stale_after=ROOM_SYNC_STALE_AFTER):
+    """True when no worker has reached room-service's feed for stale_after seconds."""
+    synced_at = db.session.execute(db.select(RoomSyncState.synced_at).where(RoomSyncState.id == 1)).scalar()
+    return synced_at is None or datetime.utcnow() - synced_at > timedelta(seconds=stale_after)
+
+
+class TransportError(Exception):
+    pass
+
+
+class OutboxTransport:
+    """Batches from room-service's outbox over HTTP.
+
+    get(url, params=, headers=) performs the call (a requests-style
+    response); headers() gives the credentials for it.
+    """
+
+    def __init__(self, base_url, get, headers):
+        self.base_url = base_url
+        self._get = get
+        self._headers = headers
+
+    def fetch(self, after, limit):
+        r = self._get(f'{self.base_url}/api/rooms/events', params={'after': after, 'limit': limit},
+                      headers=self._headers())
+        if r.status_code != 200:
+            raise TransportError(f'room-service answered {r.status_code}')
+        return r.json()['events']
+
+
+TRANSPORTS = {'outbox': OutboxTransport}
+
+
+class RoomSync:
+    def __init__(self, app, transport, interval=ROOM_SYNC_INTERVAL, batch=ROOM_SYNC_BATCH,
+                 stale_after=ROOM_SYNC_STALE_AFTER):
+        self.app = app
+        self.transport = transport
+        self.interval = interval
+        self.batch = batch
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._pid = None
+        self.cursor = None
+        self.polls = 0
+        self.applied = 0
+        self.conflicts = 0
+        self.failures = 0
+        self._failing_since = None
+        self.last_error = None
+
+    def ensure_started(self):
+        """Start this worker's poller thread (once per process, so after a fork too)."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+        threading.Thread(target=self._run, name='room-sync', daemon=True).start()
+
+    def _run(self):
+        while True:
+            fetched = 0
+            try:
+                with self.app.app_context():
+                    fetched = self.poll()
+            except Exception as e:
+                self._failed(e)
+            else:
+                self._succeeded()
+            if fetched < self.batch:
+                time.sleep(self.interval)
+
+    def poll(self):
+        """Fetch and apply one batch; returns how many events were fetched."""
+        state = db.session.get(RoomSyncState, 1)
+        cursor = state.cursor if state else 0
+        # Hold no transaction while waiting on the transport
+        db.session.rollback()
+        events = self.transport.fetch(cursor, self.batch)
+        self.polls += 1
+        if events:
+            self.apply(cursor, events)
+        else:
+            self.heartbeat()
+        return len(events)
+
+    def heartbeat(self):
+        """Stamp synced_at unless some worker did so recently."""
+        now = datetime.utcnow()
+        db.session.execute(
+            db.update(RoomSyncState)
+            .where(RoomSyncState.id == 1,
+                   db.or_(RoomSyncState.synced_at.is_(None),
+                          RoomSyncState.synced_at < now - timedelta(seconds=self.stale_after / 3)))
+            .values(synced_at=now))
+        db.session.commit()
+
+    def apply(self, cursor, events):
+        """Apply events read after cursor; False when another worker applied them first."""
+        now = datetime.utcnow()
+        moved = db.session.execute(
+            db.update(RoomSyncState)
+            .where(RoomSyncState.id == 1, RoomSyncState.cursor == cursor)
+            .values(cursor=events[-1]['id'], updated_at=now, synced_at=now))
+        if moved.rowcount == 0:
+            # The worker that got there first stamped synced_at
+            db.session.rollback()
+            self.conflicts += 1
+            return False
+        # Only the last event per room in the batch matters
+        latest = {e['room_id']: e for e in events if e['type'] in (ROOM_UPSERTED, ROOM_DELETED)}
+        if latest:
+            db.session.execute(db.delete(RoomSnapshot).where(RoomSnapshot.room_id.in_(list(latest))))
+            rows = [{'room_id': room_id, 'name': e['room'].get('name'), 'room_type': e['room'].get('room_type'),
+                     'main_image': e['room'].get('main_image'), 'event_id': e['id']}
+                    for room_id, e in latest.items() if e['type'] == ROOM_UPSERTED]
+            if rows:
+                db.session.execute(db.insert(RoomSnapshot), rows)
+        db.session.commit()
+        self.cursor = events[-1]['id']
+        self.applied += len(events)
+        metrics.inc('replicated_events_total', (('source', 'room'),), len(events))
+        return True
+
+    def _failed(self, error):
+        self.failures += 1
+        self.last_error = f'{type(error).__name__}: {error}'
+        if self._failing_since is None:
+            self._failing_since = time.monotonic()
+            self.app.logger.warning('room sync failing: %s', self.last_error)
+
+    def _succeeded(self):
+        if self._failing_since is not None:
+            self._failing_since = None
+            self.app.logger.warning('room sync recovered')
+
+    def stats(self):
+        since = self._failing_since
+        return {
+            'transport': type(self.transport).__name__,
+            'cursor': self.cursor,
+            'polls': self.polls,
+            'applied': self.applied,
+            'conflicts': self.conflicts,
+            'failures': self.failures,
+            'failing_for': round(time.monotonic() - since, 1) if since is not None else 0.0,
+            'stale': snapshots_stale(self.stale_after),
+            'last_error': self.last_error,
+        }
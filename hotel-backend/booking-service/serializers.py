@@ -0,0 +1,138 @@
+# serializers.py
+# Column-projected serialization for booking listings.
+#
+# List views select only the columns their fields need and build dicts
+# straight from row tuples, skipping ORM instances and the per-row
+# to_dict() work. ?fields= picks top-level keys, e.g.
+# fields=id,status,check_in_date,check_out_date,room; without it the
+# output matches Booking.to_dict() plus the room fields, which come from
+# an outer join on the local room_snapshots table.
+import json
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder gives the same output
+    orjson = None
+
+from models import Booking, RoomSnapshot
+
+# Top-level key -> column, in to_dict() order
+SCALAR_FIELDS = {
+    'id': Booking.id,
+    'customer_id': Booking.customer_id,
+    'room_id': Booking.room_id,
+    'booking_mode': Booking.booking_mode,
+    'check_in_date': Booking.check_in_date,
+    'check_out_date': Booking.check_out_date,
+    'booking_date': Booking.booking_date,
+    'start_time': Booking.start_time,
+    'duration_hours': Booking.duration_hours,
+    'status': Booking.status,
+    'slot_start': Booking.slot_start,
+    'slot_end': Booking.slot_end,
+}
+BILLING_FIELDS = {
+    'fullName': Booking.bill_full_name,
+    'email': Booking.bill_email,
+    'phone': Booking.bill_phone,
+    'gstin': Booking.bill_gstin,
+    'address1': Booking.bill_address1,
+    'address2': Booking.bill_address2,
+    'city': Booking.bill_city,
+    'state': Booking.bill_state,
+    'postalCode': Booking.bill_postal_code,
+    'country': Booking.bill_country,
+}
+# 'room' stands for these, present when the room has a snapshot
+ROOM_FIELDS = {
+    'room_name': RoomSnapshot.name,
+    'room_type': RoomSnapshot.room_type,
+    'room_main_image': RoomSnapshot.main_image,
+}
+ALL_FIELDS = list(SCALAR_FIELDS) + ['billing', 'room']
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _hhmm(value):
+    return value.strftime("%H:%M") if value else None
+
+
+_CONVERTERS = {
+    'check_in_date': _isoformat,
+    'check_out_date': _isoformat,
+    'booking_date': _isoformat,
+    'start_time': _hhmm,
+    'slot_start': _isoformat,
+    'slot_end': _isoformat,
+}
+
+
+def parse_fields(raw):
+    """Requested fields in canonical order. Raises ValueError on unknown names."""
+    if not raw:
+        return list(ALL_FIELDS)
+    wanted = {f.strip() for f in raw.split(',') if f.strip()}
+    unknown = wanted.difference(ALL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [f for f in ALL_FIELDS if f in wanted]
+
+
+class BookingProjection:
+    """Columns to select for a field list and how to turn rows into dicts.
+
+    id is always selected (the keyset cursor needs it) but only emitted
+    when asked for.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.wants_room = 'room' in fields
+        scalars = [f for f in SCALAR_FIELDS if f in fields or f == 'id']
+        self.columns = [SCALAR_FIELDS[f] for f in scalars]
+        # (row index, key, converter) for every emitted scalar
+        self._scalars = [(i, f, _CONVERTERS.get(f)) for i, f in enumerate(scalars) if f in fields]
+        self._billing = None
+        if 'billing' in fields:
+            start = len(self.columns)
+            self.columns += list(BILLING_FIELDS.values())
+            self._billing = [(start + i, key) for i, key in enumerate(BILLING_FIELDS)]
+        self._room = None
+        if self.wants_room:
+            # Snapshot key first: NULL when the outer join found no room
+            start = len(self.columns)
+            self.columns += [RoomSnapshot.room_id] + list(ROOM_FIELDS.values())
+            self._room = (start, [(start + 1 + i, key) for i, key in enumerate(ROOM_FIELDS)])
+
+    def select(self, query):
+        """query (on Booking) narrowed to the projected columns."""
+        query = query.with_entities(*self.columns)
+        if self.wants_room:
+            query = query.outerjoin(RoomSnapshot, RoomSnapshot.room_id == Booking.room_id)
+        return query
+
+    def to_dicts(self, rows):
+        scalars, billing, room = self._scalars, self._billing, self._room
+        out = []
+        for row in rows:
+            d = {}
+            for i, key, convert in scalars:
+                value = row[i]
+                d[key] = convert(value) if convert else value
+            if billing:
+                d['billing'] = {key: row[i] for i, key in billing}
+            if room and row[room[0]] is not None:
+                for i, key in room[1]:
+                    d[key] = row[i]
+            out.append(d)
+        return out
+
+
+def dumps(payload):
+    """Compact JSON bytes for a response body."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode()
@@ -1,17 +1,31 @@
 # rooms-service app.py
 import os
 import json
-from flask import Flask, request, jsonify, send_from_directory
+import hashlib
+import mimetypes
+from flask import Flask, Response, abort, request, jsonify, send_from_directory
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, jwt_required, get_jwt
+from flask_jwt_extended import JWTManager, get_jwt
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-from models import db, Room
+from gateway_claims import jwt_required
+from database import configure_database
+from models import db, Room, bump_catalog_version, current_catalog_version
+from catalog_cache import CatalogCache
+from events import ROOM_DELETED, ROOM_UPSERTED, events_after, publish
+from metrics import init_flask, metrics
+from resilience import init_deadline
+from search import filter_rooms
+from serializers import ALL_FIELDS, RoomProjection, dumps, parse_fields
+from images import (NotAnImage, is_content_addressed, original_for_variant, schedule_variants, store_upload,
+                    variant_urls)
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///rooms.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+init_flask(app)
+init_deadline(app)
+configure_database(app, 'sqlite:///rooms.db', 'room-service')
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'Shivang100@')
-CORS(app)
+CORS(app, expose_headers=['X-Next-Offset'])
 
 # Upload config
 UPLOAD_FOLDER = 'uploads'
@@ -19,16 +33,52 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Upload delivery. Content-addressed names are immutable and cached for a
+# year; other (legacy) names get UPLOADS_MAX_AGE. With
+# UPLOADS_ACCEL_REDIRECT set (e.g. /protected-uploads/) the response only
+# carries headers and an X-Accel-Redirect for nginx to send the file from
+# an 'internal' location aliased to the uploads folder. Otherwise
+# send_from_directory answers Range and conditional requests and hands
+# the file to gunicorn's wsgi.file_wrapper, which uses sendfile().
+UPLOADS_MAX_AGE = int(os.getenv('UPLOADS_MAX_AGE', '3600'))
+UPLOADS_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+UPLOADS_ACCEL_REDIRECT = os.getenv('UPLOADS_ACCEL_REDIRECT', '')
+
 db.init_app(app)
 jwt = JWTManager(app)
 
+# Serialized catalog shared by the requests of this worker
+catalog_cache = CatalogCache()
+metrics.register_cache('catalog', catalog_cache.stats, misses=('rebuilds',))
+
+# Page size cap for filtered room listings
+MAX_ROOMS_PAGE_SIZE = int(os.getenv('MAX_ROOMS_PAGE_SIZE', '200'))
+# Upper bound on ids accepted by the bulk lookup; callers chunk larger sets
+MAX_BULK_IDS = int(os.getenv('MAX_BULK_IDS', '500'))
+# Upper bound on change events per GET /api/rooms/events
+MAX_EVENTS_BATCH = int(os.getenv('MAX_EVENTS_BATCH', '1000'))
+# Roles allowed to read the change feed and catalog version: other services'
+# own tokens (role 'service') and admins
+INTERNAL_ROLES = {'service', 'admin'}
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def conditional_response(response, etag):
+    # Clients must revalidate, which is a cheap 304 while the catalog is unchanged
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
+def parse_id_list(raw):
+    ids = []
+    for part in (raw or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        ids.append(int(part))
+    return ids
 
-with app.app_context():
-    db.create_all()
 
 
 @app.route('/api/upload-image', methods=['POST'])
@@ -40,30 +90,146 @@ def upload_image():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        ext = secure_filename(file.filename).rsplit('.', 1)[1].lower()
+        # Stored by content hash; resized variants are built in the background
+        try:
+            filename = store_upload(file, app.config['UPLOAD_FOLDER'], ext)
+        except NotAnImage:
+            return jsonify({'error': 'File is not a valid image'}), 400
         url = f'/uploads/{filename}'
-        return jsonify({'url': url})
+        return jsonify({'url': url, 'variants': variant_urls(url)})
     return jsonify({'error': 'File type not allowed'}), 400
 
+def send_upload(folder, filename, cacheable=True):
+    immutable = cacheable and is_content_addressed(filename)
+    if UPLOADS_ACCEL_REDIRECT:
+        path = safe_join(folder, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = UPLOADS_ACCEL_REDIRECT.rstrip('/') + '/' + filename
+    else:
+        # A content hash is the strongest validator there is; legacy files
+        # fall back to werkzeug's mtime/size based ETag
+        response = send_from_directory(
+            folder, filename,
+            conditional=True,
+            etag=filename if immutable else True,
+            max_age=UPLOADS_IMMUTABLE_MAX_AGE if immutable else UPLOADS_MAX_AGE,
+        )
+    if not cacheable:
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = UPLOADS_IMMUTABLE_MAX_AGE if immutable else UPLOADS_MAX_AGE
+        response.cache_control.immutable = immutable
+    return response
+
 @app.route('/uploads/<path:filename>')
 def serve_uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    folder = app.config['UPLOAD_FOLDER']
+    if not os.path.exists(os.path.join(folder, filename)):
+        # Variant not generated yet (or lost): serve the original meanwhile
+        original = original_for_variant(filename, folder, ALLOWED_EXTENSIONS)
+        if original:
+            schedule_variants(folder, original)
+            return send_upload(folder, original, cacheable=False)
+    return send_upload(folder, filename)
 
 @app.route('/api/rooms', methods=['GET'])
 @jwt_required()
 def list_rooms():
-    rooms = Room.query.all()
-    return jsonify([room.to_dict() for room in rooms])
+    if request.args:
+        return search_rooms()
+    version = current_catalog_version()
+    etag = f'rooms-{version}'
+    # Answer revalidations before touching the rooms table at all
+    if request.if_none_match.contains(etag):
+        return conditional_response(Response(status=304), etag)
+    projection = RoomProjection(ALL_FIELDS)
+    body = catalog_cache.get(version, lambda: projection.to_dicts(
+        Room.query.with_entities(*projection.columns).order_by(Room.id).all()))
+    return conditional_response(Response(body, mimetype='application/json'), etag)
+
+def search_rooms():
+    # Filtered/paged listing; see search.filter_rooms for the parameters.
+    # When more rows exist, X-Next-Offset carries the next page's offset.
+    version = current_catalog_version()
+    args_key = hashlib.sha1(json.dumps(sorted(request.args.items(multi=True))).encode()).hexdigest()[:16]
+    etag = f'rooms-{version}-{args_key}'
+    if request.if_none_match.contains(etag):
+        return conditional_response(Response(status=304), etag)
+    try:
+        projection = RoomProjection(parse_fields(request.args.get('fields')))
+        query = filter_rooms(request.args).with_entities(*projection.columns)
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+        offset = int(request.args.get('offset') or 0)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+    if limit is not None:
+        limit = max(1, min(limit, MAX_ROOMS_PAGE_SIZE))
+        rooms = query.offset(max(0, offset)).limit(limit + 1).all()
+    else:
+        rooms = query.offset(max(0, offset)).all()
+    response = Response(dumps(projection.to_dicts(rooms[:limit])), mimetype='application/json')
+    if limit is not None and len(rooms) > limit:
+        response.headers['X-Next-Offset'] = str(max(0, offset) + limit)
+    return conditional_response(response, etag)
+
+@app.route('/api/rooms/bulk', methods=['GET'])
+@jwt_required()
+def bulk_rooms():
+    # GET /api/rooms/bulk?ids=1,2,3[&fields=...] -> rooms that exist, in one query
+    try:
+        ids = parse_id_list(request.args.get('ids'))
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma separated list of integers'}), 400
+    try:
+        projection = RoomProjection(parse_fields(request.args.get('fields')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_BULK_IDS:
+        return jsonify({'error': f'At most {MAX_BULK_IDS} ids per request'}), 400
+    if not ids:
+        return jsonify([])
+    rows = Room.query.with_entities(*projection.columns).filter(Room.id.in_(ids)).all()
+    return Response(dumps(projection.to_dicts(rows)), mimetype='application/json')
+
+@app.route('/api/rooms/version', methods=['GET'])
+@jwt_required()
+def catalog_version():
+    # The gateway's room response cache watches this to drop old entries
+    # (see api-gateway/response_cache.py)
+    if get_jwt().get('role') not in INTERNAL_ROLES:
+        return jsonify({'error': 'Service or admin token required'}), 403
+    return jsonify({'version': current_catalog_version()})
+
+@app.route('/api/rooms/events', methods=['GET'])
+@jwt_required()
+def room_events():
+    # GET /api/rooms/events?after=<last id seen>&limit=N -> change events in
+    # commit order; see events.py. Consumers poll until a short batch.
+    if get_jwt().get('role') not in INTERNAL_ROLES:
+        return jsonify({'error': 'Service or admin token required'}), 403
+    try:
+        after = int(request.args.get('after') or 0)
+        limit = int(request.args.get('limit') or MAX_EVENTS_BATCH)
+    except ValueError:
+        return jsonify({'error': 'after and limit must be integers'}), 400
+    events = events_after(after, max(1, min(limit, MAX_EVENTS_BATCH)))
+    return Response(dumps({'events': events}), mimetype='application/json')
 
 @app.route('/api/rooms/<int:room_id>', methods=['GET'])
 @jwt_required()
 def get_room(room_id):
+    etag = f'room-{room_id}-{current_catalog_version()}'
+    if request.if_none_match.contains(etag):
+        return conditional_response(Response(status=304), etag)
     room = Room.query.get(room_id)
     if not room:
         return jsonify({'error': 'Room not found'}), 404
-    return jsonify(room.to_dict())
+    return conditional_response(jsonify(room.to_dict()), etag)
 
 @app.route('/api/rooms', methods=['POST'])
 @jwt_required()
@@ -83,6 +249,8 @@ def create_room():
         secondary_images=json.dumps(data.get('secondary_images', []))
     )
     db.session.add(room)
+    bump_catalog_version()
+    publish(ROOM_UPSERTED, room)
     db.session.commit()
     return jsonify(room.to_dict()), 201
 
@@ -101,6 +269,8 @@ def update_room(room_id):
                 setattr(room, key, json.dumps(data[key]))
             else:
                 setattr(room, key, data[key])
+    bump_catalog_version()
+    publish(ROOM_UPSERTED, room)
     db.session.commit()
     return jsonify(room.to_dict())
 
@@ -113,14 +283,22 @@ def delete_room(room_id):
         return jsonify({'error': 'Admin access required'}), 403
     room = Room.query.get_or_404(room_id)
     db.session.delete(room)
+    bump_catalog_version()
+    publish(ROOM_DELETED, room)
     db.session.commit()
     return jsonify({'message': 'Room deleted'})
 
+@app.get('/catalog-cache/stats')
+def catalog_cache_stats():
+    return jsonify(catalog_cache.stats()), 200
+
 @app.get('/healthz')
 def healthz():
     return {"ok": True}, 200
 
 if __name__ == '__main__':
+    # Local runs only; deployments run migrate.py as a separate step
+    from migrate import upgrade
     with app.app_context():
-        db.create_all()
+        upgrade(db.engine)
     app.run(port=5002, debug=True)
@@ -0,0 +1,31 @@
+# catalog_cache.py
+# Pre-serialized room catalog, rebuilt only when the catalog version moves.
+import json
+import threading
+
+
+class CatalogCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._body = None
+        self.hits = 0
+        self.rebuilds = 0
+
+    def get(self, version, build):
+        """Return the JSON bytes for version, calling build() -> list on a miss."""
+        with self._lock:
+            if self._version == version and self._body is not None:
+                self.hits += 1
+                return self._body
+        body = json.dumps(build(), separators=(',', ':')).encode()
+        with self._lock:
+            self._version = version
+            self._body = body
+            self.rebuilds += 1
+        return body
+
+    def stats(self):
+        with self._lock:
+            return {"version": self._version, "bytes": len(self._body or b''),
+                    "hits": self.hits, "rebuilds": self.rebuilds}
@@ -0,0 +1,76 @@
+# database.py
+# Engine settings for SQLite (local default) and PostgreSQL (production).
+#
+# PostgreSQL gets a bounded, pre-pinged connection pool per worker plus
+# server-side statement and idle-transaction timeouts. SQLite files are
+# switched to WAL so readers are not blocked by the writer, and wait on a
+# busy timeout instead of failing with "database is locked".
+#
+# Keep this file identical in every service (bench/check_shared_modules.py).
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000'))
+DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = int(os.getenv('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', '60000'))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+
+def database_uri(default):
+    uri = os.getenv('SQLALCHEMY_DATABASE_URI') or os.getenv('DATABASE_URL') or default
+    # Heroku-style URLs; SQLAlchemy only accepts the postgresql scheme
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def engine_options(uri, application_name):
+    if uri.startswith('postgresql'):
+        return {
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'pool_recycle': DB_POOL_RECYCLE,
+            'pool_pre_ping': True,
+            'connect_args': {
+                'connect_timeout': DB_CONNECT_TIMEOUT,
+                'application_name': application_name,
+                'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS} '
+                           f'-c idle_in_transaction_session_timeout={DB_IDLE_IN_TRANSACTION_TIMEOUT_MS}',
+            },
+        }
+    if uri.startswith('sqlite'):
+        return {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {}
+
+
+def configure_database(app, default_uri, application_name):
+    """Set the URI and engine options on app.config before db.init_app(app)."""
+    uri = database_uri(default_uri)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri, application_name)
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f'PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}')
+        if cursor.execute('PRAGMA database_list').fetchone()[2]:
+            # WAL needs a file; in-memory databases keep their journal mode
+            cursor.execute('PRAGMA journal_mode = WAL')
+            # Durable at checkpoints; with WAL this only risks the last
+            # transactions on power loss, never corruption
+            cursor.execute('PRAGMA synchronous = NORMAL')
+    finally:
+        cursor.close()
@@ -0,0 +1,51 @@
+# events.py
+# Room change events for the local copies other services keep (booking-
+# service's room_snapshots).
+#
+# publish() writes the event into the room_events outbox inside the
+# caller's transaction, so an event exists exactly when its change was
+# committed. Consumers read the outbox in id order in batches from
+# GET /api/rooms/events; a relay pushing it to a broker would read it the
+# same way.
+#
+# Only the latest event per room is kept, so the outbox is also a full
+# snapshot a new consumer can start from at 0, and never outgrows the
+# rooms table plus deletions. Writers publish after bump_catalog_version(),
+# whose row lock serializes room writes: ids are then handed out in commit
+# order and a consumer that has read up to N never misses a later commit
+# below N.
+import json
+from datetime import datetime
+
+from models import RoomEvent, db
+
+ROOM_UPSERTED = 'room.upserted'
+ROOM_DELETED = 'room.deleted'
+
+# What consumers get of a room; enough for listings next to other data
+SUMMARY_FIELDS = ('id', 'name', 'room_type', 'price_per_day', 'price_per_hour', 'main_image')
+
+
+def room_summary(room):
+    return {field: getattr(room, field) for field in SUMMARY_FIELDS}
+
+
+def publish(event_type, room):
+    """Add an event for room to the current transaction (room.id must be set)."""
+    db.session.execute(db.delete(RoomEvent).where(RoomEvent.room_id == room.id))
+    payload = json.dumps(room_summary(room)) if event_type == ROOM_UPSERTED else None
+    db.session.add(RoomEvent(room_id=room.id, event_type=event_type, payload=payload,
+                             created_at=datetime.utcnow()))
+
+
+def events_after(after, limit):
+    """Events with id > after, oldest first, as dicts."""
+    rows = (RoomEvent.query.filter(RoomEvent.id > after)
+            .order_by(RoomEvent.id).limit(limit).all())
+    return [{
+        'id': row.id,
+        'type': row.event_type,
+        'room_id': row.room_id,
+        'room': json.loads(row.payload) if row.payload else None,
+        'created_at': row.created_at.isoformat(),
+    } for row in rows]
@@ -0,0 +1,168 @@
+# images.py
+# Content-addressed upload storage with resized variants.
+#
+# Uploads are stored as <sha256>.<ext>, so identical files dedupe and
+# different files can never overwrite each other. Resized JPEG variants
+# (<sha256>_<size>.jpg) are generated by a small background thread pool;
+# until a variant exists the original is served in its place. With Pillow
+# installed, uploads it cannot parse are refused, and an original whose
+# variants failed once is not decoded again by this worker.
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it only originals are served
+    Image = None
+
+# name -> bounding box; variants are only ever scaled down
+VARIANTS = {
+    'thumb': (320, 320),
+    'medium': (1024, 1024),
+    'large': (2048, 2048),
+}
+JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '82'))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '2'))
+
+_HASHED_NAME = re.compile(r'^(?P<digest>[0-9a-f]{64})\.(?P<ext>[a-z0-9]+)$')
+_VARIANT_NAME = re.compile(r'^(?P<digest>[0-9a-f]{64})_(?P<size>[a-z]+)\.jpg$')
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+# Originals whose variants could not be built; they are served as they are
+_failed = set()
+
+
+class NotAnImage(ValueError):
+    pass
+
+
+def _pool():
+    # Created lazily so every gunicorn worker gets its own threads after fork
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='image-variants')
+        return _executor
+
+
+def store_upload(file_storage, upload_dir, ext):
+    """Save an uploaded file under its content hash; returns the stored file name.
+
+    Raises NotAnImage when Pillow is available and cannot parse the file.
+    """
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file_storage.stream.read(64 * 1024)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        _verify_image(tmp_path)
+        filename = f'{digest.hexdigest()}.{ext}'
+        final_path = os.path.join(upload_dir, filename)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    schedule_variants(upload_dir, filename)
+    return filename
+
+
+def _verify_image(path):
+    if Image is None:
+        return
+    try:
+        with Image.open(path) as img:
+            img.verify()
+    except Exception as e:
+        raise NotAnImage(str(e)) from None
+
+
+def is_content_addressed(filename):
+    """True for names derived from the file's hash, whose bytes never change."""
+    return bool(_HASHED_NAME.match(filename) or _VARIANT_NAME.match(filename))
+
+
+def variant_name(filename, size):
+    match = _HASHED_NAME.match(filename)
+    if not match or size not in VARIANTS:
+        return None
+    return f"{match.group('digest')}_{size}.jpg"
+
+
+def original_for_variant(filename, upload_dir, extensions):
+    """Map <sha256>_<size>.jpg back to the stored original, if there is one."""
+    match = _VARIANT_NAME.match(filename)
+    if not match or match.group('size') not in VARIANTS:
+        return None
+    for ext in sorted(extensions):
+        name = f"{match.group('digest')}.{ext}"
+        if os.path.exists(os.path.join(upload_dir, name)):
+            return name
+    return None
+
+
+def schedule_variants(upload_dir, filename):
+    if Image is None or not _HASHED_NAME.match(filename):
+        return
+    with _executor_lock:
+        if filename in _pending or filename in _failed:
+            return
+        _pending.add(filename)
+    _pool().submit(_generate_variants, upload_dir, filename)
+
+
+def _generate_variants(upload_dir, filename):
+    try:
+        source = os.path.join(upload_dir, filename)
+        with Image.open(source) as img:
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            for size, box in VARIANTS.items():
+                target = os.path.join(upload_dir, variant_name(filename, size))
+                if os.path.exists(target):
+                    continue
+                variant = img.copy()
+                variant.thumbnail(box)
+                fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix='.variant-', suffix='.jpg')
+                try:
+                    with os.fdopen(fd, 'wb') as out:
+                        variant.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+                    os.replace(tmp_path, target)
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+    except Exception:
+        # Not a decodable image; the original keeps being served for every size
+        with _executor_lock:
+            _failed.add(filename)
+    finally:
+        with _executor_lock:
+            _pending.discard(filename)
+
+
+def variant_urls(url):
+    """Size-selectable URLs for an image URL; non-hashed URLs map to themselves."""
+    if not url:
+        return {}
+    filename = url.rsplit('/', 1)[-1]
+    urls = {'original': url}
+    base = url[:len(url) - len(filename)]
+    for size in VARIANTS:
+        name = variant_name(filename, size)
+        urls[size] = f'{base}{name}' if name else url
+    return urls
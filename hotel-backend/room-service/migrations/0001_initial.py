@@ -0,0 +1,21 @@
+# The room table as db.create_all() used to create it. Existing databases
+# already have it and only get the version recorded.
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+room = Table(
+    'room', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(120), nullable=False),
+    Column('room_type', String(50), nullable=False),
+    Column('description', Text),
+    Column('price_per_day', Float, nullable=False),
+    Column('price_per_hour', Float),
+    Column('main_image', String(250)),
+    Column('secondary_images', Text),
+)
+
+
+def upgrade(conn):
+    room.create(conn, checkfirst=True)
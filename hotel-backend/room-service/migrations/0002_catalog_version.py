@@ -0,0 +1,17 @@
+# Single-row version counter bumped by every room write. The row exists from
+# the start so writers always lock it with their UPDATE (see events.py).
+from sqlalchemy import Column, Integer, MetaData, Table, select
+
+metadata = MetaData()
+
+catalog_version = Table(
+    'catalog_version', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False),
+)
+
+
+def upgrade(conn):
+    catalog_version.create(conn, checkfirst=True)
+    if conn.execute(select(catalog_version.c.id).where(catalog_version.c.id == 1)).first() is None:
+        conn.execute(catalog_version.insert().values(id=1, version=0))
@@ -0,0 +1,28 @@
+# Indexes behind the filter and sort options in search.py. Built
+# CONCURRENTLY on PostgreSQL so room writes continue during the build.
+from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table
+
+TRANSACTIONAL = False
+
+metadata = MetaData()
+
+room = Table(
+    'room', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(120)),
+    Column('room_type', String(50)),
+    Column('price_per_day', Float),
+    Column('price_per_hour', Float),
+)
+
+INDEXES = [
+    Index('ix_room_type_price_day', room.c.room_type, room.c.price_per_day, postgresql_concurrently=True),
+    Index('ix_room_price_day', room.c.price_per_day, postgresql_concurrently=True),
+    Index('ix_room_price_hour', room.c.price_per_hour, postgresql_concurrently=True),
+    Index('ix_room_name', room.c.name, postgresql_concurrently=True),
+]
+
+
+def upgrade(conn):
+    for index in INDEXES:
+        index.create(conn, checkfirst=True)
@@ -0,0 +1,39 @@
+# Text search index: FTS5 table and triggers on SQLite, GIN expression
+# index (built CONCURRENTLY) on PostgreSQL. search.py detects which one
+# exists; its _PG_DOCUMENT must stay the expression indexed here.
+from sqlalchemy import text
+
+TRANSACTIONAL = False
+
+PG_DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS room_fts USING fts5("
+    "name, description, content='room', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS room_fts_ai AFTER INSERT ON room BEGIN "
+    "INSERT INTO room_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS room_fts_ad AFTER DELETE ON room BEGIN "
+    "INSERT INTO room_fts(room_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS room_fts_au AFTER UPDATE ON room BEGIN "
+    "INSERT INTO room_fts(room_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO room_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+]
+
+
+def upgrade(conn):
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'room_fts'")).first() is not None
+        try:
+            for ddl in SQLITE_FTS_DDL:
+                conn.execute(text(ddl))
+        except Exception:
+            # SQLite built without FTS5; search falls back to LIKE
+            return
+        if not exists:
+            conn.execute(text("INSERT INTO room_fts(room_fts) VALUES ('rebuild')"))
+    elif dialect == 'postgresql':
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_room_search ON room USING gin ({PG_DOCUMENT})"))
@@ -0,0 +1,53 @@
+# Outbox of room change events (see events.py), started with one
+# room.upserted event per existing room so consumers can begin at 0.
+import json
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, Index, Integer, MetaData, String, Table, Text, select
+
+BATCH_SIZE = 500
+# As events.py wrote them when this migration was added
+ROOM_UPSERTED = 'room.upserted'
+SUMMARY_FIELDS = ('id', 'name', 'room_type', 'price_per_day', 'price_per_hour', 'main_image')
+
+metadata = MetaData()
+
+room = Table(
+    'room', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(120)),
+    Column('room_type', String(50)),
+    Column('price_per_day', Float),
+    Column('price_per_hour', Float),
+    Column('main_image', String(250)),
+)
+
+room_events = Table(
+    'room_events', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('room_id', Integer, nullable=False),
+    Column('event_type', String(30), nullable=False),
+    Column('payload', Text),
+    Column('created_at', DateTime, nullable=False),
+    Index('ix_room_events_room_id', 'room_id'),
+    # Consumers track the last id they saw, so ids are never reused
+    sqlite_autoincrement=True,
+)
+
+
+def upgrade(conn):
+    room_events.create(conn, checkfirst=True)
+    now = datetime.utcnow()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(room).where(room.c.id > last_id).order_by(room.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        conn.execute(room_events.insert(), [{
+            'room_id': row.id,
+            'event_type': ROOM_UPSERTED,
+            'payload': json.dumps({field: getattr(row, field) for field in SUMMARY_FIELDS}),
+            'created_at': now,
+        } for row in rows])
+        last_id = rows[-1].id
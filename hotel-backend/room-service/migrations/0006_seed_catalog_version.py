@@ -0,0 +1,16 @@
+# Databases that ran 0002 before it seeded the catalog_version row and have
+# had no room write since still lack it; bump_catalog_version needs it.
+from sqlalchemy import Column, Integer, MetaData, Table, select
+
+metadata = MetaData()
+
+catalog_version = Table(
+    'catalog_version', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False),
+)
+
+
+def upgrade(conn):
+    if conn.execute(select(catalog_version.c.id).where(catalog_version.c.id == 1)).first() is None:
+        conn.execute(catalog_version.insert().values(id=1, version=0))
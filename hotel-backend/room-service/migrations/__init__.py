@@ -0,0 +1,3 @@
+# room-service schema migrations, applied by migrate.py
+SERVICE = 'room'
+DEFAULT_DATABASE_URI = 'sqlite:///rooms.db'
@@ -1,9 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 import json
+from images import variant_urls
 
 db = SQLAlchemy()
 
 class Room(db.Model):
+    # Backing indexes for the filter/sort options in search.py
+    __table_args__ = (
+        db.Index('ix_room_type_price_day', 'room_type', 'price_per_day'),
+        db.Index('ix_room_price_day', 'price_per_day'),
+        db.Index('ix_room_price_hour', 'price_per_hour'),
+        db.Index('ix_room_name', 'name'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     room_type = db.Column(db.String(50), nullable=False)
@@ -14,6 +22,7 @@ class Room(db.Model):
     secondary_images = db.Column(db.Text)  # JSON string list
 
     def to_dict(self):
+        secondary = json.loads(self.secondary_images) if self.secondary_images else []
         return {
             'id': self.id,
             'name': self.name,
@@ -22,5 +31,43 @@ class Room(db.Model):
             'price_per_day': self.price_per_day,
             'price_per_hour': self.price_per_hour,
             'main_image': self.main_image,
-            'secondary_images': json.loads(self.secondary_images) if self.secondary_images else []
+            'secondary_images': secondary,
+            'main_image_variants': variant_urls(self.main_image),
+            'secondary_image_variants': [variant_urls(url) for url in secondary],
         }
+
+
+class RoomEvent(db.Model):
+    # Outbox of room changes for other services; see events.py
+    __tablename__ = 'room_events'
+    # Ids must never be reused after compaction deletes the newest event
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    room_id = db.Column(db.Integer, nullable=False, index=True)
+    event_type = db.Column(db.String(30), nullable=False)
+    payload = db.Column(db.Text)  # JSON room summary, NULL for deletions
+    created_at = db.Column(db.DateTime, nullable=False)
+
+
+class CatalogVersion(db.Model):
+    # Single row bumped by every room write; readers compare it to invalidate caches
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+def bump_catalog_version():
+    """Increment the catalog version inside the caller's transaction."""
+    # Atomic UPDATE so concurrent writers never collapse onto the same version
+    result = db.session.execute(
+        db.update(CatalogVersion)
+        .where(CatalogVersion.id == 1)
+        .values(version=CatalogVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        # Seeded by migrations/0002; inserting here would race other first writers
+        raise RuntimeError('catalog_version row missing; run migrate.py')
+
+
+def current_catalog_version():
+    row = CatalogVersion.query.get(1)
+    return row.version if row else 0
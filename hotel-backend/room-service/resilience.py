@@ -0,0 +1,171 @@
+# resilience.py
+# Circuit breakers and request deadlines for calls to other services.
+#
+# A CircuitBreaker per upstream (per worker) opens after
+# BREAKER_FAILURE_THRESHOLD consecutive failures: connection errors,
+# timeouts, 502 and 504. While open, calls fail at once instead of
+# waiting on a timeout. After BREAKER_RESET_TIMEOUT seconds it lets
+# BREAKER_HALF_OPEN_PROBES calls through; a success closes it again, a
+# failure re-opens it.
+#
+# The gateway gives every request a deadline of REQUEST_DEADLINE_MS and
+# passes the time left on in DEADLINE_HEADER (milliseconds), so each hop
+# caps its own upstream timeouts to what the caller will still wait for,
+# and drops requests that sat in its queue until their caller gave up.
+# Remaining time is relative, so clocks need not agree between hosts.
+#
+# Keep this file identical in every service (bench/check_shared_modules.py).
+import os
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from metrics import metrics
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', '10'))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv('BREAKER_HALF_OPEN_PROBES', '1'))
+
+DEADLINE_HEADER = 'X-Request-Deadline-Ms'
+# What the gateway allows a request in total; a client may ask for less.
+# 0 turns deadlines off
+REQUEST_DEADLINE_MS = float(os.getenv('REQUEST_DEADLINE_MS', '15000'))
+
+# Upstream statuses meaning "not reachable or not answering", as opposed
+# to an answer (503s here are load shedding with Retry-After)
+FAILURE_STATUSES = (502, 504)
+
+
+class CircuitOpen(Exception):
+    def __init__(self, upstream, retry_after):
+        super().__init__(f'{upstream} is unavailable')
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT, half_open_probes=BREAKER_HALF_OPEN_PROBES):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probing_since = 0.0
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        """Claim a call, or raise CircuitOpen. Every allowed call must end in record()."""
+        with self._lock:
+            if self.state == 'open':
+                waited = time.monotonic() - self._opened_at
+                if waited < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpen(self.name, self.reset_timeout - waited)
+                self.state = 'half_open'
+                self._probes = 0
+                self._probing_since = time.monotonic()
+            if self.state == 'half_open':
+                if self._probes >= self.half_open_probes \
+                        and time.monotonic() - self._probing_since >= self.reset_timeout:
+                    # Probes that never reported back are taken as lost
+                    self._probes = 0
+                    self._probing_since = time.monotonic()
+                if self._probes >= self.half_open_probes:
+                    self.rejected += 1
+                    raise CircuitOpen(self.name, 1.0)
+                self._probes += 1
+
+    def record(self, ok):
+        with self._lock:
+            if self.state == 'half_open':
+                self._probes = max(0, self._probes - 1)
+            if ok:
+                if self.state != 'closed':
+                    metrics.add('circuit_breaker_open', (('upstream', self.name),), -1)
+                self.state = 'closed'
+                self._failures = 0
+                return
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state == 'closed':
+                    metrics.add('circuit_breaker_open', (('upstream', self.name),))
+                    self.opened += 1
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+    def record_status(self, status):
+        self.record(status not in FAILURE_STATUSES)
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self._failures,
+                    'opened': self.opened, 'rejected': self.rejected}
+
+
+class Deadline:
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_header(cls, value, default_ms=None):
+        """Deadline from an incoming DEADLINE_HEADER, capped at default_ms; None if neither is set."""
+        budget = None
+        if value:
+            try:
+                budget = max(0.0, float(value))
+            except ValueError:
+                pass
+        if default_ms:
+            budget = default_ms if budget is None else min(budget, default_ms)
+        return None if budget is None else cls(budget / 1000)
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, connect, read, reserve=0.0):
+        """(connect, read) timeouts cut to the time left, less reserve."""
+        left = self.remaining() - reserve
+        return min(connect, left), min(read, left)
+
+    def header(self, reserve=0.0):
+        """DEADLINE_HEADER value for a call made now."""
+        return str(int((self.remaining() - reserve) * 1000))
+
+
+def init_deadline(app, default_ms=None, error_key='error'):
+    """Set g.deadline (or None) for every request of a Flask app.
+
+    Requests arriving with no time left get a 504 without running.
+    """
+    def start():
+        g.deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER), default_ms)
+        if g.deadline is not None and g.deadline.remaining() == 0:
+            return jsonify({error_key: 'Deadline exceeded'}), 504
+
+    app.before_request(start)
+
+
+def admit(breaker, deadline, reserve=0.01):
+    """Raise CircuitOpen or DeadlineExceeded instead of starting a call that cannot help.
+
+    reserve: seconds that must be left for the call (and whatever the
+    caller still has to do afterwards).
+    """
+    if deadline is not None and deadline.remaining() <= reserve:
+        metrics.inc('upstream_rejected_total', (('upstream', breaker.name), ('reason', 'deadline')))
+        raise DeadlineExceeded(f'no time left to call {breaker.name}')
+    try:
+        breaker.allow()
+    except CircuitOpen:
+        metrics.inc('upstream_rejected_total', (('upstream', breaker.name), ('reason', 'circuit_open')))
+        raise
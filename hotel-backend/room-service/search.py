@@ -0,0 +1,96 @@
+# search.py
+# Server-side room filtering. Text search uses SQLite FTS5 or a PostgreSQL
+# GIN expression index when available and falls back to LIKE otherwise.
+import re
+
+from sqlalchemy import Integer, and_, column, or_, text
+
+from models import db, Room
+
+SORT_KEYS = {
+    'id': Room.id,
+    'name': Room.name,
+    'price_per_day': Room.price_per_day,
+    'price_per_hour': Room.price_per_hour,
+}
+
+# Must match the expression indexed by migrations/0004_room_search_index.py
+_PG_DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+_search_backend = {}
+
+
+def _has_fts_table(conn):
+    return conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'room_fts'")).first() is not None
+
+
+def search_backend():
+    """Backend the migrations set up for the current database (see migrations/0004)."""
+    engine = db.engine
+    key = engine.url.render_as_string(hide_password=False)
+    if key not in _search_backend:
+        if engine.dialect.name == 'postgresql':
+            backend = 'postgres'
+        elif engine.dialect.name == 'sqlite':
+            with engine.connect() as conn:
+                backend = 'fts5' if _has_fts_table(conn) else 'like'
+        else:
+            backend = 'like'
+        _search_backend[key] = backend
+    return _search_backend[key]
+
+
+def _text_filter(q):
+    words = re.findall(r'\w+', q)
+    if not words:
+        return None
+    backend = search_backend()
+    if backend == 'fts5':
+        # Every word must match as a prefix, e.g. "sea view" -> "sea"* "view"*
+        match = ' '.join(f'"{w}"*' for w in words)
+        rowids = text('SELECT rowid FROM room_fts WHERE room_fts MATCH :fts') \
+            .bindparams(fts=match).columns(column('rowid', Integer))
+        return Room.id.in_(rowids)
+    if backend == 'postgres':
+        return text(f"{_PG_DOCUMENT} @@ plainto_tsquery('simple', :pg_q)").bindparams(pg_q=' '.join(words))
+    clauses = []
+    for w in words:
+        pattern = f'%{w}%'
+        clauses.append(or_(Room.name.ilike(pattern), Room.description.ilike(pattern)))
+    return and_(*clauses)
+
+
+def filter_rooms(args):
+    """Build the room query for the request args. Raises ValueError on bad input.
+
+    Supported: room_type (comma separated), min_price/max_price (per day),
+    min_hourly/max_hourly (per hour), q (name/description text),
+    sort (id, name, price_per_day, price_per_hour; prefix '-' for descending),
+    limit and offset.
+    """
+    query = Room.query
+    if args.get('room_type'):
+        types = [t for t in args['room_type'].split(',') if t]
+        query = query.filter(Room.room_type.in_(types))
+    if args.get('min_price'):
+        query = query.filter(Room.price_per_day >= float(args['min_price']))
+    if args.get('max_price'):
+        query = query.filter(Room.price_per_day <= float(args['max_price']))
+    if args.get('min_hourly'):
+        query = query.filter(Room.price_per_hour >= float(args['min_hourly']))
+    if args.get('max_hourly'):
+        query = query.filter(Room.price_per_hour <= float(args['max_hourly']))
+    if args.get('q'):
+        clause = _text_filter(args['q'])
+        if clause is not None:
+            query = query.filter(clause)
+
+    sort = args.get('sort', 'id')
+    descending = sort.startswith('-')
+    key = SORT_KEYS.get(sort.lstrip('-'))
+    if key is None:
+        raise ValueError(f'sort must be one of {", ".join(SORT_KEYS)}')
+    order = key.desc() if descending else key.asc()
+    # id as tie-breaker keeps pages stable when sort values repeat
+    return query.order_by(order, Room.id.asc()) if key is not Room.id else query.order_by(order)
@@ -0,0 +1,84 @@
+# serializers.py
+# Column-projected serialization for room listings.
+#
+# Filtered listings and bulk lookups select only the columns their fields
+# need and build dicts from row tuples instead of Room instances.
+# ?fields= picks top-level keys, e.g. fields=id,name,price_per_day,
+# main_image_variants; without it the output matches Room.to_dict().
+import json
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder gives the same output
+    orjson = None
+
+from images import variant_urls
+from models import Room
+
+# Key -> column it is computed from, in to_dict() order
+FIELD_COLUMNS = {
+    'id': Room.id,
+    'name': Room.name,
+    'room_type': Room.room_type,
+    'description': Room.description,
+    'price_per_day': Room.price_per_day,
+    'price_per_hour': Room.price_per_hour,
+    'main_image': Room.main_image,
+    'secondary_images': Room.secondary_images,
+    'main_image_variants': Room.main_image,
+    'secondary_image_variants': Room.secondary_images,
+}
+ALL_FIELDS = list(FIELD_COLUMNS)
+
+
+def parse_fields(raw):
+    """Requested fields in canonical order. Raises ValueError on unknown names."""
+    if not raw:
+        return list(ALL_FIELDS)
+    wanted = {f.strip() for f in raw.split(',') if f.strip()}
+    unknown = wanted.difference(ALL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [f for f in ALL_FIELDS if f in wanted]
+
+
+class RoomProjection:
+    """Columns to select for a field list and how to turn rows into dicts."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.columns = []
+        index = {}
+        for field in fields:
+            column = FIELD_COLUMNS[field]
+            if column.key not in index:
+                index[column.key] = len(self.columns)
+                self.columns.append(column)
+        self._plan = [(field, index[FIELD_COLUMNS[field].key]) for field in fields]
+
+    def to_dicts(self, rows):
+        out = []
+        for row in rows:
+            # secondary_images is stored as JSON text; parse it once per row
+            secondary = None
+            d = {}
+            for field, i in self._plan:
+                value = row[i]
+                if field == 'secondary_images' or field == 'secondary_image_variants':
+                    if secondary is None:
+                        secondary = json.loads(value) if value else []
+                    d[field] = secondary if field == 'secondary_images' \
+                        else [variant_urls(url) for url in secondary]
+                elif field == 'main_image_variants':
+                    d[field] = variant_urls(value)
+                else:
+                    d[field] = value
+            out.append(d)
+        return out
+
+
+def dumps(payload):
+    """Compact JSON bytes for a response body."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode()